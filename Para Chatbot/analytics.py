@@ -0,0 +1,181 @@
+"""Dashboard analytics from the ``daily_rollups`` table.
+
+Every order written through ``OrderWriter`` bumps one row per (Harare day,
+dimension, key) in the same transaction, so the dashboard reads O(days) rows
+instead of every order. ``rebuild`` recomputes the table from orders with SQL
+GROUP BY (used by the migration and after manual data fixes):
+
+    python analytics.py --rebuild
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from models import DailyRollup
+from store_hours import harare_date
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+TOP_PRODUCTS = 5
+
+
+def local_day(created_at: datetime) -> date:
+    return harare_date(created_at)
+
+
+def record_orders(db, orders):
+    """Add ``orders`` (flushed Order rows) to the rollups inside the caller's transaction."""
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for order in orders:
+        day = local_day(order.created_at or datetime.utcnow())
+        kg = sum(item.quantity_kg or 0.0 for item in order.items)
+        revenue = order.total_price or 0.0
+        for dimension, key, order_revenue, order_kg in (
+            ("total", "", revenue, kg),
+            ("payment", order.payment_method or "unknown", revenue, kg),
+        ):
+            delta = deltas[(day, dimension, key)]
+            delta[0] += 1
+            delta[1] += order_revenue
+            delta[2] += order_kg
+        products = defaultdict(lambda: [0.0, 0.0])
+        for item in order.items:
+            products[item.product][0] += item.price or 0.0
+            products[item.product][1] += item.quantity_kg or 0.0
+        for product, (product_revenue, product_kg) in products.items():
+            delta = deltas[(day, "product", product)]
+            delta[0] += 1
+            delta[1] += product_revenue
+            delta[2] += product_kg
+    if not deltas:
+        return
+    rows = [{"day": day, "dimension": dimension, "key": key, "orders": n, "revenue": revenue, "kg": kg}
+            for (day, dimension, key), (n, revenue, kg) in deltas.items()]
+    stmt = insert(DailyRollup).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["day", "dimension", "key"],
+        set_={
+            "orders": DailyRollup.orders + stmt.excluded.orders,
+            "revenue": DailyRollup.revenue + stmt.excluded.revenue,
+            "kg": DailyRollup.kg + stmt.excluded.kg,
+        },
+    ))
+
+
+# Harare is UTC+2 all year and orders are stored in UTC
+_LOCAL_DAY = "date(o.created_at, '+2 hours')"
+_ORDER_KG = "(SELECT COALESCE(SUM(i.quantity_kg), 0) FROM order_items i WHERE i.order_id = o.id)"
+
+
+def rebuild(conn):
+    """Recompute every rollup row from orders/order_items with GROUP BY."""
+    conn.exec_driver_sql("DELETE FROM daily_rollups")
+    conn.exec_driver_sql(
+        "INSERT INTO daily_rollups (day, dimension, key, orders, revenue, kg) "
+        f"SELECT {_LOCAL_DAY}, 'total', '', COUNT(*), COALESCE(SUM(o.total_price), 0), SUM({_ORDER_KG}) "
+        f"FROM orders o GROUP BY {_LOCAL_DAY}"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO daily_rollups (day, dimension, key, orders, revenue, kg) "
+        f"SELECT {_LOCAL_DAY}, 'payment', COALESCE(o.payment_method, 'unknown'), COUNT(*), "
+        f"COALESCE(SUM(o.total_price), 0), SUM({_ORDER_KG}) "
+        f"FROM orders o GROUP BY {_LOCAL_DAY}, COALESCE(o.payment_method, 'unknown')"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO daily_rollups (day, dimension, key, orders, revenue, kg) "
+        f"SELECT {_LOCAL_DAY}, 'product', i.product, COUNT(DISTINCT o.id), COALESCE(SUM(i.price), 0), "
+        "COALESCE(SUM(i.quantity_kg), 0) "
+        f"FROM order_items i JOIN orders o ON o.id = i.order_id GROUP BY {_LOCAL_DAY}, i.product"
+    )
+
+
+def _growth(current: float, previous: float) -> str:
+    if not previous:
+        return "+100%" if current else "0%"
+    change = (current - previous) / previous * 100
+    return f"{change:+.0f}%"
+
+
+def summary(db, period: str = "week", today: date = None) -> dict:
+    """Totals, growth against the previous period, top products, per-day series and payment split."""
+    days = PERIOD_DAYS.get(period, PERIOD_DAYS["month"])
+    today = today or local_day(datetime.utcnow())
+    start = today - timedelta(days=days - 1)
+    previous_start = start - timedelta(days=days)
+
+    def totals(since, until):
+        orders, revenue = (db.query(func.coalesce(func.sum(DailyRollup.orders), 0),
+                                    func.coalesce(func.sum(DailyRollup.revenue), 0.0))
+                           .filter(DailyRollup.dimension == "total", DailyRollup.day >= since, DailyRollup.day <= until)
+                           .one())
+        return orders, revenue
+
+    orders, revenue = totals(start, today)
+    previous_orders, previous_revenue = totals(previous_start, start - timedelta(days=1))
+
+    by_day = dict(
+        (row.day, row) for row in
+        db.query(DailyRollup.day, DailyRollup.orders, DailyRollup.revenue, DailyRollup.kg)
+        .filter(DailyRollup.dimension == "total", DailyRollup.day >= start, DailyRollup.day <= today)
+    )
+    breakdown = (
+        db.query(DailyRollup.dimension, DailyRollup.key, func.sum(DailyRollup.orders).label("orders"),
+                 func.sum(DailyRollup.revenue).label("revenue"), func.sum(DailyRollup.kg).label("kg"))
+        .filter(DailyRollup.dimension.in_(("product", "payment")), DailyRollup.day >= start, DailyRollup.day <= today)
+        .group_by(DailyRollup.dimension, DailyRollup.key)
+        .all()
+    )
+    products = sorted((row for row in breakdown if row.dimension == "product"),
+                      key=lambda row: (row.revenue, row.kg), reverse=True)
+    payments = sorted((row for row in breakdown if row.dimension == "payment"), key=lambda row: row.orders,
+                      reverse=True)
+
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = by_day.get(day)
+        series.append({
+            "date": day.isoformat(),
+            "orders": row.orders if row else 0,
+            "revenue": round(row.revenue, 2) if row else 0.0,
+            "kg": round(row.kg, 2) if row else 0.0,
+        })
+
+    return {
+        "totalOrders": orders,
+        "totalRevenue": round(revenue, 2),
+        "averageOrderValue": round(revenue / orders, 2) if orders else 0.0,
+        "orderGrowth": _growth(orders, previous_orders),
+        "revenueGrowth": _growth(revenue, previous_revenue),
+        "topProducts": [
+            {"name": row.key, "orders": row.orders, "revenue": round(row.revenue, 2), "kg": round(row.kg, 2)}
+            for row in products[:TOP_PRODUCTS]
+        ],
+        "ordersByDay": series,
+        "paymentMethods": [
+            {"method": row.key, "orders": row.orders, "revenue": round(row.revenue, 2)} for row in payments
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order analytics rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute daily_rollups from the orders tables")
+    parser.add_argument("--period", choices=sorted(PERIOD_DAYS), default="week")
+    args = parser.parse_args()
+
+    from models import SessionLocal, engine
+    if args.rebuild:
+        with engine.begin() as conn:
+            rebuild(conn)
+    db = SessionLocal()
+    try:
+        print(summary(db, args.period))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Dashboard analytics: scanning every order in Python versus the daily rollups.
+
+Seeds ``--orders`` orders spread over a year into a scratch database, builds
+the rollups with the v2 migration's GROUP BY backfill, then times the month
+view both ways and checks the totals agree.
+
+    python benchmarks/bench_analytics.py --orders 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_analytics.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics  # noqa: E402
+from migrations import migrate  # noqa: E402
+from models import Order, SessionLocal, engine  # noqa: E402
+
+
+def seed(n):
+    rng = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=365)
+    orders, items = [], []
+    for order_id in range(1, n + 1):
+        created = start + timedelta(seconds=rng.randint(0, 365 * 86400))
+        kg = rng.choice([1, 2, 5, 10])
+        price = kg * 6.0
+        orders.append((order_id, "263770000001", f"${price:.2f}", price, rng.choice(["Cash", "EcoCash", "ZIPIT"]),
+                       "confirmed", created))
+        items.append((order_id, rng.choice(["beef", "chicken", "pork", "lamb", "fish"]), f"{kg}kg", kg, price))
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO orders (id, phone_number, price_option, total_price, payment_method, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", orders,
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO order_items (order_id, product, quantity, quantity_kg, price) VALUES (?, ?, ?, ?, ?)", items,
+        )
+        analytics.rebuild(conn)
+
+
+def scan(db):
+    """The old endpoint: every order in the window loaded, revenue regex-parsed per row."""
+    orders = db.query(Order).filter(Order.created_at >= datetime.utcnow() - timedelta(days=30)).all()
+    revenue = 0.0
+    for order in orders:
+        match = re.search(r"[\d.]+", str(order.price_option))
+        if match:
+            revenue += float(match.group())
+    return len(orders), revenue
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<28} {(time.perf_counter() - started) / repeat * 1000:9.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    migrate()
+    started = time.perf_counter()
+    seed(args.orders)
+    print(f"seeded {args.orders} orders + rollups in {time.perf_counter() - started:.1f}s ({DB_PATH})")
+
+    db = SessionLocal()
+    orders, revenue = timed("scan orders (month)", lambda: scan(db), max(1, args.repeat // 10))
+    summary = timed("daily rollups (month)", lambda: analytics.summary(db, "month"), args.repeat)
+    db.close()
+    # The rollup window is whole Harare days, the scan a rolling 30x24h: close, not identical
+    print(f"scan: {orders} orders ${revenue:,.2f}   rollups: {summary['totalOrders']} orders "
+          f"${summary['totalRevenue']:,.2f}   top: {summary['topProducts'][0]['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Dashboard chat polling: re-reading every transcript line versus ``since=`` deltas.
+
+Seeds ``--messages`` transcript lines over ``--conversations`` phone numbers,
+then times a full read of the table (what the old /chats did with the
+in-memory history, on every poll), a delta poll after ``--new`` fresh lines,
+and one page of one conversation. The query plans must stay on indexes.
+
+    python benchmarks/bench_chat_feed.py --messages 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_chats.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcript  # noqa: E402
+from migrations import migrate  # noqa: E402
+from models import ChatMessage, SessionLocal, engine  # noqa: E402
+
+
+def seed(n, conversations, start_id=1):
+    rng = random.Random(start_id)
+    started = datetime.utcnow() - timedelta(days=30)
+    rows = [
+        (i, f"wamid.{i}", f"26377{rng.randint(1, conversations):07d}", rng.choice(["in", "out"]),
+         "How much is 5kg of beef mince delivered to Avondale?", started + timedelta(seconds=i))
+        for i in range(start_id, start_id + n)
+    ]
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO chat_messages (id, message_id, phone_number, direction, content, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows,
+        )
+
+
+def timed(label, fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<36} {(time.perf_counter() - started) / repeat * 1000:9.3f} ms  ({len(result)} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--conversations", type=int, default=5000)
+    parser.add_argument("--new", type=int, default=20)
+    args = parser.parse_args()
+
+    migrate()
+    started = time.perf_counter()
+    seed(args.messages, args.conversations)
+    print(f"seeded {args.messages} lines in {time.perf_counter() - started:.1f}s ({DB_PATH})")
+
+    db = SessionLocal()
+    cursor = transcript.feed(db)[1]
+    seed(args.new, args.conversations, start_id=args.messages + 1)
+    timed("full read (old /chats per poll)", lambda: db.query(ChatMessage).all(), repeat=1)
+    timed(f"delta poll (since=, {args.new} new)", lambda: transcript.feed(db, cursor)[0], repeat=200)
+    timed("fresh dashboard (latest 500)", lambda: transcript.feed(db)[0], repeat=50)
+    phone = "263770000042"
+    timed("one conversation page", lambda: transcript.conversation(db, phone)[0], repeat=200)
+    db.close()
+
+    with engine.connect() as conn:
+        for label, sql in (
+            ("since", f"SELECT * FROM chat_messages WHERE id > {cursor} ORDER BY id LIMIT 500"),
+            ("conversation", f"SELECT * FROM chat_messages WHERE phone_number = '{phone}' AND id < 500000 "
+                             "ORDER BY id DESC LIMIT 51"),
+        ):
+            plan = " / ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+            print(f"plan[{label}]: {plan}")
+            assert "SCAN chat_messages" not in plan and "TEMP B-TREE" not in plan, plan
+
+
+if __name__ == "__main__":
+    main()
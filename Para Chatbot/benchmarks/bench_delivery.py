@@ -0,0 +1,124 @@
+"""Latency of a delivery quote: self-HTTP hop to /calculate-delivery vs the in-process service.
+
+The old chat path called ``http://localhost:8000/calculate-delivery`` from
+inside the app (always for "my distance", and for every weight other than
+the cached 12kg). This serves the same quote from a local HTTP server backed
+by the same warm service, so the difference is the hop itself. Google Maps
+is replaced by a lookup that sleeps ``--maps-ms`` (paid once per location).
+
+    python benchmarks/bench_delivery.py --requests 2000 --locations 40 --maps-ms 150
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delivery_service import DeliveryQuoteService  # noqa: E402
+
+SUBURBS = ["Avondale", "Borrowdale", "Mabelreign", "Greendale", "Highfield", "Mbare", "Glen View", "Budiriro",
+           "Marlborough", "Waterfalls", "Hatfield", "Eastlea", "Belvedere", "Kuwadzana", "Warren Park",
+           "Mount Pleasant", "Chitungwiza", "Epworth", "Ruwa", "Norton"]
+
+
+def make_lookup(maps_ms):
+    def lookup(destination):
+        time.sleep(maps_ms / 1000)
+        return 5 + (sum(map(ord, destination)) % 40)
+    return lookup
+
+
+def start_endpoint(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            destination = query["destination"][0]
+            body = json.dumps(service.quote(destination, float(query["weight_kg"][0]))).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/calculate-delivery"
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000
+
+
+def report(label, samples):
+    print(f"{label:<22} mean {statistics.mean(samples) * 1000:8.3f} ms   p50 {percentile(samples, 0.5):8.3f} ms   "
+          f"p99 {percentile(samples, 0.99):8.3f} ms")
+
+
+def run_http(url, destinations, weights):
+    samples = []
+    for destination, weight in zip(destinations, weights):
+        started = time.perf_counter()
+        params = urllib.parse.urlencode({"destination": destination, "weight_kg": weight})
+        with urllib.request.urlopen(f"{url}?{params}") as response:
+            json.loads(response.read())
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def run_direct(service, destinations, weights):
+    samples = []
+    for destination, weight in zip(destinations, weights):
+        started = time.perf_counter()
+        await service.aquote(destination, weight)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--locations", type=int, default=len(SUBURBS))
+    parser.add_argument("--maps-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    locations = [SUBURBS[i % len(SUBURBS)] + ("" if i < len(SUBURBS) else f" {i}") for i in range(args.locations)]
+    rng = random.Random(7)
+    destinations = [rng.choice(locations) for _ in range(args.requests)]
+    weights = [rng.choice([5, 12, 20, 50]) for _ in range(args.requests)]
+
+    service = DeliveryQuoteService(distance_lookup=make_lookup(args.maps_ms))
+    started = time.perf_counter()
+    for location in locations:
+        service.distance_km(location)
+    warmup = time.perf_counter() - started
+
+    server, url = start_endpoint(service)
+    try:
+        http_samples = run_http(url, destinations, weights)
+    finally:
+        server.shutdown()
+    direct_samples = asyncio.run(run_direct(service, destinations, weights))
+
+    print(f"{args.requests} quotes over {args.locations} locations "
+          f"(warm-up: {len(locations)} maps lookups in {warmup:.2f}s)")
+    report("self-HTTP hop", http_samples)
+    report("in-process service", direct_samples)
+    print(f"speedup: {statistics.mean(http_samples) / statistics.mean(direct_samples):.0f}x   "
+          f"service stats: {service.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cold-start import budget for the webhook app.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter, reports
+the slowest imports and fails (exit 1) when the total exceeds ``--budget-ms``
+or when a module that must stay lazy (pandas, spaCy, the OpenAI SDK, ...)
+is imported at startup.
+
+    python benchmarks/bench_import_time.py --budget-ms 1500
+    python benchmarks/bench_import_time.py --module route_planner --budget-ms 200
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that must only load on first use
+MUST_STAY_LAZY = ["pandas", "numpy", "spacy", "openai", "fpdf", "gspread", "oauth2client", "bs4", "googlemaps",
+                  "tiktoken", "pytz", "sentence_transformers"]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module, runs):
+    """Best-of-``runs`` importtime profile: (total_us, {module: (self_us, cumulative_us, depth)})."""
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=APP_DIR, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+            raise SystemExit(f"import {module} failed:\n" + "\n".join(errors[-10:]))
+        modules = {}
+        for line in proc.stderr.splitlines():
+            match = _LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                modules[name] = (int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+        total = modules[module][1]
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters; the fastest run is reported")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    total_us, modules = measure(args.module, args.runs)
+    top_level = sorted(((cum, name) for name, (_, cum, depth) in modules.items() if depth == 0), reverse=True)
+    print(f"import {args.module}: {total_us / 1000:.1f} ms (best of {args.runs}), {len(modules)} modules")
+    print("slowest top-level imports (cumulative):")
+    for cumulative, name in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = sorted(name for name in modules if name.split(".")[0] in MUST_STAY_LAZY and "." not in name)
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+    if total_us / 1000 > args.budget_ms:
+        failures.append(f"{total_us / 1000:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: within {args.budget_ms:.0f} ms budget, no heavy modules at startup")
+
+
+if __name__ == "__main__":
+    main()
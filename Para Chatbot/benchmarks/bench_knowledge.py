@@ -0,0 +1,96 @@
+"""Prompt size and latency: full knowledge stuffing vs retrieved chunks.
+
+Loads knowledge the same way the bot does (price list Excel by default, plus
+any extra text/CSV files), then for a set of typical customer messages
+compares system-prompt tokens and prompt-assembly time. With ``--live`` and
+OPENAI_API_KEY set, also times real chat completions for both variants.
+
+    python benchmarks/bench_knowledge.py
+    python benchmarks/bench_knowledge.py --extra site.txt --live
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from token_counter import encode_length as estimate_tokens  # noqa: E402
+from knowledge_manager import KnowledgeManager  # noqa: E402
+
+QUERIES = [
+    "How much is beef mince per kg?",
+    "Do you have pork spare ribs?",
+    "Mune huku here nhasi?",
+    "Do you deliver to Borrowdale?",
+    "price of t-bone super",
+    "What time do you close on Saturday?",
+    "I want 10kg chicken wings wholesale",
+    "Goat shoulder marii?",
+]
+
+
+def build_manager(excel, extra_files):
+    manager = KnowledgeManager()
+    if excel and os.path.exists(excel):
+        from knowledge_loader import load_excel
+        manager.update_knowledge(load_excel(excel).to_csv(index=False))
+    for path in extra_files:
+        with open(path, encoding="utf-8") as f:
+            manager.update_knowledge(f.read())
+    return manager
+
+
+def full_prompt(manager, query):
+    return f"{manager.get_prompt()}\n\nKnowledge base:\n{manager.get_knowledge()}"
+
+
+def retrieved_prompt(manager, query):
+    return f"{manager.get_prompt()}\n\nKnowledge base:\n{manager.get_relevant_knowledge(query)}"
+
+
+def time_builder(builder, manager, repeats=200):
+    per_query = []
+    for query in QUERIES:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            builder(manager, query)
+        per_query.append((time.perf_counter() - started) / repeats)
+    return statistics.mean(per_query)
+
+
+def time_live(builder, manager):
+    from openai import OpenAI
+    client = OpenAI()
+    latencies = []
+    for query in QUERIES:
+        messages = [{"role": "system", "content": builder(manager, query)}, {"role": "user", "content": query}]
+        started = time.perf_counter()
+        client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--excel", default=os.path.join(ROOT, "uploads", "Copy of PRICE LIST new(1).xlsx"))
+    parser.add_argument("--extra", nargs="*", default=[], help="extra text/CSV knowledge files")
+    parser.add_argument("--live", action="store_true", help="also time real OpenAI calls")
+    args = parser.parse_args()
+
+    manager = build_manager(args.excel, args.extra)
+    print(f"knowledge: {estimate_tokens(manager.get_knowledge())} tokens in {len(manager.index)} chunks")
+
+    for name, builder in (("full", full_prompt), ("retrieved", retrieved_prompt)):
+        tokens = [estimate_tokens(builder(manager, q)) for q in QUERIES]
+        line = (f"{name:>9}: {statistics.mean(tokens):8.0f} prompt tokens/msg"
+                f"  build {time_builder(builder, manager) * 1e6:8.1f} µs")
+        if args.live:
+            line += f"  e2e median {time_live(builder, manager):.2f} s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
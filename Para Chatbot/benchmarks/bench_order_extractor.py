@@ -0,0 +1,78 @@
+"""Turns per completed order: one-shot slot filling versus asking every step.
+
+Each sample first message is run through the rule extractor (no LLM call), the
+flow's remaining questions are answered from a scripted customer, and the order
+is confirmed. The step-by-step baseline starts from an empty order instead.
+
+    python benchmarks/bench_order_extractor.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_extractor import OrderExtractor  # noqa: E402
+from order_flow import OrderFlow  # noqa: E402
+from price_catalogue import PriceCatalogue  # noqa: E402
+
+ROWS = [
+    ("BEEF - SUPER", None), ("T-bone steak", 7.5), ("Mince", 6.0), ("Oxtail", 8.0),
+    ("BEEF - ECONOMY", None), ("Mince", 4.5), ("Mixed cuts", 4.2),
+    ("CHICKENS", None), ("Drumstics", 5.5), ("Wings", 5.2),
+]
+FIRST_MESSAGES = [
+    "order",
+    "i want to order beef",
+    "order 5kg beef t-bone",
+    "5kg super mince to Glen View tomorrow morning, ecocash",
+    "order 2kg chicken wings and 3kg economy mince, deliver to 8233 glenview 8 at 2pm pay cash",
+    "10kg chicken drumsticks to borrowdale in the evening",
+    "3kg pork for avondale, zipit",
+]
+# What the scripted customer says at each step
+ANSWERS = {
+    "item": "beef", "quantity": "5kg", "portion": "standard", "more": "done",
+    "delivery_address": "8233 glenview 8", "delivery_time": "morning", "payment_method": "cash",
+}
+
+
+async def turns_for(extractor, flow, first_message, one_shot: bool) -> int:
+    if one_shot:
+        state, _ = await extractor.start(first_message)
+    else:
+        state, _ = flow.start()
+    while state.step != "confirmation":
+        flow.handle(state, ANSWERS[state.step])
+    flow.complete(state)
+    return state.turns
+
+
+async def main():
+    catalogue = PriceCatalogue.from_rows(ROWS)
+    flow = OrderFlow(lambda: catalogue)
+    extractor = OrderExtractor(flow, use_llm=False)
+
+    print(f"{'first message':<92} step-by-step  one-shot")
+    totals = [0, 0]
+    for message in FIRST_MESSAGES:
+        baseline = await turns_for(extractor, flow, message, one_shot=False)
+        one_shot = await turns_for(extractor, flow, message, one_shot=True)
+        totals[0] += baseline
+        totals[1] += one_shot
+        print(f"{message:<92} {baseline:12d}  {one_shot:8d}")
+    n = len(FIRST_MESSAGES)
+    print(f"{'average turns per order':<92} {totals[0] / n:12.2f}  {totals[1] / n:8.2f}")
+
+    started = time.perf_counter()
+    rounds = 2000
+    for _ in range(rounds):
+        for message in FIRST_MESSAGES:
+            extractor.extract_rules(message)
+    per_message = (time.perf_counter() - started) / (rounds * n)
+    print(f"rule extraction: {per_message * 1e6:.1f} us/message")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
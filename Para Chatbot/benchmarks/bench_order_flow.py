@@ -0,0 +1,66 @@
+"""Order flow cost: microseconds per step and memory per open cart.
+
+Walks ``--orders`` two-item orders through every step against a small price
+list, then holds that many carts open at once and reports their memory
+(tracemalloc) alongside the JSON size the SQLite session backend would store.
+
+    python benchmarks/bench_order_flow.py --orders 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_flow import OrderFlow  # noqa: E402
+from price_catalogue import PriceCatalogue  # noqa: E402
+
+ROWS = [
+    ("BEEF - SUPER", None), ("T-bone steak", 7.5), ("Mince", 6.0), ("Oxtail", 8.0),
+    ("BEEF - ECONOMY", None), ("Mince", 4.5), ("Mixed cuts", 4.2),
+    ("CHICKENS", None), ("Drumstics", 5.5), ("Wings", 5.2), ("Giz", 3.0),
+]
+ANSWERS = ["beef", "5kg", "super mince", "2kg chicken wings", "done", "8233 glenview 8", "morning", "ecocash"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=5000)
+    args = parser.parse_args()
+
+    catalogue = PriceCatalogue.from_rows(ROWS)
+    flow = OrderFlow(lambda: catalogue)
+
+    started = time.perf_counter()
+    for _ in range(args.orders):
+        state, _ = flow.start()
+        for answer in ANSWERS:
+            flow.handle(state, answer)
+    elapsed = time.perf_counter() - started
+    assert state.step == "confirmation" and len(state.items) == 2, state.to_dict()
+    steps = args.orders * len(ANSWERS)
+    print(f"{steps} steps in {elapsed * 1000:.1f} ms: {elapsed / steps * 1e6:.1f} us/step")
+    for name, step in flow.stats()["steps"].items():
+        print(f"  {name:<18} {step['avg_us']:6.1f} us")
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    open_carts = []
+    for _ in range(args.orders):
+        state, _ = flow.start()
+        for answer in ANSWERS[:5]:
+            flow.handle(state, answer)
+        open_carts.append(state)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    encoded = len(json.dumps(open_carts[-1].to_dict()))
+    print(f"{len(open_carts)} open two-item carts: {used / 1024:.0f} KiB in memory "
+          f"({used / len(open_carts):.0f} B each), {encoded} B each as stored JSON")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Order write throughput: one commit per order versus the group-committing OrderWriter.
+
+``--concurrency`` coroutines each place orders as fast as they are acknowledged,
+first through the old path (session + add + commit + refresh per order, in a
+thread) and then through ``OrderWriter``. Both run with synchronous=FULL on a
+scratch WAL database so every acknowledged order is on disk.
+
+    python benchmarks/bench_order_writer.py --orders 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_writer.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate  # noqa: E402
+from models import SessionLocal, create_order, engine  # noqa: E402
+from order_writer import OrderWriter  # noqa: E402
+
+ITEMS = [{"product": "beef", "cut": "mince", "quantity": "5kg", "quantity_kg": 5.0, "price": 30.0},
+         {"product": "chicken", "cut": "wings", "quantity": "2kg", "quantity_kg": 2.0, "price": 10.4}]
+
+
+def commit_one(i):
+    db = SessionLocal()
+    try:
+        db.connection().exec_driver_sql("PRAGMA synchronous=FULL")
+        order = create_order(db, f"26377{i % 500:07d}", ITEMS, payment_method="Cash")
+        db.commit()
+        db.refresh(order)
+        return order.id
+    finally:
+        db.close()
+
+
+async def run(label, place, orders, concurrency):
+    latencies = []
+    counter = iter(range(orders))
+
+    async def client():
+        for i in counter:
+            started = time.perf_counter()
+            await place(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{label:<26} {orders / elapsed:9.0f} orders/s   p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms   "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    migrate()
+    # Warm the customer rows so both runs do the same work per order
+    await asyncio.to_thread(lambda: [commit_one(i) for i in range(500)])
+
+    await run("per-order commit", lambda i: asyncio.to_thread(commit_one, i), args.orders, args.concurrency)
+
+    writer = OrderWriter()
+    await writer.start()
+    await run("group commit (OrderWriter)",
+              lambda i: writer.save_order(f"26377{i % 500:07d}", ITEMS, payment_method="Cash"),
+              args.orders, args.concurrency)
+    await writer.stop()
+    stats = writer.stats()
+    print(f"  {stats['batches']} commits, avg batch {stats['avg_batch_size']}, largest {stats['largest_batch']}, "
+          f"avg commit {stats['avg_commit_ms']} ms")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Order lookups at scale: by phone number and by date range, with their query plans.
+
+Seeds ``--orders`` orders (two lines each) into a scratch database through the
+real models and migrations, then times the lookups the bot and dashboard make.
+
+    python benchmarks/bench_orders_db.py --orders 300000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_orders.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate  # noqa: E402
+from models import Order, SessionLocal, engine  # noqa: E402
+from order_queries import encode_cursor, order_page  # noqa: E402
+
+
+def seed(n, customers):
+    rng = random.Random(7)
+    start = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO customers (id, phone_number, created_at) VALUES (?, ?, ?)",
+            [(i, f"26377{i:07d}", start) for i in range(1, customers + 1)],
+        )
+        orders, items = [], []
+        for order_id in range(1, n + 1):
+            customer = rng.randint(1, customers)
+            created = start + timedelta(seconds=rng.randint(0, 365 * 86400))
+            orders.append((order_id, customer, f"26377{customer:07d}", "confirmed", created, created))
+            for product in rng.sample(["beef", "chicken", "pork", "lamb", "fish"], 2):
+                kg = rng.choice([1, 2, 5, 10])
+                items.append((order_id, product, f"{kg}kg", kg, kg * 6.0))
+        conn.exec_driver_sql(
+            "INSERT INTO orders (id, customer_id, phone_number, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", orders,
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO order_items (order_id, product, quantity, quantity_kg, price) VALUES (?, ?, ?, ?, ?)", items,
+        )
+
+
+def timed(label, fn, repeat=200):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<40} {(time.perf_counter() - started) / repeat * 1000:8.3f} ms  ({len(result)} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=300000)
+    parser.add_argument("--customers", type=int, default=20000)
+    args = parser.parse_args()
+
+    migrate()
+    started = time.perf_counter()
+    seed(args.orders, args.customers)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - started:.1f}s ({DB_PATH})")
+
+    db = SessionLocal()
+    phone = "263770000042"
+    day = datetime.utcnow() - timedelta(days=30)
+    timed("orders for one phone (with items)",
+          lambda: db.query(Order).filter(Order.phone_number == phone).order_by(Order.created_at.desc()).all())
+    timed("one day of orders (with items)",
+          lambda: db.query(Order).filter(Order.created_at >= day, Order.created_at < day + timedelta(days=1)).all(),
+          repeat=20)
+    timed("latest 50 orders",
+          lambda: db.query(Order).order_by(Order.created_at.desc(), Order.id.desc()).limit(50).all())
+    deep = args.orders // 2
+    timed(f"page at offset {deep} (OFFSET)",
+          lambda: db.query(Order).order_by(Order.created_at.desc(), Order.id.desc()).offset(deep).limit(50).all(),
+          repeat=5)
+    cursor = encode_cursor(db.query(Order).order_by(Order.created_at.desc(), Order.id.desc()).offset(deep - 1).first())
+    timed(f"page at offset {deep} (keyset)", lambda: order_page(db, 50, cursor)[0])
+    timed("latest 50 beef orders (keyset)", lambda: order_page(db, 50, product="beef")[0])
+    db.close()
+
+    with engine.connect() as conn:
+        for label, sql in (
+            ("phone", f"SELECT * FROM orders WHERE phone_number = '{phone}' ORDER BY created_at DESC"),
+            ("day", "SELECT * FROM orders WHERE created_at >= '2025-01-01' AND created_at < '2025-01-02'"),
+            ("items", "SELECT * FROM order_items WHERE order_id IN (1, 2, 3)"),
+            ("keyset", "SELECT * FROM orders WHERE (created_at, id) < ('2025-06-01', 1000) "
+                       "ORDER BY created_at DESC, id DESC LIMIT 51"),
+            ("product", "SELECT * FROM orders WHERE EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = orders.id "
+                        "AND i.product = 'beef') AND created_at < '2026-01-01' "
+                        "ORDER BY created_at DESC, id DESC LIMIT 51"),
+        ):
+            plan = " / ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+            print(f"plan[{label}]: {plan}")
+            assert "SCAN orders" not in plan and "SCAN order_items" not in plan, plan
+            assert "TEMP B-TREE" not in plan, plan
+
+
+if __name__ == "__main__":
+    main()
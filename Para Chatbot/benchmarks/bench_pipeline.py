@@ -0,0 +1,73 @@
+"""Sustained-throughput benchmark for the async message pipeline.
+
+Simulates a promo-day burst: messages arrive at a fixed rate from
+``--senders`` customers and each handler spends ``--io-ms`` awaiting
+(standing in for OpenAI + Graph API calls). Per-sender ordering is checked.
+
+    python benchmarks/bench_pipeline.py --rate 200 --seconds 5 --workers 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import MessagePipeline, QueueFullError  # noqa: E402
+
+
+async def run(rate, seconds, workers, queue_size, io_ms, senders):
+    pipeline = MessagePipeline(workers=workers, max_queue=queue_size)
+    await pipeline.start()
+
+    seen = {}
+    out_of_order = 0
+
+    async def handler(seq, sender_id):
+        nonlocal out_of_order
+        await asyncio.sleep(io_ms / 1000)
+        if seq < seen.get(sender_id, -1):
+            out_of_order += 1
+        seen[sender_id] = seq
+
+    total = int(rate * seconds)
+    interval = 1.0 / rate
+    started = time.perf_counter()
+    for i in range(total):
+        try:
+            sender_id = f"2637{i % senders:08d}"
+            pipeline.submit(sender_id, handler, i, sender_id)
+        except QueueFullError:
+            pass
+        # Pace arrivals against the wall clock rather than sleeping a fixed step
+        delay = started + (i + 1) * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    arrival_seconds = time.perf_counter() - started
+    await pipeline.join()
+    elapsed = time.perf_counter() - started
+    stats = pipeline.stats()
+    await pipeline.stop()
+
+    print(f"offered:   {total} msgs at {rate}/s over {arrival_seconds:.2f}s")
+    print(f"processed: {stats['processed']}  rejected: {stats['rejected']}  failed: {stats['failed']}")
+    print(f"sustained: {stats['processed'] / elapsed:.1f} msgs/s (drained in {elapsed:.2f}s)")
+    print(f"senders:   {senders}  out of order: {out_of_order}  lanes left: {stats['active_senders']}")
+    print(f"avg handle: {stats['avg_handle_seconds'] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200, help="incoming messages per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PIPELINE_WORKERS", "64")))
+    parser.add_argument("--queue-size", type=int, default=int(os.getenv("PIPELINE_QUEUE_SIZE", "1000")))
+    parser.add_argument("--io-ms", type=float, default=2000, help="simulated I/O time per message")
+    parser.add_argument("--senders", type=int, default=500, help="distinct customers sending")
+    args = parser.parse_args()
+    asyncio.run(run(args.rate, args.seconds, args.workers, args.queue_size, args.io_ms, args.senders))
+
+
+if __name__ == "__main__":
+    main()
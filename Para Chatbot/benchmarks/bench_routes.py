@@ -0,0 +1,49 @@
+"""Route planner scaling: a few hundred stops should plan in well under a second.
+
+Scatters ``--stops`` drop-offs around the shop and plans them as one window,
+reporting time and route length for nearest-neighbour alone and with 2-opt.
+
+    python benchmarks/bench_routes.py --stops 300 --max-stops 25
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delivery_zones import DeliveryZones  # noqa: E402
+from route_planner import Stop, plan_window  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stops", type=int, default=300)
+    parser.add_argument("--max-stops", type=int, default=25, help="stops per vehicle")
+    parser.add_argument("--radius-deg", type=float, default=0.15)
+    args = parser.parse_args()
+
+    zones = DeliveryZones.from_file()
+    rng = random.Random(3)
+    stops = [
+        Stop(i, f"stop {i}", "morning",
+             zones.origin[0] + rng.uniform(-args.radius_deg, args.radius_deg),
+             zones.origin[1] + rng.uniform(-args.radius_deg, args.radius_deg))
+        for i in range(args.stops)
+    ]
+
+    for label, max_stops in (("one vehicle", args.stops), (f"{args.max_stops} stops/vehicle", args.max_stops)):
+        for budget_label, budget in (("nearest-neighbour", 0.0), ("+ 2-opt", 5.0)):
+            started = time.perf_counter()
+            routes = plan_window("morning", stops, zones, max_stops=max_stops, time_budget=budget)
+            elapsed = time.perf_counter() - started
+            total = sum(route.distance_km for route in routes)
+            print(f"{label:<20} {budget_label:<18} {len(routes):3d} routes  {total:8.1f} km  "
+                  f"{elapsed * 1000:8.1f} ms")
+    assert math.isclose(sum(len(r.stops) for r in routes), args.stops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Per-turn cost of prompt-size checks: re-encoding everything vs cached counts.
+
+The legacy path re-encodes the system prompt and every history message on
+each turn; the cached path reads stored per-message counts and the
+versioned system-prompt count.
+
+    python benchmarks/bench_tokens.py --turns 40
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_memory import ConversationMemory  # noqa: E402
+from knowledge_manager import KnowledgeManager  # noqa: E402
+from session_store import MemorySessionStore  # noqa: E402
+from token_counter import encode_length, get_tokenizer, static_tokens  # noqa: E402
+
+
+def legacy_count(system_prompt, history):
+    # Equivalent of the old count_tokens: encode every key and value, every turn
+    return sum(encode_length(value) for msg in [{"role": "system", "content": system_prompt}] + history
+               for value in msg.values())
+
+
+async def noop_summary(messages):
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    manager = KnowledgeManager()
+    prompt = manager.get_prompt()
+    memory = ConversationMemory(MemorySessionStore("history"), MemorySessionStore("summary"), noop_summary,
+                                max_messages=args.turns * 2)
+    history = []
+    for i in range(args.turns):
+        text = f"Customer message {i}: I would like {i + 2}kg of beef t-bone delivered to Glen View please."
+        history.append({"role": "user", "content": text})
+        memory.append("263770000000", "user", text)
+
+    started = time.perf_counter()
+    for _ in range(args.repeats):
+        legacy_count(prompt, history)
+    legacy = (time.perf_counter() - started) / args.repeats
+
+    started = time.perf_counter()
+    for _ in range(args.repeats):
+        memory.prompt_tokens("263770000000", static_tokens.count("system_prompt", manager.prompt_version, prompt))
+    cached = (time.perf_counter() - started) / args.repeats
+
+    print(f"tokenizer: {'tiktoken cl100k_base' if get_tokenizer() else 'approximate (tiktoken not installed)'}")
+    print(f"history: {args.turns} messages")
+    print(f"legacy re-encode: {legacy * 1e6:10.1f} µs/turn")
+    print(f"cached counts:    {cached * 1e6:10.1f} µs/turn  ({legacy / cached:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
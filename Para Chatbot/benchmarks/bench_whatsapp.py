@@ -0,0 +1,143 @@
+"""Throughput and retry benchmark for the WhatsApp client against a local Graph API stub.
+
+Starts a threaded HTTP server that answers ``/{version}/{phone_id}/messages``
+like Meta does, failing a share of requests with 429 (with Retry-After) and
+500 so the retry path is exercised. Compares the pooled async client with a
+fresh connection per message (the old ``requests.post`` behaviour).
+
+    python benchmarks/bench_whatsapp.py --messages 500 --concurrency 50 --fail-429 0.05 --fail-500 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from whatsapp_api import AsyncWhatsAppClient, WhatsAppClient  # noqa: E402
+
+
+class GraphStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like graph.facebook.com
+    fail_429 = 0.0
+    fail_500 = 0.0
+    latency = 0.0
+    counts = {"ok": 0, "429": 0, "500": 0, "connections": 0}
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.counts["connections"] += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.latency:
+            time.sleep(self.latency)
+        roll = random.random()
+        if roll < self.fail_429:
+            self._reply(429, {"error": {"code": 130429, "message": "Rate limit hit"}}, {"Retry-After": "0.05"})
+            key = "429"
+        elif roll < self.fail_429 + self.fail_500:
+            self._reply(500, {"error": {"code": 1, "message": "Unknown error"}})
+            key = "500"
+        else:
+            self._reply(200, {"messages": [{"id": "wamid.stub"}]})
+            key = "ok"
+        with self.lock:
+            self.counts[key] += 1
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(fail_429, fail_500, latency_ms):
+    GraphStub.fail_429 = fail_429
+    GraphStub.fail_500 = fail_500
+    GraphStub.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def reset_counts():
+    with GraphStub.lock:
+        for key in GraphStub.counts:
+            GraphStub.counts[key] = 0
+
+
+def client_kwargs(base_url):
+    return dict(access_token="stub", phone_number_id="1000", base_url=base_url, backoff_base=0.05, backoff_max=1.0)
+
+
+async def run_pooled(base_url, messages, concurrency):
+    client = AsyncWhatsAppClient(**client_kwargs(base_url))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            return await client.send_text(f"2637{i:08d}", "Your order is on its way 🚚")
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    delivered = sum(1 for r in responses if r is not None and r.status_code == 200)
+    return elapsed, delivered, client.stats()
+
+
+def run_fresh(base_url, messages):
+    """One TCP connection per message, no retries (what bare ``requests.post`` did)."""
+    delivered = 0
+    started = time.perf_counter()
+    for i in range(messages):
+        with httpx.Client() as http:
+            client = WhatsAppClient(http_client=http, max_retries=0, **client_kwargs(base_url))
+            response = client.send_text(f"2637{i:08d}", "Your order is on its way 🚚")
+            delivered += response is not None and response.status_code == 200
+    return time.perf_counter() - started, delivered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--fail-429", type=float, default=0.05)
+    parser.add_argument("--fail-500", type=float, default=0.05)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated Graph API processing time")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.fail_429, args.fail_500, args.latency_ms)
+    try:
+        elapsed, delivered, stats = asyncio.run(run_pooled(base_url, args.messages, args.concurrency))
+        print(f"pooled async : {args.messages / elapsed:8.1f} msg/s  delivered {delivered}/{args.messages}  "
+              f"retries {stats['retries']}  connections {GraphStub.counts['connections']}  "
+              f"stub {dict(GraphStub.counts)}")
+
+        reset_counts()
+        elapsed, delivered = run_fresh(base_url, args.messages)
+        print(f"fresh conn   : {args.messages / elapsed:8.1f} msg/s  delivered {delivered}/{args.messages}  "
+              f"retries 0  connections {GraphStub.counts['connections']}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Batch delivery quoting: per-address ``DeliveryZones.quote`` vs ``quote_batch``.
+
+Scatters ``--stops`` random drop-offs around Harare and prices them all,
+first one at a time and then in one vectorised call (NumPy, if installed),
+checking both give the same zones and charges.
+
+    python benchmarks/bench_zones.py --stops 10000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delivery_zones import HAS_NUMPY, DeliveryZones  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stops", type=int, default=10000)
+    parser.add_argument("--radius-deg", type=float, default=0.3, help="spread of stops around the shop")
+    args = parser.parse_args()
+
+    zones = DeliveryZones.from_file()
+    rng = random.Random(42)
+    lats = [zones.origin[0] + rng.uniform(-args.radius_deg, args.radius_deg) for _ in range(args.stops)]
+    lngs = [zones.origin[1] + rng.uniform(-args.radius_deg, args.radius_deg) for _ in range(args.stops)]
+    weights = [rng.choice([5, 12, 20, 50]) for _ in range(args.stops)]
+
+    started = time.perf_counter()
+    single = [zones.quote("stop", weight, coordinates=(lat, lng)) for lat, lng, weight in zip(lats, lngs, weights)]
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = zones.quote_batch(lats, lngs, weights)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    for quote, zone, charge in zip(single, batch["zone"], batch["charge"]):
+        expected = math.nan if "note" in quote else float(quote["delivery_charge"].lstrip(zones.currency))
+        same_charge = (math.isnan(expected) and math.isnan(charge)) or abs(expected - charge) < 1e-9
+        mismatches += quote["zone"] != zone or not same_charge
+
+    mode = "numpy" if HAS_NUMPY else "pure python (install numpy for the vectorised path)"
+    print(f"{args.stops} stops")
+    print(f"one at a time : {single_seconds * 1000:8.1f} ms  ({args.stops / single_seconds:,.0f} quotes/s)")
+    print(f"quote_batch   : {batch_seconds * 1000:8.1f} ms  ({args.stops / batch_seconds:,.0f} quotes/s)  [{mode}]")
+    print(f"mismatches    : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+
+from token_counter import count_message_tokens, count_text_tokens, MESSAGE_OVERHEAD_TOKENS, REPLY_PRIMING_TOKENS
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationMemory:
+    """Per-sender chat history with a rolling summary of older turns.
+
+    Each history entry is stored with its token count (computed once, on
+    append) and a running total since the session began, so the size of any
+    contiguous history window is ``last.cum - first.cum + first.tokens``:
+    checking a session against ``token_threshold`` is O(1) and never
+    re-encodes old messages. Crossing the threshold, or holding more than
+    ``summarize_after`` messages, triggers a summary: the oldest turns are
+    folded into the cached summary by a background task and dropped, keeping
+    ``keep_recent`` turns verbatim, so short chats never pay for a summary
+    call. ``max_messages`` is only a safety net for when summaries keep
+    failing; the summary does the pruning.
+    """
+
+    def __init__(self, history_store, summary_store, summarize, token_threshold: int = 3000,
+                 summarize_after: int = 20, max_messages: int = 40, keep_recent: int = 4):
+        self.history_store = history_store
+        self.summary_store = summary_store
+        self.summarize = summarize
+        self.token_threshold = token_threshold
+        self.summarize_after = summarize_after
+        self.max_messages = max(max_messages, summarize_after + keep_recent)
+        self.keep_recent = keep_recent
+        self._inflight = {}
+        self.summaries_run = 0
+        self.summaries_failed = 0
+
+    def history(self, sender_id):
+        return self.history_store.get(sender_id, [])
+
+    def append(self, sender_id, role, content):
+        history = self.history(sender_id)
+        tokens = count_message_tokens(role, content)
+        last = history[-1] if history else {}
+        history.append({
+            "role": role,
+            "content": content,
+            "tokens": tokens,
+            "cum": last.get("cum", 0) + tokens,
+            "seq": last.get("seq", len(history)) + 1,
+        })
+        self.history_store[sender_id] = history[-self.max_messages:]
+
+    def summary(self, sender_id):
+        return self.summary_store.get(sender_id)
+
+    def history_tokens(self, sender_id, history=None) -> int:
+        history = self.history(sender_id) if history is None else history
+        if not history:
+            return 0
+        first, last = history[0], history[-1]
+        if "cum" not in first or "cum" not in last:
+            # Entries written before running totals existed
+            return sum(msg.get("tokens", 0) for msg in history)
+        return last["cum"] - first["cum"] + first["tokens"]
+
+    def summary_tokens(self, sender_id) -> int:
+        summary = self.summary(sender_id)
+        return summary["tokens"] + MESSAGE_OVERHEAD_TOKENS if summary else 0
+
+    def prompt_tokens(self, sender_id, static_tokens: int = 0) -> int:
+        """Size of the next request: static system blocks + summary + history, without encoding."""
+        return (static_tokens + MESSAGE_OVERHEAD_TOKENS + self.summary_tokens(sender_id)
+                + self.history_tokens(sender_id) + REPLY_PRIMING_TOKENS)
+
+    def build_messages(self, sender_id):
+        """Messages for the chat API: cached summary (if any) followed by recent turns."""
+        messages = []
+        summary = self.summary(sender_id)
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of earlier conversation: {summary['text']}"})
+        messages.extend({"role": msg["role"], "content": msg["content"]} for msg in self.history(sender_id))
+        return messages
+
+    def maybe_summarize(self, sender_id):
+        """Schedule a background fold of older turns when the session is over budget."""
+        if sender_id in self._inflight:
+            return None
+        history = self.history(sender_id)
+        if len(history) <= self.keep_recent:
+            return None
+        tokens = self.history_tokens(sender_id, history) + self.summary_tokens(sender_id)
+        if tokens <= self.token_threshold and len(history) <= self.summarize_after:
+            return None
+        task = asyncio.create_task(self._fold(sender_id))
+        self._inflight[sender_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(sender_id, None))
+        return task
+
+    async def _fold(self, sender_id):
+        history = self.history(sender_id)
+        fold = history[:-self.keep_recent]
+        if not fold:
+            return
+        previous = self.summary(sender_id)
+        to_summarize = []
+        if previous:
+            to_summarize.append({"role": "summary", "content": previous["text"]})
+        to_summarize.extend({"role": msg["role"], "content": msg["content"]} for msg in fold)
+
+        text = await self.summarize(to_summarize)
+        if not text:
+            self.summaries_failed += 1
+            logger.warning(f"Summarization for {sender_id} returned nothing; keeping full history")
+            return
+
+        last_folded = fold[-1].get("seq", 0)
+        self.summary_store[sender_id] = {
+            "text": text,
+            "tokens": count_text_tokens(text),
+            "upto": last_folded,
+        }
+        # Re-read: the sender may have sent more messages while we were summarising
+        self.history_store[sender_id] = [msg for msg in self.history(sender_id) if msg.get("seq", 0) > last_folded]
+        self.summaries_run += 1
+        logger.info(f"🧠 Folded {len(fold)} messages for {sender_id} into summary")
+
+    def stats(self) -> dict:
+        return {
+            "summaries_run": self.summaries_run,
+            "summaries_failed": self.summaries_failed,
+            "summaries_in_flight": len(self._inflight),
+            "token_threshold": self.token_threshold,
+            "summarize_after": self.summarize_after,
+        }
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+
+from lazy_sqlite import LazyConnection
+
+
+class SeenMessageCache:
+    """Bounded, TTL-evicting set of WhatsApp message ids already accepted.
+
+    ``check_and_add`` is the only hot-path call: it returns True for a
+    duplicate and otherwise records the id. Oldest ids are evicted first
+    once ``max_entries`` is reached.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 100_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self.checked = 0
+        self.duplicates = 0
+        self.evicted = 0
+
+    def check_and_add(self, message_id: str) -> bool:
+        self.checked += 1
+        now = time.monotonic()
+        self._expire(now)
+        if message_id in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen[message_id] = now
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.evicted += 1
+        return False
+
+    def forget(self, message_id: str):
+        """Drop an id so a retried delivery is processed (e.g. after a 503)."""
+        self._seen.pop(message_id, None)
+
+    def _expire(self, now):
+        cutoff = now - self.ttl_seconds
+        # Insertion order == time order, so stop at the first fresh entry
+        while self._seen:
+            message_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._seen)
+
+    def close(self):
+        """Nothing to release in memory; lets shutdown close any backend the same way."""
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "checked": self.checked,
+            "duplicates_dropped": self.duplicates,
+            "evicted": self.evicted,
+        }
+
+
+class SqliteSeenMessageCache(SeenMessageCache):
+    """Same contract as ``SeenMessageCache`` but survives restarts.
+
+    Ids are stored with wall-clock timestamps in a small WAL-mode SQLite
+    file; expired and overflow rows are purged every ``purge_every`` inserts.
+    """
+
+    def __init__(self, db_path: str = "dedup.db", ttl_seconds: float = 86400,
+                 max_entries: int = 100_000, purge_every: int = 500):
+        super().__init__(ttl_seconds, max_entries)
+        self.db_path = db_path
+        self.purge_every = purge_every
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._db = LazyConnection(db_path, (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "CREATE TABLE IF NOT EXISTS seen_messages ("
+            " message_id TEXT PRIMARY KEY,"
+            " seen_at REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS ix_seen_messages_seen_at ON seen_messages (seen_at)",
+        ))
+
+    @property
+    def _conn(self):
+        return self._db.get()
+
+    def check_and_add(self, message_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self.checked += 1
+            # Insert, or refresh a row that has already expired; no row changed == duplicate
+            cur = self._conn.execute(
+                "INSERT INTO seen_messages (message_id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(message_id) DO UPDATE SET seen_at = excluded.seen_at "
+                "WHERE seen_messages.seen_at < ?",
+                (message_id, now, now - self.ttl_seconds),
+            )
+            if cur.rowcount == 0:
+                self.duplicates += 1
+                return True
+            self._inserts += 1
+            if self._inserts % self.purge_every == 0:
+                self._purge(now)
+            return False
+
+    def forget(self, message_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_messages WHERE message_id = ?", (message_id,))
+
+    def _purge(self, now):
+        cur = self._conn.execute("DELETE FROM seen_messages WHERE seen_at < ?", (now - self.ttl_seconds,))
+        self.evicted += cur.rowcount
+        cur = self._conn.execute(
+            "DELETE FROM seen_messages WHERE message_id IN ("
+            " SELECT message_id FROM seen_messages ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.evicted += cur.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_messages").fetchone()[0]
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["backend"] = "sqlite"
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def make_seen_message_cache(backend: str = "memory", **kwargs) -> SeenMessageCache:
+    if backend == "sqlite":
+        return SqliteSeenMessageCache(**kwargs)
+    kwargs.pop("db_path", None)
+    return SeenMessageCache(**kwargs)
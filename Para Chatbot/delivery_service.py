@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from delivery_zones import DeliveryZones
+from distance_cache import DISTANCE_OFFLINE, normalize_location
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_CACHE_TTL_SECONDS = float(os.getenv("DELIVERY_CACHE_TTL_SECONDS", "86400"))
+DELIVERY_CACHE_MAX_ENTRIES = int(os.getenv("DELIVERY_CACHE_MAX_ENTRIES", "2048"))
+# Failed lookups are retried sooner than good ones expire
+DELIVERY_NEGATIVE_TTL_SECONDS = float(os.getenv("DELIVERY_NEGATIVE_TTL_SECONDS", "300"))
+
+# Weight assumed when a customer asks about delivery before ordering
+DEFAULT_QUOTE_WEIGHT_KG = 12
+
+
+def _google_distance(destination):
+    from googlemap_utils import get_distance_from_harare
+    return get_distance_from_harare(destination)
+
+
+class DeliveryQuoteService:
+    """Delivery quotes computed in-process, with distances cached by normalised location.
+
+    Only the distance is cached; the charge depends on the order weight and is
+    derived locally from ``zones`` on every call, so one lookup serves every
+    weight. An in-memory LRU sits in front of the optional persistent
+    ``store`` (a ``DistanceCache``); when neither has a distance but the
+    store knows the suburb's coordinates, the quote uses those. Google Maps is
+    only asked when all of that misses, and never when ``offline``.
+    """
+
+    def __init__(self, distance_lookup=None, ttl_seconds: float = DELIVERY_CACHE_TTL_SECONDS,
+                 max_entries: int = DELIVERY_CACHE_MAX_ENTRIES,
+                 negative_ttl_seconds: float = DELIVERY_NEGATIVE_TTL_SECONDS,
+                 store=None, offline: bool = DISTANCE_OFFLINE, zones: DeliveryZones = None):
+        self.distance_lookup = distance_lookup or _google_distance
+        self.zones = zones or DeliveryZones.from_file()
+        self.store = store
+        self.offline = offline
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # normalised location -> (distance_km or None, expires_at)
+        self.hits = 0
+        self.misses = 0
+        self.lookup_errors = 0
+        self._lookup_seconds = 0.0
+
+    def cached_distance(self, destination):
+        """Return ``(found, distance_km)`` from the cache without any network call."""
+        key = normalize_location(destination)
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] >= time.monotonic():
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+        if self.store is not None:
+            found, distance_km = self.store.get(destination)
+            if found:
+                self._remember(key, distance_km)
+                self.hits += 1
+                return True, distance_km
+        return False, None
+
+    def _remember(self, key, distance_km):
+        ttl = self.ttl_seconds if distance_km is not None else self.negative_ttl_seconds
+        self._cache[key] = (distance_km, time.monotonic() + ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _store(self, destination, distance_km):
+        self._remember(normalize_location(destination), distance_km)
+        if self.store is not None and not self.offline:
+            self.store.put(destination, distance_km)
+
+    def _lookup(self, destination):
+        self.misses += 1
+        if self.offline:
+            return None
+        started = time.perf_counter()
+        try:
+            distance_km = self.distance_lookup(destination)
+        except Exception as e:
+            logger.error(f"Distance lookup for '{destination}' failed: {e}")
+            self.lookup_errors += 1
+            distance_km = -1
+        self._lookup_seconds += time.perf_counter() - started
+        # get_distance_from_harare signals "not found" with -1
+        return None if distance_km is None or distance_km < 0 else distance_km
+
+    def coordinates(self, destination):
+        return self.store.coordinates(destination) if self.store is not None else None
+
+    def distance_km(self, destination):
+        found, distance_km = self.cached_distance(destination)
+        if not found:
+            distance_km = self._lookup(destination)
+            self._store(destination, distance_km)
+        return distance_km
+
+    async def adistance_km(self, destination):
+        """Like ``distance_km`` but runs a cache miss in a worker thread."""
+        found, distance_km = self.cached_distance(destination)
+        if not found:
+            distance_km = await asyncio.to_thread(self._lookup, destination)
+            self._store(destination, distance_km)
+        return distance_km
+
+    def quote(self, destination: str, weight_kg: float = DEFAULT_QUOTE_WEIGHT_KG) -> dict:
+        found, distance_km = self.cached_distance(destination)
+        coordinates = self.coordinates(destination)
+        if not found and coordinates is None:
+            distance_km = self.distance_km(destination)
+        return self.zones.quote(destination, weight_kg, distance_km, coordinates)
+
+    async def aquote(self, destination: str, weight_kg: float = DEFAULT_QUOTE_WEIGHT_KG) -> dict:
+        found, distance_km = self.cached_distance(destination)
+        coordinates = self.coordinates(destination)
+        if not found and coordinates is None:
+            distance_km = await self.adistance_km(destination)
+        return self.zones.quote(destination, weight_kg, distance_km, coordinates)
+
+    def stats(self) -> dict:
+        return {
+            "offline": self.offline,
+            "zones": self.zones.stats(),
+            "persistent": self.store.stats() if self.store is not None else None,
+            "cached_locations": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "lookup_errors": self.lookup_errors,
+            "avg_lookup_seconds": round(self._lookup_seconds / self.misses, 4) if self.misses else 0.0,
+        }
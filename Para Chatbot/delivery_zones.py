@@ -0,0 +1,189 @@
+import json
+import logging
+import math
+import os
+from importlib.util import find_spec
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_ZONES_PATH = os.getenv(
+    "DELIVERY_ZONES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "delivery_zones.json")
+)
+EARTH_RADIUS_KM = 6371.0
+# NumPy is only imported when a batch is priced, keeping it off the startup path
+HAS_NUMPY = find_spec("numpy") is not None
+
+# Used when the config file is missing: the original hard-coded bands
+DEFAULT_ZONES = {
+    "origin": {"lat": -17.8215, "lng": 31.0430},
+    "road_factor": 1.3,
+    "currency": "$",
+    "zones": [
+        {"name": "Inner", "type": "radius", "max_km": 10, "charge": 0.0},
+        {"name": "Middle", "type": "radius", "max_km": 20, "charge": 3.0},
+        {"name": "Outer", "type": "radius", "max_km": 40, "charge": 7.0},
+        {"name": "Long distance", "type": "radius", "max_km": None, "charge": 15.0},
+    ],
+    "weight_tiers": [
+        {"min_kg": 0, "name": "small", "confirm_with_store": True,
+         "note": "Free delivery only applies to orders 10kg and above."},
+        {"min_kg": 10, "name": "standard", "multiplier": 1.0},
+    ],
+}
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def point_in_polygon(lat, lng, points) -> bool:
+    """Ray casting; ``points`` is a list of [lat, lng] vertices."""
+    inside = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        lat_i, lng_i = points[i]
+        lat_j, lng_j = points[j]
+        if (lat_i > lat) != (lat_j > lat) and lng < (lng_j - lng_i) * (lat - lat_i) / (lat_j - lat_i) + lng_i:
+            inside = not inside
+        j = i
+    return inside
+
+
+class DeliveryZones:
+    """Delivery pricing from a zone config: polygon zones, radius bands and weight tiers.
+
+    Everything is local maths on coordinates or a known road distance, so a
+    quote never needs a network call. ``quote_batch`` prices many stops at
+    once (vectorised when NumPy is installed).
+    """
+
+    def __init__(self, config: dict):
+        self.origin = (config["origin"]["lat"], config["origin"]["lng"])
+        self.road_factor = config.get("road_factor", 1.0)
+        self.currency = config.get("currency", "$")
+        zones = config["zones"]
+        self.polygons = [zone for zone in zones if zone["type"] == "polygon"]
+        # Open-ended band (max_km null) sorts last
+        self.bands = sorted((zone for zone in zones if zone["type"] == "radius"),
+                            key=lambda zone: math.inf if zone.get("max_km") is None else zone["max_km"])
+        self.weight_tiers = sorted(config.get("weight_tiers", [{"min_kg": 0}]), key=lambda tier: tier["min_kg"])
+
+    @classmethod
+    def from_file(cls, path: str = DELIVERY_ZONES_PATH) -> "DeliveryZones":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Delivery zones {path} not loaded ({e}); using the default bands")
+            return cls(DEFAULT_ZONES)
+
+    def road_distance_km(self, lat, lng) -> float:
+        return round(haversine_km(*self.origin, lat, lng) * self.road_factor, 1)
+
+    def zone_for(self, distance_km, coordinates=None) -> dict:
+        if coordinates is not None:
+            for zone in self.polygons:
+                if point_in_polygon(*coordinates, zone["points"]):
+                    return zone
+        for zone in self.bands:
+            if zone.get("max_km") is None or distance_km <= zone["max_km"]:
+                return zone
+        return self.bands[-1]
+
+    def weight_tier(self, weight_kg) -> dict:
+        tier = self.weight_tiers[0]
+        for candidate in self.weight_tiers:
+            if weight_kg >= candidate["min_kg"]:
+                tier = candidate
+        return tier
+
+    def quote(self, destination: str, weight_kg: float, distance_km=None, coordinates=None) -> dict:
+        """The /calculate-delivery response; a measured ``distance_km`` wins over coordinates."""
+        if distance_km is None and coordinates is not None:
+            distance_km = self.road_distance_km(*coordinates)
+        if distance_km is None:
+            return {"error": "Could not calculate distance. Please try a different location."}
+        tier = self.weight_tier(weight_kg)
+        zone = self.zone_for(distance_km, coordinates)
+        if tier.get("confirm_with_store"):
+            return {
+                "destination": destination,
+                "distance_km": distance_km,
+                "zone": zone["name"],
+                "note": tier.get("note", ""),
+                "delivery_charge": "Varies — confirm with store"
+            }
+        charge = zone["charge"] * tier.get("multiplier", 1.0)
+        return {
+            "destination": destination,
+            "distance_km": distance_km,
+            "zone": zone["name"],
+            "weight_kg": weight_kg,
+            "delivery_charge": f"{self.currency}{charge:.2f}"
+        }
+
+    def quote_batch(self, lats, lngs, weights) -> dict:
+        """Price many stops at once: returns ``distance_km``, ``zone`` and ``charge`` sequences.
+
+        ``charge`` is NaN where the weight tier needs the store to confirm.
+        """
+        if not HAS_NUMPY:
+            return self._quote_batch_python(lats, lngs, weights)
+        import numpy as np
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+
+        lat0, lng0 = np.radians(self.origin[0]), np.radians(self.origin[1])
+        rlat, rlng = np.radians(lats), np.radians(lngs)
+        a = np.sin((rlat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(rlat) * np.sin((rlng - lng0) / 2) ** 2
+        distance = np.round(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)) * self.road_factor, 1)
+
+        zone_index = np.full(len(lats), -1, dtype=int)
+        zones = self.polygons + self.bands
+        for index, zone in enumerate(self.polygons):
+            inside = np.zeros(len(lats), dtype=bool)
+            points = np.asarray(zone["points"], dtype=float)
+            prev = np.roll(points, 1, axis=0)
+            for (lat_i, lng_i), (lat_j, lng_j) in zip(points, prev):
+                crosses = (lat_i > lats) != (lat_j > lats)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    edge_lng = (lng_j - lng_i) * (lats - lat_i) / (lat_j - lat_i) + lng_i
+                inside ^= crosses & (lngs < edge_lng)
+            zone_index[(zone_index < 0) & inside] = index
+        limits = np.array([math.inf if zone.get("max_km") is None else zone["max_km"] for zone in self.bands])
+        band = np.minimum(np.searchsorted(limits, distance, side="left"), len(self.bands) - 1)
+        unassigned = zone_index < 0
+        zone_index[unassigned] = len(self.polygons) + band[unassigned]
+
+        charges = np.array([zone["charge"] for zone in zones])[zone_index]
+        tier_floors = np.array([tier["min_kg"] for tier in self.weight_tiers])
+        tier_index = np.maximum(np.searchsorted(tier_floors, weights, side="right") - 1, 0)
+        multipliers = np.array([np.nan if tier.get("confirm_with_store") else tier.get("multiplier", 1.0)
+                                for tier in self.weight_tiers])
+        return {
+            "distance_km": distance,
+            "zone": np.array([zone["name"] for zone in zones], dtype=object)[zone_index],
+            "charge": charges * multipliers[tier_index],
+        }
+
+    def _quote_batch_python(self, lats, lngs, weights) -> dict:
+        distances, names, charges = [], [], []
+        for lat, lng, weight in zip(lats, lngs, weights):
+            distance = self.road_distance_km(lat, lng)
+            zone = self.zone_for(distance, (lat, lng))
+            tier = self.weight_tier(weight)
+            distances.append(distance)
+            names.append(zone["name"])
+            charges.append(math.nan if tier.get("confirm_with_store") else zone["charge"] * tier.get("multiplier", 1.0))
+        return {"distance_km": distances, "zone": names, "charge": charges}
+
+    def stats(self) -> dict:
+        return {
+            "polygon_zones": [zone["name"] for zone in self.polygons],
+            "radius_zones": [(zone["name"], zone.get("max_km")) for zone in self.bands],
+            "weight_tiers": [tier.get("name", tier["min_kg"]) for tier in self.weight_tiers],
+            "vectorised": HAS_NUMPY,
+        }
@@ -0,0 +1,203 @@
+"""Persistent distance-from-shop cache, seeded from a local table of Harare suburbs.
+
+Only distances are stored (keyed by normalised location); delivery charges
+are always derived from them locally. Fill the table ahead of time with
+
+    python distance_cache.py precompute            # Google Maps for every known suburb
+    python distance_cache.py precompute --offline  # copy the fixture estimates only
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from lazy_sqlite import LazyConnection
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_DB_PATH = os.getenv("DISTANCE_DB_PATH", "distances.db")
+DISTANCE_CACHE_TTL_SECONDS = float(os.getenv("DISTANCE_CACHE_TTL_SECONDS", str(30 * 86400)))
+DISTANCE_NEGATIVE_TTL_SECONDS = float(os.getenv("DISTANCE_NEGATIVE_TTL_SECONDS", "3600"))
+SUBURBS_FIXTURE_PATH = os.getenv(
+    "SUBURBS_FIXTURE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "harare_suburbs.json")
+)
+# Never call Google Maps; answer from the fixture and the cache only
+DISTANCE_OFFLINE = os.getenv("DISTANCE_OFFLINE", "false").lower() in ("1", "true", "yes")
+
+_LEADING_WORDS = re.compile(r"^(?:in|to|at|near|kuna|ku)\s+")
+_TRAILING_WORDS = re.compile(r"(?:\s+(?:harare|zimbabwe|zim))+$")
+
+
+def normalize_location(destination: str) -> str:
+    """Cache key: lowercase words only, without "in"/"to" prefixes or a trailing ", Harare"."""
+    text = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", destination.lower())).strip()
+    text = _LEADING_WORDS.sub("", text)
+    return _TRAILING_WORDS.sub("", text) or text
+
+
+def load_suburbs(path: str = SUBURBS_FIXTURE_PATH) -> list:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["suburbs"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Suburb fixture {path} not loaded: {e}")
+        return []
+
+
+def suburb_distances(suburbs) -> dict:
+    """Normalised suburb name or alias -> fixture distance in km."""
+    table = {}
+    for suburb in suburbs:
+        for name in [suburb["name"], *suburb.get("aliases", [])]:
+            table[normalize_location(name)] = suburb["distance_km"]
+    return table
+
+
+def suburb_coordinates(suburbs) -> dict:
+    """Normalised suburb name or alias -> (lat, lng)."""
+    table = {}
+    for suburb in suburbs:
+        for name in [suburb["name"], *suburb.get("aliases", [])]:
+            table[normalize_location(name)] = (suburb["lat"], suburb["lng"])
+    return table
+
+
+class DistanceCache:
+    """SQLite table of distances from the shop, backed by the suburb fixture.
+
+    Lookups check the table first (precomputed or previously measured rows),
+    then the fixture estimates. Measured rows expire after ``ttl_seconds``;
+    failed lookups are remembered for ``negative_ttl_seconds``.
+    """
+
+    def __init__(self, db_path: str = DISTANCE_DB_PATH, ttl_seconds: float = DISTANCE_CACHE_TTL_SECONDS,
+                 negative_ttl_seconds: float = DISTANCE_NEGATIVE_TTL_SECONDS, suburbs=None):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        suburbs = load_suburbs() if suburbs is None else suburbs
+        self.fixture = suburb_distances(suburbs)
+        self.places = suburb_coordinates(suburbs)
+        # Longest names first so "borrowdale brooke" wins over "borrowdale"
+        self._place_names = sorted(self.places, key=len, reverse=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fixture_hits = 0
+        self.misses = 0
+
+        self._db = LazyConnection(db_path, (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "CREATE TABLE IF NOT EXISTS distance_cache ("
+            " location TEXT PRIMARY KEY,"
+            " distance_km REAL,"
+            " source TEXT NOT NULL,"
+            " updated_at REAL NOT NULL) WITHOUT ROWID",
+        ))
+
+    @property
+    def _conn(self):
+        return self._db.get()
+
+    def get(self, destination):
+        """Return ``(found, distance_km)``; ``distance_km`` is ``None`` for a remembered failure."""
+        key = normalize_location(destination)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT distance_km, source, updated_at FROM distance_cache WHERE location = ?", (key,)
+            ).fetchone()
+        if row is not None:
+            distance_km, source, updated_at = row
+            ttl = self.ttl_seconds if distance_km is not None else self.negative_ttl_seconds
+            if source == "precomputed" or updated_at + ttl >= time.time():
+                self.hits += 1
+                return True, distance_km
+        if key in self.fixture:
+            self.fixture_hits += 1
+            return True, self.fixture[key]
+        self.misses += 1
+        return False, None
+
+    def coordinates(self, destination):
+        """(lat, lng) of a known suburb named by, or mentioned in, ``destination``; else ``None``."""
+        key = normalize_location(destination)
+        if key in self.places:
+            return self.places[key]
+        padded = f" {key} "
+        for name in self._place_names:
+            if f" {name} " in padded:
+                return self.places[name]
+        return None
+
+    def put(self, destination, distance_km, source="google"):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO distance_cache (location, distance_km, source, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(location) DO UPDATE SET distance_km = excluded.distance_km, "
+                "source = excluded.source, updated_at = excluded.updated_at",
+                (normalize_location(destination), distance_km, source, time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stored = self._conn.execute("SELECT source, COUNT(*) FROM distance_cache GROUP BY source").fetchall()
+        return {
+            "stored": dict(stored),
+            "fixture_locations": len(self.fixture),
+            "hits": self.hits,
+            "fixture_hits": self.fixture_hits,
+            "misses": self.misses,
+        }
+
+
+def precompute(cache: DistanceCache, suburbs, offline: bool = False, lookup=None):
+    """Store a distance for every suburb name and alias; returns ``(stored, failed)``."""
+    if not offline and lookup is None:
+        from googlemap_utils import get_distance_from_harare as lookup
+    stored = failed = 0
+    for suburb in suburbs:
+        if offline:
+            distance_km = suburb["distance_km"]
+        else:
+            distance_km = lookup(f"{suburb['name']}, Harare")
+            if distance_km is None or distance_km < 0:
+                logger.warning(f"No distance for {suburb['name']}; keeping fixture estimate")
+                failed += 1
+                distance_km = suburb["distance_km"]
+        for name in [suburb["name"], *suburb.get("aliases", [])]:
+            cache.put(name, distance_km, source="precomputed")
+        stored += 1
+    return stored, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the delivery distance cache")
+    parser.add_argument("--db", default=DISTANCE_DB_PATH)
+    parser.add_argument("--fixture", default=SUBURBS_FIXTURE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    fill = commands.add_parser("precompute", help="fill the cache for every known Harare suburb")
+    fill.add_argument("--offline", action="store_true", default=DISTANCE_OFFLINE,
+                      help="use the fixture estimates instead of Google Maps")
+    commands.add_parser("stats", help="show what the cache holds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    suburbs = load_suburbs(args.fixture)
+    cache = DistanceCache(args.db, suburbs=suburbs)
+    if args.command == "precompute":
+        started = time.perf_counter()
+        stored, failed = precompute(cache, suburbs, offline=args.offline)
+        print(f"📍 Stored {stored} suburbs ({failed} fell back to estimates) in {time.perf_counter() - started:.1f}s")
+    print(json.dumps(cache.stats(), indent=2))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
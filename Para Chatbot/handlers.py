@@ -3,10 +3,12 @@ import logging
 import time
 from config import OPENAI_API_KEY
 from utils import send_whatsapp_message
+from intent_router import IntentRouter
 
 # Setup
 openai.api_key = OPENAI_API_KEY
 logging.basicConfig(level=logging.INFO)
+intent_router = IntentRouter()
 
 def handle_message(sender: str, text: str):
     text_lower = text.lower()
@@ -14,14 +16,13 @@ def handle_message(sender: str, text: str):
 
     try:
         # Intent matching
-        if any(word in text_lower for word in ["order", "buy", "purchase"]):
+        intent = intent_router.classify(text)
+        if intent is not None and intent.intent == "order":
             reply = "Sure! What product would you like to order?"
-        elif any(word in text_lower for word in ["menu", "list", "options"]):
+        elif any(word in text_lower.split() for word in ["menu", "list", "options"]):
             reply = "We offer:\n- Beef\n- Chicken\n- Pork\nReply with your choice."
-        elif any(word in text_lower for word in ["hi", "hello", "hey"]):
-            reply = "Hi there! Welcome to Para Meats. How can I help you today?"
         else:
-            reply = get_gpt_response(text)
+            reply = (intent_router.respond(intent) if intent is not None else None) or get_gpt_response(text)
 
         send_whatsapp_message(sender, reply)
 
@@ -0,0 +1,169 @@
+import os
+import re
+import time
+from dataclasses import dataclass
+
+from store_hours import CLOSING_TIMES, OPENING_HOUR, greeting_for, harare_now, store_status
+
+SHOP_NAME = "Para Meats"
+# Same shops as the knowledge prompt (knowledge_manager.py)
+BRANCHES = [
+    {"name": "Main branch", "address": os.getenv("SHOP_ADDRESS", "182 Sam Nujoma Street, Avondale, Harare")},
+    {"name": "City Centre", "address": "Corner Kwame Nkrumah & Julius Nyerere Way, Harare"},
+    {"name": "City Meats", "address": "116 Mbuya Nehanda Street, Harare"},
+]
+
+# intent -> language -> keywords/phrases. "Whole" intents only fire when the
+# message is nothing but the keyword (plus punctuation/filler), so "hi, how much
+# is beef?" still reaches the catalogue and the model; "leading" intents must
+# open the message, so "where is my order" does not start a new one. "hours" and
+# "branch" match only question phrases anywhere, or a bare keyword as the whole message.
+INTENT_TABLES = {
+    "yes": {
+        "en": ["yes", "y", "yep", "yeah", "yea", "ok", "okay", "sure", "confirm", "confirmed", "correct", "go ahead"],
+        "sn": ["hongu", "ehe", "ehoo", "zvakanaka", "ndizvo"],
+    },
+    "no": {
+        "en": ["no", "n", "nope", "nah", "cancel", "stop", "not now"],
+        "sn": ["kwete", "aiwa", "ngazvimire"],
+    },
+    "greeting": {
+        "en": ["hi", "hello", "hey", "hie", "hola", "good morning", "good afternoon", "good evening", "howdy"],
+        "sn": ["mhoro", "mhoroi", "makadii", "wadii", "maswera sei", "mangwanani", "masikati", "manheru", "kwaziwai"],
+    },
+    "hours": {
+        "en": ["opening hours", "opening times", "trading hours", "business hours", "what time do you open",
+               "what time do you close", "when do you open", "when do you close", "are you open",
+               "do you open on", "what are your hours", "closing time"],
+        "sn": ["munovhura nguvai", "munovhara nguvai", "makavhura here", "muchavhura here"],
+    },
+    "branch": {
+        "en": ["where are you located", "where is your shop", "where is the shop", "where are your shops",
+               "where are your branches", "what is your address", "what's your address", "shop address",
+               "directions to your shop", "how do i get to you"],
+        "sn": ["shop yenyu iri kupi", "mune mabranch", "ndingakuwanai kupi"],
+    },
+    "order": {
+        "en": ["order", "place an order", "i want to order", "i would like to order", "i'd like to order",
+               "can i order", "i want to buy", "buy", "purchase"],
+        "sn": ["ndoda kuodha", "kuodha", "odha", "ndoda kutenga", "kutenga"],
+    },
+}
+# Bare words that only mean the intent when they are the whole message: "hours?" asks for opening
+# hours, "deliver within 2 hours" does not; "branches" does, "beef at your branch" does not
+WHOLE_MESSAGE_KEYWORDS = {
+    "hours": {"en": ["hours", "opening", "open today", "open on sunday", "times"]},
+    "branch": {"en": ["branch", "branches", "where are you", "location", "address", "directions"],
+               "sn": ["muri kupi"]},
+}
+WHOLE_MESSAGE_INTENTS = {"yes", "no", "greeting"}
+LEADING_INTENTS = {"order"}
+# Checked in this order; the first intent that matches wins
+INTENT_PRIORITY = ["yes", "no", "greeting", "hours", "branch", "order"]
+_FILLER = r"(?:\s+(?:there|team|guys|please|pls|sir|madam|maam|thanks|thank you|para meats|para))*"
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: str
+    language: str
+    keyword: str
+
+
+def _alternation(keywords):
+    # Longest first so "good morning" beats "good"
+    return "|".join(re.escape(k).replace(r"\ ", r"\s+") for k in sorted(keywords, key=len, reverse=True))
+
+
+class IntentRouter:
+    """Precompiled keyword router for intents that never need the model.
+
+    One regex per intent (alternation over its English and Shona keywords,
+    language reported from a named group) is tried in ``INTENT_PRIORITY``
+    order. Hits and time spent are counted per intent.
+    """
+
+    def __init__(self, tables: dict = None, priority: list = None):
+        tables = tables or INTENT_TABLES
+        self.priority = priority or INTENT_PRIORITY
+        self._patterns = {}
+        for intent in self.priority:
+            groups = "|".join(f"(?P<{lang}>{_alternation(words)})" for lang, words in tables[intent].items())
+            if intent in WHOLE_MESSAGE_INTENTS:
+                pattern = rf"^\W*(?:{groups}){_FILLER}\W*$"
+            elif intent in LEADING_INTENTS:
+                pattern = rf"^\W*(?:{groups})(?!\w)"
+            else:
+                pattern = rf"(?<!\w)(?:{groups})(?!\w)"
+                whole = WHOLE_MESSAGE_KEYWORDS.get(intent)
+                if whole:
+                    bare = "|".join(f"(?P<{lang}_whole>{_alternation(words)})" for lang, words in whole.items())
+                    pattern = rf"{pattern}|^\W*(?:{bare}){_FILLER}\W*$"
+            self._patterns[intent] = re.compile(pattern, re.IGNORECASE)
+        self.messages = 0
+        self.misses = 0
+        self._hits = {intent: 0 for intent in self.priority}
+        self._seconds = {intent: 0.0 for intent in [*self.priority, None]}
+
+    def classify(self, text: str, intents=None):
+        """Return the first matching ``IntentMatch`` (optionally only among ``intents``), else ``None``."""
+        started = time.perf_counter()
+        self.messages += 1
+        text = text.strip()
+        for intent in intents or self.priority:
+            match = self._patterns[intent].search(text)
+            if match:
+                group = next(name for name, value in match.groupdict().items() if value)
+                self._hits[intent] += 1
+                self._seconds[intent] += time.perf_counter() - started
+                return IntentMatch(intent, group.split("_")[0], match.group(group).lower())
+        self.misses += 1
+        self._seconds[None] += time.perf_counter() - started
+        return None
+
+    def is_yes(self, text: str) -> bool:
+        match = self.classify(text, ("yes", "no"))
+        return match is not None and match.intent == "yes"
+
+    def respond(self, match: IntentMatch, customer_name: str = None, now=None):
+        """Templated reply for informational intents; ``None`` for intents the caller acts on."""
+        now = now or harare_now()
+        name = f", {customer_name}" if customer_name else ""
+        if match.intent == "greeting":
+            if match.language == "sn":
+                return (f"Mhoro{name}! 👋 Tigamuchire ku{SHOP_NAME}. Bvunzai mitengo, mari yekutumira, "
+                        f"kana nyorai *order* kuti muodhe.")
+            return (f"{greeting_for(now)}{name}! 👋 Welcome to {SHOP_NAME}. Ask me for prices or delivery "
+                    f"costs, or type *order* to place an order.")
+        if match.intent == "hours":
+            return f"🕒 {store_status(now)}\n\n{weekly_hours()}"
+        if match.intent == "branch":
+            lines = [f"📍 {branch['name']}: {branch['address']}" for branch in BRANCHES]
+            return "\n".join(lines) + f"\n\n{store_status(now)}"
+        return None
+
+    def stats(self) -> dict:
+        intents = {}
+        for intent in self.priority:
+            hits = self._hits[intent]
+            intents[intent] = {
+                "hits": hits,
+                "hit_rate": round(hits / self.messages, 4) if self.messages else 0.0,
+                "avg_latency_us": round(self._seconds[intent] / hits * 1e6, 2) if hits else 0.0,
+            }
+        return {
+            "messages": self.messages,
+            "misses": self.misses,
+            "miss_avg_latency_us": round(self._seconds[None] / self.misses * 1e6, 2) if self.misses else 0.0,
+            "intents": intents,
+        }
+
+
+def weekly_hours() -> str:
+    lines = []
+    for day, (hour, minute) in CLOSING_TIMES.items():
+        if (hour, minute) == (0, 0):
+            lines.append(f"{day}: closed")
+        else:
+            lines.append(f"{day}: {OPENING_HOUR:02d}:00 – {hour}:{minute:02d}")
+    return "\n".join(lines)
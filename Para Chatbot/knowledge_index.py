@@ -0,0 +1,153 @@
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+from token_counter import encode_length
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+# Words that carry no retrieval signal in customer messages (English + Shona fillers)
+STOPWORDS = frozenset("""
+a an and are at be by can do does for from have how i in is it me much my of on or please the
+to we what when where which with you your ne na here ndi ndiri mune tine iri ku pa
+""".split())
+
+
+def tokenize(text: str):
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def chunk_text(text: str, max_tokens: int = 120):
+    """Split on blank lines / line breaks and pack whole lines into ~max_tokens chunks.
+
+    Line-oriented packing keeps CSV rows (one product per row) and scraped
+    paragraphs intact, which is what retrieval should return.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        line_tokens = encode_length(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class _EmbeddingIndex:
+    """Optional dense index over the same chunks (sentence-transformers, local model)."""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.vectors = []
+
+    def add(self, texts):
+        self.vectors.extend(self.model.encode(texts, normalize_embeddings=True).tolist())
+
+    def scores(self, query):
+        q = self.model.encode([query], normalize_embeddings=True)[0]
+        return [float(sum(a * b for a, b in zip(q, v))) for v in self.vectors]
+
+
+class KnowledgeIndex:
+    """Chunked BM25 index over knowledge text, with an optional embedding index.
+
+    Documents are appended incrementally (``add_document``) as knowledge is
+    loaded; ``search`` returns the best chunks for a message that fit inside a
+    token budget.
+    """
+
+    def __init__(self, chunk_tokens: int = 120, k1: float = 1.5, b: float = 0.75,
+                 embedding_model: str = None):
+        self.chunk_tokens = chunk_tokens
+        self.embedding_model = embedding_model
+        self.k1 = k1
+        self.b = b
+        self.chunks = []        # chunk text
+        self.chunk_sizes = []   # token count per chunk
+        self._lengths = []      # term count per chunk
+        self._postings = defaultdict(list)  # term -> [(chunk_id, tf)]
+        self._total_length = 0
+        self._embeddings = None
+        if embedding_model:
+            try:
+                self._embeddings = _EmbeddingIndex(embedding_model)
+            except ImportError:
+                self._embeddings = None
+
+    def add_document(self, text: str):
+        new_chunks = chunk_text(text, self.chunk_tokens)
+        for chunk in new_chunks:
+            chunk_id = len(self.chunks)
+            terms = tokenize(chunk)
+            for term, tf in Counter(terms).items():
+                self._postings[term].append((chunk_id, tf))
+            self.chunks.append(chunk)
+            self.chunk_sizes.append(encode_length(chunk))
+            self._lengths.append(len(terms))
+            self._total_length += len(terms)
+        if self._embeddings and new_chunks:
+            self._embeddings.add(new_chunks)
+        return len(new_chunks)
+
+    def clear(self):
+        self.__init__(self.chunk_tokens, self.k1, self.b, self.embedding_model)
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def bm25_scores(self, query: str):
+        scores = defaultdict(float)
+        n = len(self.chunks)
+        if not n:
+            return scores
+        avg_len = self._total_length / n or 1.0
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_len)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, top_k: int = 6, token_budget: int = 800):
+        """Return up to ``top_k`` chunks (best first) whose total size fits ``token_budget``."""
+        return self.search_with_size(query, top_k, token_budget)[0]
+
+    def search_with_size(self, query: str, top_k: int = 6, token_budget: int = 800):
+        """Like ``search`` but also returns the selected chunks' total token count (counted at index time)."""
+        scores = self.bm25_scores(query)
+        if self._embeddings and self.chunks:
+            # Hybrid: BM25 normalised to [0, 1] blended with cosine similarity
+            best = max(scores.values(), default=0.0) or 1.0
+            for chunk_id, sim in enumerate(self._embeddings.scores(query)):
+                scores[chunk_id] = 0.5 * scores.get(chunk_id, 0.0) / best + 0.5 * max(sim, 0.0)
+
+        selected, used = [], 0
+        for chunk_id in sorted(scores, key=scores.get, reverse=True):
+            if len(selected) >= top_k:
+                break
+            if scores[chunk_id] <= 0:
+                break
+            size = self.chunk_sizes[chunk_id]
+            if used + size > token_budget:
+                continue
+            selected.append(self.chunks[chunk_id])
+            used += size
+        return selected, used
+
+
+def default_index() -> KnowledgeIndex:
+    return KnowledgeIndex(
+        chunk_tokens=int(os.getenv("KNOWLEDGE_CHUNK_TOKENS", "120")),
+        embedding_model=os.getenv("KNOWLEDGE_EMBEDDING_MODEL") or None,
+    )
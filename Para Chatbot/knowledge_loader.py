@@ -1,18 +1,26 @@
 
-import pandas as pd
-import requests
-from io import BytesIO
-import gspread
-from bs4 import BeautifulSoup
-from oauth2client.service_account import ServiceAccountCredentials
+# pandas, gspread, oauth2client and bs4 are imported inside the loaders that need
+# them, so importing this module costs nothing at app startup
+from price_catalogue import PriceCatalogue
 
 def load_csv(filepath):
+    import pandas as pd
     return pd.read_csv(filepath)
 
 def load_excel(filepath):
+    import pandas as pd
     return pd.read_excel(filepath)
 
+def load_price_catalogue(filepath):
+    import pandas as pd
+    # The sheet has no header row: column A is a section heading or cut, column B the retail price/kg
+    df = pd.read_excel(filepath, header=None, usecols=[0, 1])
+    return PriceCatalogue.from_rows(df.itertuples(index=False, name=None))
+
 def load_google_sheet(sheet_url, creds_json_path):
+    import gspread
+    import pandas as pd
+    from oauth2client.service_account import ServiceAccountCredentials
     scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
     creds = ServiceAccountCredentials.from_json_keyfile_name(creds_json_path, scope)
     client = gspread.authorize(creds)
@@ -21,6 +29,8 @@ def load_google_sheet(sheet_url, creds_json_path):
     return pd.DataFrame(data)
 
 def scrape_website(url):
+    import requests
+    from bs4 import BeautifulSoup
     response = requests.get(url)
     if response.status_code != 200:
         raise Exception(f"Failed to fetch {url}")
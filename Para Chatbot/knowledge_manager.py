@@ -1,6 +1,17 @@
+import os
+from knowledge_index import default_index
+
+# Retrieval limits for knowledge injected into each prompt
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "6"))
+KNOWLEDGE_TOKEN_BUDGET = int(os.getenv("KNOWLEDGE_TOKEN_BUDGET", "800"))
+
+
 class KnowledgeManager:
     def __init__(self):
         self.knowledge = ""
+        self.index = default_index()
+        # Bumped whenever the prompt changes so its token count is recomputed once
+        self.prompt_version = 0
         self.prompt = """You are a friendly and professional customer service agent for Para Meats. Only help clients with information relating to Para Meats.
 1. Company Information
 Business Name: Para Meats
@@ -110,16 +121,31 @@ For special offers or bulk orders, contact us directly at the numbers above.
     def update_knowledge(self, new_knowledge: str):
         if new_knowledge:
             if self.knowledge:
-                self.knowledge += "\\n" + new_knowledge
+                self.knowledge += "\n" + new_knowledge
             else:
                 self.knowledge = new_knowledge
+            self.index.add_document(new_knowledge)
 
     def get_knowledge(self) -> str:
         return self.knowledge
 
+    def get_relevant_knowledge(self, query: str, top_k: int = None, token_budget: int = None) -> str:
+        """Only the knowledge chunks relevant to ``query``, within the token budget."""
+        return self.relevant_knowledge(query, top_k, token_budget)[0]
+
+    def relevant_knowledge(self, query: str, top_k: int = None, token_budget: int = None):
+        """(text, tokens) for the relevant chunks; chunk sizes were counted when indexed."""
+        chunks, tokens = self.index.search_with_size(
+            query,
+            top_k=top_k or KNOWLEDGE_TOP_K,
+            token_budget=token_budget or KNOWLEDGE_TOKEN_BUDGET,
+        )
+        return "\n".join(chunks), tokens
+
     def update_prompt(self, new_prompt: str):
         if new_prompt:
             self.prompt = new_prompt
+            self.prompt_version += 1
 
     def get_prompt(self) -> str:
         return self.prompt
@@ -0,0 +1,36 @@
+import sqlite3
+import threading
+
+
+class LazyConnection:
+    """SQLite connection opened (and its schema set up) on first use rather than at construction.
+
+    The stores main.py builds at import time (outbox, seen messages, sessions,
+    distances) each hold one, so ``import main`` creates no database files;
+    ``close`` before first use is a no-op.
+    """
+
+    def __init__(self, db_path: str, setup=(), **connect_kwargs):
+        self.db_path = db_path
+        self.setup = setup
+        self.connect_kwargs = {"check_same_thread": False, "isolation_level": None, **connect_kwargs}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def get(self) -> sqlite3.Connection:
+        conn = self._conn
+        if conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = sqlite3.connect(self.db_path, **self.connect_kwargs)
+                    for statement in self.setup:
+                        conn.execute(statement)
+                    self._conn = conn
+                conn = self._conn
+        return conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,137 @@
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+from distance_cache import load_suburbs
+
+logger = logging.getLogger(__name__)
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+LOCATION_CACHE_SIZE = int(os.getenv("LOCATION_CACHE_SIZE", "4096"))
+# Pipes NER does not need (en_core_web_* NER has its own tok2vec)
+UNUSED_PIPES = ["parser", "tagger", "morphologizer", "lemmatizer", "attribute_ruler", "senter"]
+LOCATION_LABELS = {"GPE", "LOC", "FAC"}
+
+# Words that suggest the message talks about a place even when no known suburb is named
+_DELIVERY_CUES = re.compile(
+    r"\b(?:deliver\w*|location|address|located|live|stay|area|suburb|send (?:it )?to|bring (?:it )?to|"
+    r"drop (?:it )?(?:off )?(?:at|in)|ndinogara|ndiri ku\w+|kumba|kuna)\b",
+    re.IGNORECASE,
+)
+# "12 Fife Avenue", "Samora Machel Ave"; everyday words ("way", "close") only count after a house number
+_STREET = re.compile(
+    r"\b\d+\s+[a-z]+(?:\s+[a-z]+)?\s+(?:street|st|road|rd|avenue|ave|drive|dr|close|crescent|cres|way|lane)\b"
+    r"|\b[a-z]+(?:\s+[a-z]+)?\s+(?:street|road|avenue|ave|drive|crescent)\b",
+    re.IGNORECASE,
+)
+# Last resort when NER finds nothing: the words after "deliver to", "I stay in", ...
+_CUE_TARGET = re.compile(
+    r"\b(?:deliver(?:y)? to|send (?:it )?to|bring (?:it )?to|(?:i )?(?:stay|live) (?:in|at)|located (?:in|at)|"
+    r"address is)\s+([a-z][a-z0-9 ]{1,40}?)(?:\s+(?:please|pls|today|tomorrow|thanks)\b|[?.!,]|$)",
+    re.IGNORECASE,
+)
+
+_nlp = None
+_nlp_lock = threading.Lock()
+_nlp_failed = False
+
+
+def _build_gazetteer(suburbs):
+    names = {}
+    for suburb in suburbs:
+        for name in [suburb["name"], *suburb.get("aliases", [])]:
+            names[name.lower()] = suburb["name"]
+    if not names:
+        return names, None
+    alternation = "|".join(re.escape(name).replace(r"\ ", r"\s+") for name in sorted(names, key=len, reverse=True))
+    return names, re.compile(rf"(?<!\w)({alternation})(?!\w)", re.IGNORECASE)
+
+
+_GAZETTEER, _GAZETTEER_RE = _build_gazetteer(load_suburbs())
+
+stats = {"calls": 0, "gazetteer_hits": 0, "skipped": 0, "ner_runs": 0, "ner_seconds": 0.0, "model_load_seconds": 0.0}
+
+
+def get_nlp():
+    """Load the spaCy model on first use, once per process, with only the NER pipe active."""
+    global _nlp, _nlp_failed
+    if _nlp is not None or _nlp_failed:
+        return _nlp
+    with _nlp_lock:
+        if _nlp is None and not _nlp_failed:
+            started = time.perf_counter()
+            try:
+                import spacy
+                _nlp = spacy.load(SPACY_MODEL, exclude=UNUSED_PIPES)
+                logger.info(f"🧭 spaCy {SPACY_MODEL} loaded with pipes {_nlp.pipe_names}")
+            except (ImportError, OSError) as e:
+                _nlp_failed = True
+                logger.error(f"spaCy model {SPACY_MODEL} unavailable, location NER disabled: {e}")
+            stats["model_load_seconds"] = round(time.perf_counter() - started, 3)
+    return _nlp
+
+
+def find_known_location(text: str):
+    """``(canonical suburb, start, end)`` for the first known suburb in ``text``, or ``None``."""
+    if _GAZETTEER_RE is None:
+        return None
+    match = _GAZETTEER_RE.search(text)
+    if not match:
+        return None
+    return _GAZETTEER[re.sub(r"\s+", " ", match.group(1).lower())], match.start(1), match.end(1)
+
+
+def needs_ner(text: str) -> bool:
+    return bool(_DELIVERY_CUES.search(text) or _STREET.search(text))
+
+
+@lru_cache(maxsize=LOCATION_CACHE_SIZE)
+def _detect(text: str):
+    known = find_known_location(text)
+    if known:
+        stats["gazetteer_hits"] += 1
+        return known[0]
+    if not needs_ner(text):
+        stats["skipped"] += 1
+        return None
+    nlp = get_nlp()
+    if nlp is not None:
+        started = time.perf_counter()
+        doc = nlp(text)
+        stats["ner_runs"] += 1
+        stats["ner_seconds"] += time.perf_counter() - started
+        for ent in doc.ents:
+            if ent.label_ in LOCATION_LABELS:
+                return ent.text
+    street = _STREET.search(text)
+    if street:
+        return street.group(0)
+    target = _CUE_TARGET.search(text)
+    return target.group(1) if target else None
+
+
+def extract_delivery_location(text: str):
+    """Place named in ``text`` (canonical suburb name when known), or ``None``.
+
+    Known suburbs are found by the gazetteer without NER; spaCy only runs
+    when the text looks like it mentions a place, and results are memoised.
+    """
+    stats["calls"] += 1
+    if not text:
+        return None
+    return _detect(re.sub(r"\s+", " ", text.strip()))
+
+
+def location_stats() -> dict:
+    info = _detect.cache_info()
+    return {
+        **stats,
+        "ner_seconds": round(stats["ner_seconds"], 3),
+        "model_loaded": _nlp is not None,
+        "memo_hits": info.hits,
+        "memo_size": info.currsize,
+        "gazetteer_names": len(_GAZETTEER),
+    }
@@ -1,29 +1,42 @@
-from fastapi import FastAPI, Request, BackgroundTasks, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
-from models import Order, Base, engine, SessionLocal
-from knowledge_loader import load_csv, load_excel, load_google_sheet, scrape_website
-from openai import OpenAI
-import os, requests
+from models import SessionLocal
+from migrations import migrate
+import analytics
+from knowledge_loader import load_csv, load_excel, load_google_sheet, scrape_website, load_price_catalogue
+import os
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi.logger import logger as fastapi_logger
 from knowledge_manager import KnowledgeManager
-from fpdf import FPDF
-import time
-from whatsapp_api import send_order_confirmation
-from datetime import datetime, timedelta
+from whatsapp_api import order_confirmation_payload, close_async_client, whatsapp_stats
+from datetime import date, datetime, timedelta
+from typing import Optional
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-import pytz
-import googlemaps
-import googlemap_utils
-from fastapi import FastAPI, Query
-from googlemap_utils import get_distance_from_harare
+from fastapi import Query
+from delivery_service import DeliveryQuoteService, DEFAULT_QUOTE_WEIGHT_KG
+from distance_cache import DistanceCache
+from route_planner import plan_routes, orders_for_day, delivery_date, MAX_STOPS_PER_VEHICLE
 import re
-import spacy
-from location_detector import extract_delivery_location
-from whatsapp_api import send_whatsapp_message, send_whatsapp_typing_indicator, send_whatsapp_file
+from location_detector import extract_delivery_location, location_stats
+from outbound import OutboundScheduler, PRIORITY_AGENT, PRIORITY_NOTIFICATION
+from pipeline import MessagePipeline, QueueFullError
+from dedup import make_seen_message_cache
+from price_catalogue import PriceCatalogue
+from session_store import make_session_store
+from conversation_memory import ConversationMemory
+from token_counter import count_message_tokens, static_tokens
+from prompt_assembler import PromptAssembler, PromptCacheMetrics
+from store_hours import harare_now, greeting_for, store_status
+from intent_router import IntentRouter
+from order_flow import OrderFlow, OrderState
+from order_extractor import OrderExtractor
+from order_writer import OrderWriter
+from order_queries import export_orders, order_page, order_to_dict
+import transcript
 
 
 # Load environment variables
@@ -40,15 +53,88 @@ VERIFY_TOKEN = os.getenv("VERIFY_TOKEN")
 LIVE_AGENT_WHATSAPP_NUMBER = os.getenv("LIVE_AGENT_WHATSAPP_NUMBER")
 LIVE_AGENT_PHONE_NUMBER = os.getenv("LIVE_AGENT_PHONE_NUMBER")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-# Initialize DB
-Base.metadata.create_all(bind=engine)
+# Async message pipeline sizing
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "64"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+
+# Excel price list backing the direct price answers
+PRICE_LIST_PATH = os.getenv("PRICE_LIST_PATH", "./uploads/Copy of PRICE LIST new(1).xlsx")
+
+# Webhook de-duplication (Meta retries slow deliveries with the same message id)
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "memory")  # "memory" or "sqlite"
+DEDUP_TTL_SECONDS = float(os.getenv("DEDUP_TTL_SECONDS", "86400"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "100000"))
+DEDUP_DB_PATH = os.getenv("DEDUP_DB_PATH", "dedup.db")
+
+_openai_client = None
+
+
+def get_openai_client():
+    """The OpenAI SDK is imported on first use, not at startup."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import AsyncOpenAI
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
 
 # Configure logging to use FastAPI's logger (which integrates with uvicorn)
 fastapi_logger.setLevel(logging.INFO)
 logger = fastapi_logger
 
-app = FastAPI()
+pipeline = MessagePipeline(workers=PIPELINE_WORKERS, max_queue=PIPELINE_QUEUE_SIZE)
+# The SQLite-backed stores below open their files on first use (lazy_sqlite), so importing this module
+# touches no disk; lifespan starts the workers and closes everything on shutdown
+# Every outbound WhatsApp send: rate-limited per number/recipient, prioritised, durable
+outbound = OutboundScheduler(
+    on_sent=lambda recipient, text, message_id: order_writer.log_message(recipient, "out", text, message_id)
+)
+# Orders and the chat log are group-committed by one writer instead of a commit per request
+order_writer = OrderWriter()
+# Delivery quotes shared by /calculate-delivery and the chat path; distances persist across restarts
+distance_cache = DistanceCache()
+delivery_quotes = DeliveryQuoteService(store=distance_cache)
+seen_messages = make_seen_message_cache(
+    DEDUP_BACKEND, db_path=DEDUP_DB_PATH, ttl_seconds=DEDUP_TTL_SECONDS, max_entries=DEDUP_MAX_ENTRIES
+)
+
+
+async def _load_price_catalogue():
+    global price_catalogue
+    if os.path.exists(PRICE_LIST_PATH):
+        try:
+            price_catalogue = await asyncio.to_thread(load_price_catalogue, PRICE_LIST_PATH)
+            logger.info(f"💲 Price catalogue loaded with {len(price_catalogue)} entries")
+        except Exception as e:
+            logger.error(f"Failed to load price catalogue: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup/migrations happen here, not at import, so the app object is ready immediately
+    await asyncio.to_thread(migrate)
+    await order_writer.start()
+    await outbound.start()
+    await pipeline.start()
+    # pandas + the Excel parse run in the background; price questions fall through to the model until then
+    catalogue_task = asyncio.create_task(_load_price_catalogue())
+    yield
+    catalogue_task.cancel()
+    await pipeline.stop()
+    # Whatever cannot be sent in time stays in the outbox and is replayed on next start
+    await outbound.stop()
+    # After the outbound drain, so transcript lines for its last sends and orders confirmed
+    # by the last jobs are committed before the connection closes
+    await order_writer.stop()
+    for store in (session_store, customer_names, pending_orders, latest_delivery_data, conversation_summaries):
+        store.close()
+    distance_cache.close()
+    seen_messages.close()
+    await close_async_client()
+    if _openai_client is not None:
+        await _openai_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 # Startup check for environment variables
 if not ACCESS_TOKEN:
     logger.warning("WARNING: ACCESS_TOKEN environment variable is not set. WhatsApp messaging will not work.")
@@ -61,6 +147,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 # Dependency to get DB session
 def get_db():
@@ -71,49 +158,39 @@ def get_db():
         db.close()
         
 knowledge_manager = KnowledgeManager()
-
-
-# In-memory session store for chat history per user
-session_store = {}
-customer_names = {}  # Separate dictionary for customer names
-# In-memory store for pending orders per user before confirmation
-pending_orders = {}
-
-ORDER_STEPS = [
-    "item", "quantity", "portion", "price", "delivery_address",
-    "delivery_time", "payment_method", "confirmation"
-]
-# Maximum number of messages to keep in history per user
-MAX_HISTORY_LENGTH = 10
+prompt_assembler = PromptAssembler(knowledge_manager)
+prompt_cache_metrics = PromptCacheMetrics()
+price_catalogue = PriceCatalogue()
+intent_router = IntentRouter()
+
+
+# Per-sender state, bounded and optionally shared across workers (SESSION_BACKEND=sqlite)
+session_store = make_session_store("chat_history")
+customer_names = make_session_store("customer_names")  # Separate store for customer names
+# Pending orders per user before confirmation (OrderState objects; JSON in the SQLite backend)
+pending_orders = make_session_store("pending_orders", encode=OrderState.to_dict, decode=OrderState.from_dict)
+order_flow = OrderFlow(lambda: price_catalogue)
+order_extractor = OrderExtractor(order_flow, get_openai_client)
+# Fold older turns into the summary once a chat has this many messages, even if it is under the token limit
+SUMMARIZE_AFTER_MESSAGES = int(os.getenv("SUMMARIZE_AFTER_MESSAGES", "20"))
 
 # Token limit threshold to trigger summarization (example: 3000 tokens)
 TOKEN_LIMIT_THRESHOLD = 3000  # Requirement: Token counting accuracy
 
-#Cache Locations to Reduce API Calls
-location_cache = {}
 #Cache latest delivery info per user
-latest_delivery_data = {}
-
+latest_delivery_data = make_session_store("latest_delivery")
 
-# Import tiktoken for token counting
-try:
-    import tiktoken
-    # Use explicit encoding for GPT-4 models
-    tokenizer = tiktoken.get_encoding("cl100k_base")
-except ImportError:
-    tokenizer = None
 
 def count_tokens(messages):
-    if not tokenizer:
-        return 0
     num_tokens = 0
     for message in messages:
-        for key, value in message.items():
-            num_tokens += len(tokenizer.encode(value))
+        # History entries carry their count from when they were appended
+        if "tokens" in message:
+            num_tokens += message["tokens"]
+        else:
+            num_tokens += count_message_tokens(message.get("role", ""), message.get("content", ""))
     return num_tokens  # Requirement: Token counting accuracy
 
-import asyncio
-
 async def summarize_messages(messages):
     summary_prompt = "Summarize the following conversation briefly, keeping important details:\n\n"
     conversation_text = ""
@@ -124,7 +201,7 @@ async def summarize_messages(messages):
     summary_prompt += conversation_text
 
     try:
-        response = client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-4.1-nano",
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that summarizes conversations."},
@@ -138,10 +215,20 @@ async def summarize_messages(messages):
     except Exception as e:
         logger.error(f"Summarization error: {e}")
         return None
-    
-#Set the Time Zone    
-zimbabwe_time = datetime.now(pytz.timezone("Africa/Harare"))
-current_hour = zimbabwe_time.hour
+
+
+# Keep this many recent turns verbatim when older ones are folded into the summary
+SUMMARY_KEEP_RECENT = int(os.getenv("SUMMARY_KEEP_RECENT", "4"))
+
+conversation_summaries = make_session_store("conversation_summaries")
+conversation = ConversationMemory(
+    session_store,
+    conversation_summaries,
+    summarize=summarize_messages,
+    token_threshold=TOKEN_LIMIT_THRESHOLD,
+    summarize_after=SUMMARIZE_AFTER_MESSAGES,
+    keep_recent=SUMMARY_KEEP_RECENT,
+)
 
 @app.get("/")
 async def verify_webhook(request: Request):
@@ -156,7 +243,7 @@ async def verify_webhook(request: Request):
     return JSONResponse(content={"error": "Verification failed"}, status_code=403)
 
 @app.post("/")
-async def receive_message(request: Request, background_tasks: BackgroundTasks):
+async def receive_message(request: Request):
     try:
         data = await request.json()
         logger.info(f"📥 Incoming data: {data}")
@@ -180,14 +267,29 @@ async def receive_message(request: Request, background_tasks: BackgroundTasks):
         message = messages[0]
         user_text = message.get("text", {}).get("body", "")
         sender_id = message.get("from", "")
+        message_id = message.get("id")
+
+        # Drop Meta's retries of a message we've already queued
+        if message_id and seen_messages.check_and_add(message_id):
+            logger.info(f"🔁 Duplicate delivery {message_id} from {sender_id} ignored")
+            return {"status": "duplicate"}
         
         # NEW: Get customer name from contacts
         customer_name = contact_names.get(sender_id)
         
         logger.info(f"👤 From: {sender_id} ({customer_name or 'Unknown'}) | 📝 Text: {user_text}")
 
-        # Pass customer name to your background task
-        background_tasks.add_task(handle_message, user_text, sender_id, customer_name)
+        # Hand off to the worker pool, serialised per sender; a full queue asks Meta to retry later
+        try:
+            pipeline.submit(sender_id, handle_message, user_text, sender_id, customer_name)
+        except QueueFullError:
+            logger.warning(f"🚧 Pipeline full, deferring message from {sender_id}")
+            if message_id:
+                seen_messages.forget(message_id)  # let Meta's retry through
+            return JSONResponse(content={"status": "busy"}, status_code=503)
+        sent_at = message.get("timestamp")
+        order_writer.log_message(sender_id, "in", user_text, message_id,
+                                 datetime.utcfromtimestamp(int(sent_at)) if sent_at else None)
         return {"status": "received"}  # Fast return
 
     except Exception as e:
@@ -195,56 +297,32 @@ async def receive_message(request: Request, background_tasks: BackgroundTasks):
         return {"status": "error"}
 
 
-def get_prompt_for_step(step, order=None):
-    if order is None:
-        order = {}
-    prompts = {
-        "full_name": "👤 What's your full name?",
-        "contact_number": "📞 Please provide your contact number.",
-        "item": "🍖 What would you like to order? (e.g., Beef, Chicken, Fish, Maguru)",
-        "quantity": "📦 How much do you need? (e.g., 5kg, 10kg)",
-        "portion": "🔪 Preferred cut or portion? (e.g., steak, bones, standard)",
-        "delivery_address": "📍 Please provide your delivery location (e.g., 8233 Glenview 8)",
-        "delivery_time": "🕒 What time should we deliver? (Morning, Afternoon, Evening)",
-        "payment_method": "💳 How will you pay? (Cash, Ecocash, ZIPIT)",
-        "confirmation": (
-            f"✅ Please confirm your order:\n"
-            f"- Name: {order.get('full_name', '')}\n"
-            f"- Phone: {order.get('contact_number', '')}\n"
-            f"- Meat: {order.get('item', '')}\n"
-            f"- Quantity: {order.get('quantity', '')}kg\n"
-            f"- Cut: {order.get('portion', '')}\n"
-            f"- Address: {order.get('delivery_address', '')}\n"
-            f"- Time: {order.get('delivery_time', '')}\n"
-            f"- Payment: {order.get('payment_method', '')}\n\n"
-            "Reply *yes* to confirm or *no* to cancel."
-        )
-    }
-    return prompts.get(step, "Please provide the required info.")
-
-def save_order_to_db(phone: str, data: dict):
-    db = SessionLocal()
-    order = Order(
-        customer_name=None,
-        phone_number=phone,
-        meat_type=data.get("item"),
-        price_option=data.get("price"),
-        quantity=data.get("quantity"),
-        custom_cuts=data.get("portion"),
-        payment_method=data.get("payment_method"),
-        delivery_time=data.get("delivery_time"),
-        delivery_address=data.get("delivery_address")
+async def save_order(phone: str, order: OrderState):
+    """Persist a confirmed order; returns once the group commit holding it is on disk."""
+    record = order.as_record()
+    return await order_writer.save_order(
+        phone,
+        items=[
+            {"product": item.product, "grade": item.grade, "cut": item.cut, "quantity": f"{item.kg:g}kg",
+             "quantity_kg": item.kg, "price": item.price}
+            for item in order.items
+        ],
+        customer_name=order.customer_name,
+        price_option=record["price"],
+        total_price=order.total_price,
+        payment_method=order.payment_method,
+        delivery_time=order.delivery_time,
+        delivery_date=delivery_date(order.delivery_time),
+        delivery_address=order.delivery_address,
     )
-    db.add(order)
-    db.commit()
-    db.refresh(order)
-    db.close()
-    return order
 
 
-def handle_message(user_text, sender_id, customer_name=None):
+async def handle_message(user_text, sender_id, customer_name=None):
+    global price_catalogue
     try:
-        user_text = user_text.strip().lower()
+        # Matching uses the lowercased text; order answers keep the customer's casing (e.g. the address)
+        text = user_text.strip()
+        user_text = text.lower()
 
         # Store customer name in separate dictionary if provided
         if customer_name:
@@ -257,146 +335,152 @@ def handle_message(user_text, sender_id, customer_name=None):
 
         if sender_id in pending_orders:
             order = pending_orders[sender_id]
-            step_index = order.get("current_step", 0)
 
-            if ORDER_STEPS[step_index] == "confirmation":
-                if user_text in ["yes", "y", "confirm"]:
+            if order.step == "confirmation":
+                if intent_router.is_yes(user_text):
                     # Add customer name to order before saving
                     if customer_name:
-                        order["customer_name"] = customer_name
-                    
-                    order_obj = save_order_to_db(sender_id, order)
-                    
+                        order.customer_name = customer_name
+                    record = order.as_record()
+
+                    # Only say "confirmed" once the order is committed; a failed save leaves it pending
+                    order_obj = await save_order(sender_id, order)
+                    order_flow.complete(order)
+
                     # Personalized confirmation message
                     confirmation_msg = f"✅ Your order has been confirmed{', ' + customer_name if customer_name else ''}. Thank you!"
-                    send_whatsapp_message(sender_id, confirmation_msg)
+                    outbound.send_text(sender_id, confirmation_msg)
 
                     # Send to agent with customer name
                     if LIVE_AGENT_WHATSAPP_NUMBER:
+                        lines = "\n".join(f"- {line}" for line in record["lines"])
                         forward_message = (
                             f"New order from {customer_name or sender_id} ({sender_id}):\n"
-                            f"Product: {order.get('item')}\n"
-                            f"Quantity: {order.get('quantity')}\n"
-                            f"Portion: {order.get('portion')}\n"
-                            f"Price: {order.get('price')}\n"
-                            f"Delivery: {order.get('delivery_address')} at {order.get('delivery_time')}\n"
-                            f"Payment: {order.get('payment_method')}"
+                            f"{lines}\n"
+                            f"Total: {record['price']}\n"
+                            f"Delivery: {record['delivery_address']} ({record['delivery_time']})\n"
+                            f"Payment: {record['payment_method']}"
                         )
-                        send_whatsapp_message(LIVE_AGENT_WHATSAPP_NUMBER, forward_message)
+                        outbound.send_text(LIVE_AGENT_WHATSAPP_NUMBER, forward_message, PRIORITY_AGENT, coalesce=True)
 
                     # Send PDF receipt
                     try:
-                        pdf_filename = generate_receipt_pdf(order_obj)
-                        send_whatsapp_file(sender_id, pdf_filename)
+                        from receipts import generate_receipt_pdf
+                        pdf_filename = await asyncio.to_thread(generate_receipt_pdf, order_obj)
+                        outbound.send_file(sender_id, pdf_filename)
                     except Exception as e:
                         logger.error(f"PDF receipt error: {e}")
 
                     del pending_orders[sender_id]
-                else:
-                    send_whatsapp_message(sender_id, "❌ Order cancelled.")
+                elif intent_router.classify(user_text, ("no",)) or order_flow.is_cancel(user_text):
+                    order_flow.cancel(order)
+                    outbound.send_text(sender_id, "❌ Order cancelled.")
                     del pending_orders[sender_id]
+                else:
+                    outbound.send_text(sender_id, order_flow.prompt(order))
                 return
-            
-            latest_delivery_data[sender_id] = {
-                "location": order["delivery_address"],
-                "weight": float(order.get("quantity", 1))
-            }
-
-            # Save response for current step
-            order[ORDER_STEPS[step_index]] = user_text
-            order["current_step"] += 1
-
-            if order["current_step"] < len(ORDER_STEPS):
-                next_step = ORDER_STEPS[order["current_step"]]
-                prompt = get_prompt_for_step(next_step, order)
-                send_whatsapp_message(sender_id, prompt)
-            else:
-                # All steps completed – proceed to confirmation
-                confirmation_msg = get_prompt_for_step("confirmation", order)
-                send_whatsapp_message(sender_id, confirmation_msg)
-
-
-            if user_text.startswith("order"):
-                        pending_orders[sender_id] = {"current_step": 0}
-                        # Add customer name to pending order
-                        if customer_name:
-                            pending_orders[sender_id]["customer_name"] = customer_name
-                        
-                        # Personalized welcome message
-                        welcome_msg = f"Welcome to Para Meats{', ' + customer_name if customer_name else ''}! 🥩 Let's start your order."
-                        send_whatsapp_message(sender_id, welcome_msg)
-                        send_whatsapp_message(sender_id, get_prompt_for_step("item"))
-                        return
 
+            if order_flow.is_cancel(user_text):
+                order_flow.cancel(order)
+                del pending_orders[sender_id]
+                outbound.send_text(sender_id, "❌ Order cancelled.")
+                return
 
+            # Parse the answer for the current step and ask the next question (assign back so shared backends persist it)
+            reply = order_flow.handle(order, text)
+            pending_orders[sender_id] = order
+            if order.delivery_address and order.items:
+                latest_delivery_data[sender_id] = {"location": order.delivery_address, "weight": order.total_kg}
+            outbound.send_text(sender_id, reply)
+            return
 
         # Knowledge integration (CSV, Excel, site scraping, prompts)
         if "load csv" in user_text:
             file = "your_file.csv"
             if os.path.exists(file):
-                df = load_csv(file)
+                df = await asyncio.to_thread(load_csv, file)
                 knowledge_manager.update_knowledge(df.to_csv(index=False))
-                send_whatsapp_message(sender_id, f"📄 CSV loaded with {len(df)} rows.")
+                outbound.send_text(sender_id, f"📄 CSV loaded with {len(df)} rows.")
             else:
-                send_whatsapp_message(sender_id, "❗ CSV not found.")
+                outbound.send_text(sender_id, "❗ CSV not found.")
             return
 
         if "load excel" in user_text:
-            file = "./uploads/Para Price list .xlsx"
+            file = PRICE_LIST_PATH
             if os.path.exists(file):
-                df = load_excel(file)
+                df = await asyncio.to_thread(load_excel, file)
                 knowledge_manager.update_knowledge(df.to_csv(index=False))
-                send_whatsapp_message(sender_id, f"📊 Excel loaded with {len(df)} rows.")
+                price_catalogue = await asyncio.to_thread(load_price_catalogue, file)
+                outbound.send_text(
+                    sender_id, f"📊 Excel loaded with {len(df)} rows ({len(price_catalogue)} priced items)."
+                )
             else:
-                send_whatsapp_message(sender_id, "❗ Excel file not found.")
+                outbound.send_text(sender_id, "❗ Excel file not found.")
             return
 
         if "scrape site" in user_text:
             try:
-                content = scrape_website("https://parameats.co.zw")
+                content = await asyncio.to_thread(scrape_website, "https://parameats.co.zw")
                 knowledge_manager.update_knowledge(content)
-                send_whatsapp_message(sender_id, f"🌐 Website scraped successfully.")
+                outbound.send_text(sender_id, f"🌐 Website scraped successfully.")
             except Exception as e:
-                send_whatsapp_message(sender_id, f"❌ Scrape failed: {e}")
+                outbound.send_text(sender_id, f"❌ Scrape failed: {e}")
             return
 
         if user_text.startswith("load prompt"):
             new_prompt = user_text[len("load prompt"):].strip()
             if new_prompt:
                 knowledge_manager.update_prompt(new_prompt)
-                send_whatsapp_message(sender_id, "✅ Prompt updated.")
+                outbound.send_text(sender_id, "✅ Prompt updated.")
             else:
-                send_whatsapp_message(sender_id, "❗ No prompt provided.")
+                outbound.send_text(sender_id, "❗ No prompt provided.")
             return
                     
-        location = extract_delivery_location(user_text)
+        # Greetings, opening hours, branch info and new orders never need the model
+        intent = intent_router.classify(user_text)
+        # "5kg beef steak to Glen View tomorrow morning, ecocash" is an order even without the keyword
+        starts_order = (intent is not None and intent.intent == "order") or (
+            intent is None and order_extractor.looks_like_order(user_text)
+        )
+        if starts_order:
+            # Fill whatever the first message already says; the flow only asks for the rest
+            new_order, first_prompt = await order_extractor.start(text, customer_name)
+            pending_orders[sender_id] = new_order
+
+            # Personalized welcome message
+            welcome_msg = f"Welcome to Para Meats{', ' + customer_name if customer_name else ''}! 🥩 Let's start your order."
+            outbound.send_text(sender_id, welcome_msg)
+            outbound.send_text(sender_id, first_prompt)
+            return
+        if intent is not None:
+            reply = intent_router.respond(intent, customer_name, harare_now())
+            if reply:
+                outbound.send_text(sender_id, reply)
+                return
+
+        # Price / availability questions answered straight from the catalogue
+        catalogue_reply = price_catalogue.answer(user_text)
+        if catalogue_reply:
+            outbound.send_text(sender_id, catalogue_reply)
+            return
+
+        location = await asyncio.to_thread(extract_delivery_location, user_text)
         if location:
                 try:
-                    # Check cache first
-                    if location in location_cache:
-                        result = location_cache[location]
-                    else:
-                        response = requests.get(
-                            "http://localhost:8000/calculate-delivery",
-                            params={"destination": location, "weight_kg": 12}
-                        )
-                        result = response.json()
-                        if "error" not in result:
-                            location_cache[location] = result  # ✅ Store in cache
-
+                    result = await delivery_quotes.aquote(location, DEFAULT_QUOTE_WEIGHT_KG)
                     if "error" in result:
                         reply = f"⚠️ I couldn't find delivery info for *{location}*."
                     else:
                         reply = (
                             f"🚚 *Delivery to {result['destination']}* (approx. {result['distance_km']}km)\n"
-                            f"🪶 Weight: {result.get('weight_kg', 12)}kg\n"
+                            f"🪶 Weight: {result.get('weight_kg', DEFAULT_QUOTE_WEIGHT_KG)}kg\n"
                             f"💵 Charge: {result['delivery_charge']}"
                         )
-                    send_whatsapp_message(sender_id, reply)
+                    outbound.send_text(sender_id, reply)
                     return
                 except Exception as e:
                     logger.error(f"Delivery lookup error: {e}")
-                    send_whatsapp_message(sender_id, "❌ Failed to check delivery cost. Please try again.")
+                    outbound.send_text(sender_id, "❌ Failed to check delivery cost. Please try again.")
                     return
                 
                 
@@ -405,14 +489,7 @@ def handle_message(user_text, sender_id, customer_name=None):
             delivery_info = latest_delivery_data.get(sender_id)
             if delivery_info:
                 try:
-                    response = requests.get(
-                        "http://localhost:8000/calculate-delivery",
-                        params={
-                            "destination": delivery_info["location"],
-                            "weight_kg": delivery_info["weight"]
-                        }
-                    )
-                    data = response.json()
+                    data = await delivery_quotes.aquote(delivery_info["location"], delivery_info["weight"])
                     if "error" in data:
                         reply = f"❌ I couldn't get your distance. Please confirm the location again."
                     else:
@@ -427,201 +504,122 @@ def handle_message(user_text, sender_id, customer_name=None):
             else:
                 reply = "I don't have your recent delivery address. Please tell me your location again."
             
-            send_whatsapp_message(sender_id, reply)
+            outbound.send_text(sender_id, reply)
             return
 
 
 
         # AI Assistant fallback
         try:
-            # Get current Zimbabwe time (UTC+2)
-            zimbabwe_time = datetime.now(pytz.timezone("Africa/Harare"))
-            current_hour = zimbabwe_time.hour
-            current_minute = zimbabwe_time.minute
-            current_day = zimbabwe_time.strftime('%A')
-
-            # Opening and closing times by day
-            closing_times = {
-                'Monday': (19, 0),
-                'Tuesday': (17, 30),
-                'Wednesday': (19, 0),
-                'Thursday': (19, 0),
-                'Friday': (17, 30),
-                'Saturday': (18, 0),
-                'Sunday': (0, 0)  # Closed all day
-            }
-
-            # Determine if store is open now
-            closing_hour, closing_minute = closing_times.get(current_day, (0, 0))
-            is_open = (
-                (8 <= current_hour < closing_hour) or
-                (current_hour == closing_hour and current_minute < closing_minute)
+            zimbabwe_time = harare_now()
+
+            # Static prompt first (byte-stable for provider prompt caching), volatile context last
+            knowledge, knowledge_tokens = knowledge_manager.relevant_knowledge(user_text)
+            conversation.append(sender_id, "user", user_text)
+            messages = prompt_assembler.build(
+                conversation.build_messages(sender_id),
+                knowledge=knowledge,
+                customer_name=customer_name,
+                now=zimbabwe_time,
+                greeting=greeting_for(zimbabwe_time),
+                status=store_status(zimbabwe_time),
             )
+            # O(1) size check: static prompt counted once per version, history from stored counts
+            prompt_tokens = conversation.prompt_tokens(sender_id, prompt_assembler.static_tokens() + knowledge_tokens)
+            logger.info(f"🧮 Prompt for {sender_id}: ~{prompt_tokens} tokens")
 
-            # Accurate 24-hour greeting logic
-            if 5 <= current_hour < 12:
-                greeting = "Good morning"
-            elif 12 <= current_hour < 17:
-                greeting = "Good afternoon"
-            elif 17 <= current_hour < 22:
-                greeting = "Good evening"
-            elif 22 <= current_hour or current_hour < 5:
-                greeting = "It's late night – hope you're doing well"
-                # Status response
-            if is_open and current_day != "Sunday":
-                status = f"We’re currently open. Today’s hours: 8:00 AM to {closing_hour}:{closing_minute:02d}."
-            else:
-                # Determine store status and correct tense
-                if current_day == "Sunday":
-                    status = "We are closed today (Sunday)."
-                elif current_hour < 8:
-                    # Before opening
-                    status = f"We’re currently closed. Our hours today will be from 8:00 AM to {closing_hour}:{closing_minute:02d}."
-                elif is_open:
-                    # Open now
-                    status = f"We’re currently open. Today’s hours: 8:00 AM to {closing_hour}:{closing_minute:02d}."
-                else:
-                    # Closed after closing time
-                    status = f"We’re currently closed. Our hours today were from 8:00 AM to {closing_hour}:{closing_minute:02d}."
-
-
-            # Build prompt
-            prompt = knowledge_manager.get_prompt()
-            knowledge = knowledge_manager.get_knowledge()
-            base_system = f"{prompt}\n\nKnowledge base:\n{knowledge}" if prompt or knowledge else "You are a helpful assistant for Para Meats butchery."
-
-            if customer_name:
-                base_system += f"\n\nCustomer name: {customer_name}. Use their name naturally in responses when appropriate."
-
-            base_system += f"\n\nCurrent Zimbabwe time: {zimbabwe_time.strftime('%A %H:%M')}.\n{greeting}! {status}"
-
-            system_content = base_system
-
-            # Chat and GPT logic
-            history = session_store.get(sender_id, [])
-            history.append({"role": "user", "content": user_text})
-            messages = [{"role": "system", "content": system_content}] + history
-
-            send_whatsapp_typing_indicator(sender_id, "typing_on")
-            gpt_reply = client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+            outbound.send_typing(sender_id, "typing_on")
+            gpt_reply = await get_openai_client().chat.completions.create(model="gpt-4o-mini", messages=messages)
+            prompt_cache_metrics.record(sender_id, gpt_reply.usage)
             reply = gpt_reply.choices[0].message.content.strip() if gpt_reply.choices[0].message.content else ""
-            history.append({"role": "assistant", "content": reply})
-            session_store[sender_id] = history[-MAX_HISTORY_LENGTH:]
+            conversation.append(sender_id, "assistant", reply)
+            # Fold older turns into the cached summary in the background once over budget
+            conversation.maybe_summarize(sender_id)
 
-            send_whatsapp_typing_indicator(sender_id, "typing_off")
+            outbound.send_typing(sender_id, "typing_off")
 
         except Exception as e:
             logger.error(f"OpenAI error: {e}")
             reply = f"⚠️ Sorry{', ' + customer_name if customer_name else ''}, I couldn't understand that. Please try again."
 
-        send_whatsapp_message(sender_id, reply)
+        outbound.send_text(sender_id, reply)
 
     except Exception as e:
         logger.error(f"❌ handle_message error: {e}")
         fallback_msg = f"⚠️ An error occurred{', ' + customer_name if customer_name else ''}. Please try again."
-        send_whatsapp_message(sender_id, fallback_msg)
-
-class ReceiptPDF(FPDF):
-    def header(self):
-        # Add Logo
-        if os.path.exists("logo.png"):
-            self.image("logo.png", x=10, y=8, w=30)
-        self.set_font("Helvetica", "B", 14)
-        self.cell(0, 10, "Para Meats Receipt", ln=True, align="C")
-        self.ln(20)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("Helvetica", "I", 8)
-        self.cell(0, 10, "Thank you for your order! Visit parameats.co.zw", align="C")
-
-def clean_text(text):
-    return text.encode("latin-1", "ignore").decode("latin-1") if text else ""
-
-def generate_receipt_pdf(order):
-    pdf = ReceiptPDF()
-    pdf.add_page()
-    pdf.set_font("Helvetica", size=12)
-
-    # Order Details
-    pdf.cell(0, 10, clean_text(f"📞 Phone: {order.phone_number}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"🥩 Product: {order.meat_type}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"📦 Quantity: {order.quantity}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"💵 Price: {order.price_option}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"🔪 Cut: {order.custom_cuts}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"💳 Payment: {order.payment_method}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"📍 Delivery Address: {order.delivery_address}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"🕒 Delivery Time: {order.delivery_time}"), ln=True)
-    pdf.cell(0, 10, clean_text(f"📅 Date: {time.strftime('%Y-%m-%d %H:%M:%S')}"), ln=True)
-
-    filename = f"receipt_{order.phone_number}_{int(time.time())}.pdf"
-    pdf.output(filename)
-    return filename
-
+        outbound.send_text(sender_id, fallback_msg)
 
 @app.post("/submit-order")
-async def submit_order(request: Request, db: Session = Depends(get_db)):
+async def submit_order(request: Request):
     data = await request.json()
 
-    new_order = Order(
+    quantity = data.get("Quantity")
+    quantity_kg = re.match(r"\s*(\d+(?:\.\d+)?)\s*(?:kg|kgs)?\s*$", str(quantity or ""), re.IGNORECASE)
+    price = re.search(r"\d+(?:\.\d+)?", str(data.get("Price_Option") or "").replace(",", ""))
+    new_order = await order_writer.save_order(
+        data.get("Phone_Number"),
+        items=[{
+            "product": data.get("Meat_Type") or "unknown",
+            "cut": data.get("Custom_Cuts"),
+            "quantity": quantity,
+            "quantity_kg": float(quantity_kg.group(1)) if quantity_kg else None,
+        }],
         customer_name=data.get("Customer_Name"),
-        phone_number=data.get("Phone_Number"),
-        meat_type=data.get("Meat_Type"),
         price_option=data.get("Price_Option"),
-        quantity=data.get("Quantity"),
-        custom_cuts=data.get("Custom_Cuts"),
+        # Parsed once here so analytics can SUM a numeric column
+        total_price=float(price.group()) if price else None,
         payment_method=data.get("Payment_Method"),
         delivery_time=data.get("Delivery_Time"),
+        delivery_date=delivery_date(data.get("Delivery_Time")),
         delivery_address=data.get("Delivery_Address"),
     )
 
-    db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
-
   
     # 🧾 Compose details for WhatsApp template
     order_number = f"#{new_order.id:05d}"
     product_description = f"{new_order.quantity} of {new_order.meat_type}"
     delivery_date = (datetime.now() + timedelta(days=1)).strftime("%b %d, %Y")
 
-    send_order_confirmation(
+    outbound.send_payload(new_order.phone_number, order_confirmation_payload(
         to_number=new_order.phone_number,
         customer_name=new_order.customer_name,
         order_number=order_number,
         product_details=product_description,
         estimated_delivery=delivery_date
-    )
+    ), PRIORITY_NOTIFICATION)
 
     return { "status": "success", "order_id": new_order.id }
 
 # Add these endpoints to your main FastAPI file (after your existing endpoints)
 
 @app.get("/orders")
-def get_orders(limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    """Get all orders from database"""
+def get_orders(limit: int = 50, cursor: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, phone: Optional[str] = None, product: Optional[str] = None,
+               status: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get orders newest first; pass the X-Next-Cursor header back as ?cursor= for the next page"""
     try:
-        orders = db.query(Order).offset(offset).limit(limit).all()
-        return [
-            {
-                "id": order.id,
-                "customer_name": order.customer_name,
-                "phone_number": order.phone_number,
-                "meat_type": order.meat_type,
-                "price_option": order.price_option,
-                "quantity": order.quantity,
-                "custom_cuts": order.custom_cuts,
-                "payment_method": order.payment_method,
-                "delivery_time": order.delivery_time,
-                "delivery_address": order.delivery_address,
-            "created_at": order.created_at.isoformat() if order.created_at is not None else None,
-            "updated_at": order.updated_at.isoformat() if order.updated_at is not None else None,
-            }
-            for order in orders
-        ]
+        orders, next_cursor = order_page(db, limit, cursor, since=since, until=until, phone=phone,
+                                         product=product, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching orders: {e}")
         return []
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse([order_to_dict(order) for order in orders], headers=headers)
+
+@app.get("/orders/export")
+def export_orders_endpoint(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), since: Optional[datetime] = None,
+                           until: Optional[datetime] = None, phone: Optional[str] = None,
+                           product: Optional[str] = None, status: Optional[str] = None):
+    """Stream the filtered orders as NDJSON or CSV with constant memory"""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"orders.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        export_orders(format, since=since, until=until, phone=phone, product=product, status=status),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @app.get("/system-status")
 def get_system_status():
@@ -632,7 +630,25 @@ def get_system_status():
             "openai_connected": bool(OPENAI_API_KEY is not None),
             "database_connected": True,  # Since you're using SQLAlchemy
             "active_sessions": len(session_store),
-            "pending_orders": len(pending_orders)
+            "pending_orders": len(pending_orders),
+            "sessions": {
+                store.name: store.stats()
+                for store in (session_store, customer_names, pending_orders, latest_delivery_data, conversation_summaries)
+            },
+            "conversation_memory": conversation.stats(),
+            "token_counts": static_tokens.stats(),
+            "prompt_cache": prompt_cache_metrics.stats(),
+            "pipeline": pipeline.stats(),
+            "intents": intent_router.stats(),
+            "order_flow": order_flow.stats(),
+            "order_extraction": order_extractor.stats(),
+            "order_writer": order_writer.stats(),
+            "location_detection": location_stats(),
+            "whatsapp": whatsapp_stats(),
+            "outbound": outbound.stats(),
+            "delivery_quotes": delivery_quotes.stats(),
+            "deduplication": seen_messages.stats(),
+            "price_catalogue": price_catalogue.stats()
         }
     except Exception as e:
         logger.error(f"Error getting system status: {e}")
@@ -646,50 +662,12 @@ def get_system_status():
 
 @app.get("/analytics")
 def get_analytics(period: str = "week", db: Session = Depends(get_db)):
-    """Get analytics data"""
+    """Get analytics data (SQL aggregates over the daily rollups, see analytics.py)"""
     try:
-        # Calculate date range based on period
-        now = datetime.now()
-        if period == "day":
-            start_date = now - timedelta(days=1)
-        elif period == "week":
-            start_date = now - timedelta(weeks=1)
-        else:  # month
-            start_date = now - timedelta(days=30)
-        
-        # Query orders from database
-        orders = db.query(Order).filter(Order.created_at >= start_date).all()
-        
-        total_orders = len(orders)
-        total_conversations = len(session_store)
-        total_messages = sum(len(history) for history in session_store.values())
-        
-        # Calculate revenue (extract numeric value from price_option)
-        total_revenue = 0.0
-        for order in orders:
-            if order.price_option is not None:
-                import re
-                price_match = re.search(r'[\d.]+', str(order.price_option))
-                if price_match:
-                    try:
-                        total_revenue += float(price_match.group())
-                    except ValueError:
-                        pass
-        
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0.0
-        
-        return {
-            "totalOrders": total_orders,
-            "totalRevenue": total_revenue,
-            "averageOrderValue": avg_order_value,
-            "totalConversations": total_conversations,
-            "totalMessages": total_messages,
-            "orderGrowth": "+12%",
-            "revenueGrowth": "+15%",
-            "topProducts": [],
-            "ordersByDay": [],
-            "paymentMethods": []
-        }
+        data = analytics.summary(db, period)
+        since = datetime.utcnow() - timedelta(days=analytics.PERIOD_DAYS.get(period, analytics.PERIOD_DAYS["month"]))
+        data["totalConversations"], data["totalMessages"] = transcript.activity(db, since)
+        return data
     except Exception as e:
         logger.error(f"Error getting analytics: {e}")
         return {
@@ -705,58 +683,39 @@ def get_analytics(period: str = "week", db: Session = Depends(get_db)):
             "paymentMethods": []
         }
 
-# Also fix your /chats endpoint - remove the wrapper
 @app.get("/chats")
-def get_all_chats():
-    """Get all chat conversations with real customer names"""
+def get_all_chats(since: Optional[str] = None, limit: int = 500, db: Session = Depends(get_db)):
+    """Transcript lines grouped by conversation; poll again with ?since=<X-Next-Cursor> for new lines only"""
     try:
-        logger.info(f"Session store has {len(session_store)} conversations")
-        
-        all_chats = {}
-        
-        for phone_number, history in session_store.items():
-            messages = []
-            
-            # Get customer name from the customer_names dictionary
-            customer_name = customer_names.get(phone_number)
-            
-            for idx, msg in enumerate(history):
-                timestamp = datetime.now() - timedelta(minutes=(len(history) - idx))
-                
-                if msg["role"] == "user":
-                    messages.append({
-                        "id": f"{phone_number}-{idx}-user",
-                        "sender_id": phone_number,
-                        "message": msg["content"],
-                        "timestamp": timestamp.isoformat(),
-                        "message_type": "incoming",
-                        "customer_name": customer_name  # Include customer name
-                    })
-                elif msg["role"] == "assistant":
-                    messages.append({
-                        "id": f"{phone_number}-{idx}-bot",
-                        "sender_id": "bot",
-                        "message": msg["content"],
-                        "timestamp": timestamp.isoformat(),
-                        "message_type": "outgoing",
-                        "is_ai_response": True
-                    })
-            
-            if messages:
-                all_chats[phone_number] = messages
-        
-        logger.info(f"Returning {len(all_chats)} conversations")
-        return all_chats
-        
+        rows, cursor = transcript.feed(db, since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting chats: {e}")
         return {}
+    all_chats = {}
+    for row in rows:
+        all_chats.setdefault(row.phone_number, []).append(
+            transcript.message_to_dict(row, customer_names.get(row.phone_number))
+        )
+    return JSONResponse(all_chats, headers={"X-Next-Cursor": cursor})
+
+@app.get("/chats/{phone_number}")
+def get_chat(phone_number: str, before: Optional[str] = None, limit: int = 50, db: Session = Depends(get_db)):
+    """One conversation, newest page first; pass X-Next-Cursor back as ?before= for older messages"""
+    try:
+        rows, older = transcript.conversation(db, phone_number, before, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    customer_name = customer_names.get(phone_number)
+    headers = {"X-Next-Cursor": older} if older else None
+    return JSONResponse([transcript.message_to_dict(row, customer_name) for row in rows], headers=headers)
 
 # Add endpoint to get customer names
 @app.get("/customer-names")
 def get_customer_names():
     """Get all customer names"""
-    return customer_names
+    return dict(customer_names.items())
 
 # Add a debug endpoint to check what's in the session store
 @app.get("/debug/session-store")
@@ -775,31 +734,11 @@ def debug_session_store():
 
 @app.get("/calculate-delivery")
 def calculate_delivery(destination: str, weight_kg: float = Query(..., gt=0)):
-    distance_km = get_distance_from_harare(destination)
-
-    if distance_km == -1:
-        return {"error": "Could not calculate distance. Please try a different location."}
-
-    if weight_kg < 10:
-        return {
-            "destination": destination,
-            "distance_km": distance_km,
-            "note": "Free delivery only applies to orders 10kg and above.",
-            "delivery_charge": "Varies — confirm with store"
-        }
-
-    if distance_km <= 10:
-        charge = 0
-    elif distance_km <= 20:
-        charge = 3.00
-    elif distance_km <= 40:
-        charge = 7.00
-    else:
-        charge = 15.00
-
-    return {
-        "destination": destination,
-        "distance_km": distance_km,
-        "weight_kg": weight_kg,
-        "delivery_charge": f"${charge:.2f}"
-    }
+    return delivery_quotes.quote(destination, weight_kg)
+
+@app.get("/dispatch/routes")
+def dispatch_routes(day: Optional[date] = None, vehicles: Optional[int] = Query(None, gt=0),
+                    max_stops: int = Query(MAX_STOPS_PER_VEHICLE, gt=0), db: Session = Depends(get_db)):
+    """Vehicle routes for the confirmed orders delivered on a Harare day (default today), by window"""
+    orders = orders_for_day(db, day or harare_now().date())
+    return plan_routes(orders, distance_cache, delivery_quotes.zones, vehicles, max_stops)
@@ -0,0 +1,134 @@
+"""Schema migrations for parabot.db, tracked with SQLite's ``PRAGMA user_version``.
+
+Each entry in ``MIGRATIONS`` upgrades the schema by one version inside a
+transaction. New tables that need no data changes are simply added to
+models.py; ``create_all`` at the end of ``migrate`` creates them.
+
+    python migrations.py            # upgrade parabot.db (or $DATABASE_URL)
+    python migrations.py --status
+"""
+import argparse
+import logging
+
+from sqlalchemy import inspect
+
+from analytics import rebuild as rebuild_rollups
+from models import Base, ChatMessage, Order, OrderItem, engine
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn, table):
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return set()
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def _v1_normalise_orders(conn):
+    """phone/product/quantity/timestamp orders -> customers, orders, order_items."""
+    legacy = _columns(conn, "orders")
+    if not legacy or "phone_number" in legacy:
+        Base.metadata.create_all(conn)
+        return
+    conn.exec_driver_sql("ALTER TABLE orders RENAME TO orders_v0")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_orders_id")
+    Base.metadata.create_all(conn)
+    conn.exec_driver_sql(
+        "INSERT INTO customers (phone_number, created_at) "
+        "SELECT phone, MIN(COALESCE(timestamp, CURRENT_TIMESTAMP)) FROM orders_v0 "
+        "WHERE phone IS NOT NULL GROUP BY phone"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO orders (id, customer_id, phone_number, status, created_at, updated_at) "
+        "SELECT o.id, c.id, o.phone, 'confirmed', COALESCE(o.timestamp, CURRENT_TIMESTAMP), o.timestamp "
+        "FROM orders_v0 o LEFT JOIN customers c ON c.phone_number = o.phone"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO order_items (order_id, product, quantity, quantity_kg) "
+        "SELECT id, COALESCE(product, 'unknown'), quantity, "
+        "CASE WHEN CAST(quantity AS REAL) > 0 THEN CAST(quantity AS REAL) END FROM orders_v0"
+    )
+    moved = conn.exec_driver_sql("SELECT COUNT(*) FROM orders_v0").scalar()
+    conn.exec_driver_sql("DROP TABLE orders_v0")
+    logger.info(f"🗃️ Moved {moved} legacy orders into customers/orders/order_items")
+
+
+def _v2_daily_rollups(conn):
+    """Backfill daily_rollups from the existing orders."""
+    Base.metadata.create_all(conn)
+    rebuild_rollups(conn)
+    days = conn.exec_driver_sql("SELECT COUNT(*) FROM daily_rollups WHERE dimension = 'total'").scalar()
+    logger.info(f"🗃️ Rolled up {days} days of orders")
+
+
+def _v3_order_item_product_index(conn):
+    """Index order_items by product for the /orders product filter."""
+    for index in OrderItem.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _v4_chat_transcript(conn):
+    """chat_messages gets WhatsApp message ids and a per-conversation (phone_number, id) index."""
+    if "message_id" not in _columns(conn, "chat_messages"):
+        conn.exec_driver_sql("ALTER TABLE chat_messages ADD COLUMN message_id VARCHAR")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_chat_messages_phone_number")
+    for index in ChatMessage.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _v5_delivery_date(conn):
+    """orders.delivery_date: the Harare day "Tomorrow …" orders go out, instead of the day they were placed."""
+    if "delivery_date" not in _columns(conn, "orders"):
+        conn.exec_driver_sql("ALTER TABLE orders ADD COLUMN delivery_date DATE")
+    conn.exec_driver_sql(
+        "UPDATE orders SET delivery_date = date(created_at, '+2 hours', "
+        "CASE WHEN lower(delivery_time) LIKE '%tomorrow%' THEN '+1 day' ELSE '+0 days' END) "
+        "WHERE delivery_date IS NULL"
+    )
+    for index in Order.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    _v1_normalise_orders,
+    _v2_daily_rollups,
+    _v3_order_item_product_index,
+    _v4_chat_transcript,
+    _v5_delivery_date,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(bind=engine) -> int:
+    """Bring the database up to ``SCHEMA_VERSION``; safe to run on every start."""
+    with bind.begin() as conn:
+        version = schema_version(conn)
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(f"Database schema v{version} is newer than this code (v{SCHEMA_VERSION})")
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[number - 1](conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+            logger.info(f"🗃️ Database migrated to schema v{number}")
+        Base.metadata.create_all(conn)
+    return SCHEMA_VERSION
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade the order database schema")
+    parser.add_argument("--status", action="store_true", help="print the current and latest version only")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.status:
+        with engine.connect() as conn:
+            print(f"schema v{schema_version(conn)} (latest v{SCHEMA_VERSION})")
+        return
+    print(f"schema v{migrate()}")
+
+
+if __name__ == "__main__":
+    main()
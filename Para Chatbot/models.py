@@ -1,20 +1,179 @@
-from sqlalchemy import Column, Integer, String, DateTime, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import os
+from contextlib import contextmanager
 from datetime import datetime
 
-DATABASE_URL = "sqlite:///parabot.db"
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, create_engine, event
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///parabot.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "20000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
 
 Base = declarative_base()
 
+
+class Customer(Base):
+    __tablename__ = "customers"
+
+    id = Column(Integer, primary_key=True)
+    phone_number = Column(String, nullable=False, unique=True)
+    name = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    orders = relationship("Order", back_populates="customer")
+
+
 class Order(Base):
     __tablename__ = "orders"
 
-    id = Column(Integer, primary_key=True, index=True)
-    phone = Column(String)
-    product = Column(String)
-    quantity = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    id = Column(Integer, primary_key=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), index=True)
+    # Copied from the customer so lookups by phone and the order list need no join
+    phone_number = Column(String, index=True)
+    customer_name = Column(String)
+    price_option = Column(String)   # as shown to the customer: "$30.00", "to be confirmed"
+    total_price = Column(Float)     # numeric total when every line is priced
+    payment_method = Column(String)
+    delivery_time = Column(String)
+    delivery_date = Column(Date)    # Harare day it goes out on, from delivery_time (see route_planner.delivery_date)
+    delivery_address = Column(String)
+    status = Column(String, default="confirmed", nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    customer = relationship("Customer", back_populates="orders")
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", lazy="selectin",
+                         order_by="OrderItem.id")
+
+    __table_args__ = (
+        Index("ix_orders_phone_number_created_at", "phone_number", "created_at"),
+        Index("ix_orders_delivery_date_status", "delivery_date", "status"),
+    )
+
+    # Flat views kept for the receipt, /orders and the dashboard, which predate order_items
+    @property
+    def meat_type(self):
+        return ", ".join(item.description for item in self.items) or None
+
+    @property
+    def quantity(self):
+        if len(self.items) == 1:
+            return self.items[0].quantity
+        total = sum(item.quantity_kg or 0 for item in self.items)
+        return f"{total:g}kg" if total else None
+
+    @property
+    def custom_cuts(self):
+        return ", ".join(item.cut for item in self.items if item.cut) or None
+
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    product = Column(String, nullable=False)
+    grade = Column(String)
+    cut = Column(String)
+    quantity = Column(String)       # as given: "5kg", "2 packs"
+    quantity_kg = Column(Float)
+    price = Column(Float)
+
+    order = relationship("Order", back_populates="items")
+
+    # /orders?product= and the export resolve matching orders from this index alone
+    __table_args__ = (Index("ix_order_items_product_order_id", "product", "order_id"),)
+
+    @property
+    def description(self):
+        return f"{self.grade} {self.product}" if self.grade else self.product
+
+
+class ChatMessage(Base):
+    """Transcript line; ``id`` only grows, so it doubles as the /chats ``since=`` cursor."""
+
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True)
+    message_id = Column(String)                 # WhatsApp wamid, when Meta gave us one
+    phone_number = Column(String, nullable=False)
+    direction = Column(String, nullable=False)  # "in" from the customer, "out" from us
+    content = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_chat_messages_phone_number_id", "phone_number", "id"),
+        Index("ix_chat_messages_message_id", "message_id", unique=True),
+    )
+
+
+class DailyRollup(Base):
+    """Per-day order counters kept up to date as orders are written (see analytics.py)."""
+
+    __tablename__ = "daily_rollups"
+
+    day = Column(Date, primary_key=True)            # Harare calendar day
+    dimension = Column(String, primary_key=True)    # "total", "product" or "payment"
+    key = Column(String, primary_key=True)          # product / payment method; "" for totals
+    orders = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+    kg = Column(Float, default=0.0, nullable=False)
+
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    poolclass=QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+)
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Runs once per pooled connection: WAL so readers never block the writer, and a bigger page cache."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+# expire_on_commit=False: saved orders are read after the session closes (receipts, confirmations)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+@contextmanager
+def session_scope():
+    """Session for code outside a request: commits on success, rolls back on error, always returns the connection."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+def create_order(db, phone_number, items, customer_name=None, **fields):
+    """Add an order with its lines, creating or renaming the customer; ``items`` are dicts of OrderItem columns."""
+    customer = db.query(Customer).filter_by(phone_number=phone_number).one_or_none()
+    if customer is None:
+        customer = Customer(phone_number=phone_number, name=customer_name)
+        db.add(customer)
+    elif customer_name and customer.name != customer_name:
+        customer.name = customer_name
+    order = Order(customer=customer, phone_number=phone_number, customer_name=customer_name or customer.name, **fields)
+    order.items = [OrderItem(**item) for item in items]
+    db.add(order)
+    return order
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Callable
+
+from location_detector import find_known_location
+from order_flow import (
+    DAY_WORDS, InvalidInput, OrderFlow, ORDER_FILLER, PAYMENT_ALIASES, PAYMENT_METHODS, parse_address,
+    parse_payment, parse_window,
+)
+from price_catalogue import CUT_ALIASES, CUT_DISPLAY_NAMES, FILLER_WORDS, GRADE_WORDS, PRICE_WORDS, PRODUCT_ALIASES
+
+logger = logging.getLogger(__name__)
+
+ORDER_EXTRACTOR_MODEL = os.getenv("ORDER_EXTRACTOR_MODEL", "gpt-4o-mini")
+ORDER_EXTRACTOR_TIMEOUT = float(os.getenv("ORDER_EXTRACTOR_TIMEOUT", "6"))
+ORDER_EXTRACTOR_LLM = os.getenv("ORDER_EXTRACTOR_LLM", "1") == "1"
+
+SLOTS = ("items", "delivery_address", "delivery_time", "payment_method")
+
+# Only explicit times count ("2pm", "14:30", "morning"); a bare number is more likely a house or kg
+_TIME = re.compile(
+    r"\b(?:(?:in the |this |tomorrow |today )?(?:morning|afternoon|evening)|\d{1,2}(?::\d{2})?\s*(?:am|pm)|"
+    r"\d{1,2}:\d{2})\b"
+)
+_SHONA_WINDOWS = {"mangwanani": "morning", "masikati": "afternoon", "manheru": "evening", "madekwana": "evening"}
+_SHONA_TIME = re.compile(rf"\b(?:{'|'.join(_SHONA_WINDOWS)})\b")
+_DAY = re.compile(rf"\b(?:{'|'.join(DAY_WORDS)})\b")
+# "to/at <house number> <suburb> <section>": the address keeps the house number and section around a suburb
+_ADDRESS_AROUND = r"(?:\b(?:stand\s+|house\s+|no\.?\s*)?\d+[a-z]?,?\s+(?:[a-z]+\s+){0,3}?)?{suburb}(?:\s+\d+\b)?"
+# The address ends at punctuation or the next cue word ("deliver to 12 fife avenue at 2pm")
+_ADDRESS_STOP = (r"today|tomorrow|morning|afternoon|evening|by|pay|with|via|using|cash|ecocash|zipit|at|on|in|for|"
+                 r"to|from|around|before|after|please|pls|thanks")
+_ADDRESS_CUE = re.compile(r"\b(?:deliver(?:y)?\s+to|send\s+(?:it\s+)?to|to|at|in|address(?:\s+is)?:?)\s+"
+                          r"(\d+[a-z]?\s+[a-z][a-z ]{2,40}?)"
+                          rf"(?=\s*(?:[,.;!?]|$|\b(?:{_ADDRESS_STOP})\b))")
+# A segment with a weight is an item even when no product can be matched ("1kg livers")
+_ITEM_QUANTITY = re.compile(r"\b\d+(?:[.,]\d+)?\s*(?:kg|kgs|kilos?|kilograms?|g|grams?)\b")
+_SEPARATORS = re.compile(r"\s*(?:,|;|\+|&|\band\b|\bplus\b|\bne\b)\s*")
+_PAYMENT = re.compile(
+    r"(?:\b(?:pay(?:ing)?|payment)\s+(?:by|with|via|using)?\s*)?(?<!\w)(?:"
+    + "|".join(re.escape(alias) for alias in sorted(PAYMENT_ALIASES, key=len, reverse=True))
+    + r")(?!\w)"
+)
+# Words that carry no order information once the slots are taken out
+_NOISE = FILLER_WORDS | ORDER_FILLER | GRADE_WORDS | {
+    "hi", "hello", "hey", "please", "pls", "thanks", "thank", "deliver", "delivery", "send", "it", "at", "by", "via",
+    "using", "pay", "paying", "payment", "cut", "cuts", "kg", "kgs", "kilo", "kilos", "x", "order", "ordering", "place",
+    "id", "i'd", "i'll", "we", "us", "our", "on", "from", "for", "asap", "so", "just", "only", "today", "tomorrow",
+    "mangwana", "nhasi",
+}
+_CHATTER = _NOISE - GRADE_WORDS - {"kg", "kgs", "kilo", "kilos"}
+
+LLM_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "required": ["items", "delivery_address", "delivery_time", "payment_method"],
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "required": ["product", "cut", "kg"],
+                "properties": {
+                    "product": {"type": "string"},
+                    "cut": {"type": ["string", "null"]},
+                    "kg": {"type": ["number", "null"]},
+                },
+            },
+        },
+        "delivery_address": {"type": ["string", "null"]},
+        "delivery_time": {"type": ["string", "null"], "description": "morning, afternoon, evening or a clock time"},
+        "payment_method": {"type": ["string", "null"], "enum": [*PAYMENT_METHODS, None]},
+    },
+}
+LLM_PROMPT = (
+    "Extract the butchery order in the customer's WhatsApp message. Products: beef, chicken, pork, lamb, goat, "
+    "fish, sausage. Use null for anything the message does not say; never guess. Quantities are in kg."
+)
+
+
+def _parsed(parser, text):
+    """``parser(text)``, or ``None`` if the value is invalid; the flow then asks for that slot itself."""
+    try:
+        return parser(text)
+    except InvalidInput:
+        return None
+
+
+def _as_typed(phrase, original):
+    """``phrase``, found in the lowercased message, with the casing of ``original``."""
+    match = re.search(re.escape(phrase), original, re.IGNORECASE)
+    return match.group(0) if match else phrase
+
+
+def _fill(slots, slot, value):
+    if value is not None:
+        slots[slot] = value
+
+
+class OrderExtractor:
+    """Fill as many order slots as possible from one message before the step-by-step flow takes over.
+
+    Rules handle payment, explicit delivery times, known suburbs and
+    "<qty> <product> <cut>" items. If words the rules could not explain are
+    left and slots are still empty, one structured-output LLM call is made;
+    its answer is run through the same step parsers and only fills empty
+    slots. The flow then asks just for what is still missing.
+    """
+
+    def __init__(self, flow: OrderFlow, client_provider: Callable = None, model: str = ORDER_EXTRACTOR_MODEL,
+                 timeout: float = ORDER_EXTRACTOR_TIMEOUT, use_llm: bool = ORDER_EXTRACTOR_LLM):
+        self.flow = flow
+        self._client = client_provider
+        self.model = model
+        self.timeout = timeout
+        self.use_llm = use_llm and client_provider is not None
+        self.messages = 0
+        self.rule_slots = 0
+        self.llm_calls = 0
+        self.llm_failures = 0
+        self.llm_slots = 0
+        self._rule_seconds = 0.0
+        self._llm_seconds = 0.0
+
+    def extract_rules(self, text: str):
+        """Return ``(slots, leftover_words)`` from deterministic rules; slots hold validated values."""
+        original = " ".join(text.split())
+        text = original.lower()
+        slots = {}
+        rest = text
+
+        payment = _PAYMENT.search(rest)
+        if payment:
+            _fill(slots, "payment_method", _parsed(parse_payment, payment.group(0)))
+            rest = rest[:payment.start()] + " , " + rest[payment.end():]
+
+        window = _TIME.search(rest) or _SHONA_TIME.search(rest)
+        if window:
+            day = _DAY.search(rest)
+            phrase = _SHONA_WINDOWS.get(window.group(0), window.group(0))
+            # "at 7pm" is outside the delivery windows: left for the flow to ask
+            _fill(slots, "delivery_time", _parsed(parse_window, f"{day.group(0)} {phrase}" if day else phrase))
+            rest = _DAY.sub(" ", rest[:window.start()] + " , " + rest[window.end():])
+
+        known = find_known_location(rest)
+        if known:
+            suburb = re.escape(rest[known[1]:known[2]])
+            span = re.search(_ADDRESS_AROUND.replace("{suburb}", suburb), rest)
+            address = span.group(0).strip(" ,")
+            # Keep the house number but not a quantity that happens to precede the suburb
+            if re.match(r"\d+(?:\.\d+)?\s*(?:kg|kgs|g)\b", address):
+                address, start = rest[known[1]:span.end()], known[1]
+            else:
+                start = span.start()
+            _fill(slots, "delivery_address", _parsed(parse_address, _as_typed(address, original)))
+            rest = rest[:start] + " , " + rest[span.end():]
+        else:
+            cue = _ADDRESS_CUE.search(rest)
+            if cue:
+                _fill(slots, "delivery_address", _parsed(parse_address, _as_typed(cue.group(1), original)))
+                rest = rest[:cue.start()] + " , " + rest[cue.end():]
+
+        items, unresolved, leftover = [], [], []
+        for segment in filter(None, _SEPARATORS.split(rest)):
+            content = [w for w in re.findall(r"[a-z][a-z'&-]*", segment) if w not in _NOISE and w not in PRICE_WORDS]
+            if content:
+                # Grades and quantities stay; "hi can i get" would only dilute the catalogue match
+                phrase = " ".join(w for w in segment.split() if w not in _CHATTER)
+                try:
+                    item = self.flow.build_item(phrase)
+                except InvalidInput:
+                    if _ITEM_QUANTITY.search(phrase):
+                        unresolved.append(phrase)
+                else:
+                    items.append(item)
+                    # Words the item does not account for ("kumbare" in "5kg pork kumbare") are still leftovers
+                    names = [item.cut or "", CUT_DISPLAY_NAMES.get(item.cut, ""), *CUT_ALIASES.get(item.cut, [])]
+                    explained = {word.rstrip("s") for name in names for word in re.split(r"[\s/()-]+", name)}
+                    content = [w for w in content if w not in PRODUCT_ALIASES
+                               and not all(part.rstrip("s") in explained for part in w.split("-"))]
+                    if item.hint:
+                        content = [w for w in content if w not in item.hint.split()]
+                    elif item.cut is None:
+                        content = content[1:] if len(content) > 1 else []
+            leftover += content
+        if items:
+            slots["items"] = items
+        if unresolved:
+            # Not an order slot: the flow tells the customer these were not added
+            slots["unresolved_items"] = unresolved
+        return slots, leftover
+
+    async def extract_llm(self, text: str) -> dict:
+        """One structured-output completion, validated slot by slot with the flow's parsers."""
+        client = self._client()
+        response = await asyncio.wait_for(
+            client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "system", "content": LLM_PROMPT}, {"role": "user", "content": text}],
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": "order_slots", "strict": True, "schema": LLM_SCHEMA},
+                },
+                temperature=0,
+            ),
+            self.timeout,
+        )
+        data = json.loads(response.choices[0].message.content or "{}")
+        slots = {}
+        items = []
+        for raw in data.get("items") or []:
+            kg = f"{raw['kg']}kg " if raw.get("kg") else ""
+            try:
+                items.append(self.flow.build_item(f"{kg}{raw.get('product', '')} {raw.get('cut') or ''}".lower()))
+            except (InvalidInput, KeyError, TypeError):
+                continue
+        if items:
+            slots["items"] = items
+        for slot, parser in (("delivery_address", parse_address), ("delivery_time", parse_window),
+                             ("payment_method", parse_payment)):
+            if data.get(slot):
+                value = str(data[slot]) if slot == "delivery_address" else str(data[slot]).lower()
+                _fill(slots, slot, _parsed(parser, value))
+        return slots
+
+    async def extract(self, text: str) -> dict:
+        self.messages += 1
+        started = time.perf_counter()
+        slots, leftover = self.extract_rules(text)
+        self._rule_seconds += time.perf_counter() - started
+        self.rule_slots += sum(slot in slots for slot in SLOTS)
+
+        missing = [slot for slot in SLOTS if slot not in slots]
+        if not (self.use_llm and missing and leftover):
+            return slots
+        self.llm_calls += 1
+        started = time.perf_counter()
+        try:
+            extra = await self.extract_llm(text)
+        except Exception as e:
+            self.llm_failures += 1
+            logger.error(f"Order extraction LLM call failed, continuing with rule slots: {e}")
+            return slots
+        finally:
+            self._llm_seconds += time.perf_counter() - started
+        for slot in missing:
+            if slot in extra:
+                slots[slot] = extra[slot]
+                self.llm_slots += 1
+        if "items" in missing and "items" in extra:
+            slots.pop("unresolved_items", None)
+        return slots
+
+    def looks_like_order(self, text: str) -> bool:
+        """A message that names a product with a quantity, delivery time or payment, and is not a question."""
+        text = text.lower()
+        if "?" in text or set(re.findall(r"[a-z]+", text)) & PRICE_WORDS:
+            return False
+        slots, _ = self.extract_rules(text)
+        items = slots.get("items", [])
+        return bool(items) and (any(item.kg for item in items) or sum(slot in slots for slot in SLOTS) > 1)
+
+    async def start(self, text: str, customer_name=None):
+        """Begin an order from its first message; returns ``(state, next prompt)``."""
+        state, _ = self.flow.start(customer_name)
+        slots = await self.extract(text)
+        items = slots.get("items", [])
+        for item in items:
+            if item.complete:
+                self.flow.add_item(state, item)
+            elif state.draft is None:
+                state.draft = item
+            else:
+                # Asked for in turn once the draft is in the cart
+                state.pending.append(item)
+        state.delivery_address = slots.get("delivery_address")
+        state.delivery_time = slots.get("delivery_time")
+        state.payment_method = slots.get("payment_method")
+        state.unresolved = slots.get("unresolved_items", [])
+        # A message that already covers delivery or payment is a whole order: skip "anything else?",
+        # unless part of it could not be added and the customer has to be told
+        if items and sum(slot in slots for slot in SLOTS) > 1 and not state.unresolved:
+            state.cart_closed = True
+        return state, self.flow.advance(state)
+
+    def stats(self) -> dict:
+        return {
+            "messages": self.messages,
+            "slots_from_rules": self.rule_slots,
+            "llm_calls": self.llm_calls,
+            "llm_failures": self.llm_failures,
+            "slots_from_llm": self.llm_slots,
+            "avg_rule_us": round(self._rule_seconds / self.messages * 1e6, 1) if self.messages else 0.0,
+            "avg_llm_ms": round(self._llm_seconds / self.llm_calls * 1000, 1) if self.llm_calls else 0.0,
+        }
@@ -0,0 +1,505 @@
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from location_detector import find_known_location
+from price_catalogue import FILLER_WORDS, GRADE_WORDS, PRODUCT_ALIASES, cut_display_name
+from route_planner import DELIVERY_WINDOWS, delivery_window
+
+ORDER_MAX_KG = float(os.getenv("ORDER_MAX_KG", "200"))
+MAX_CART_ITEMS = int(os.getenv("MAX_CART_ITEMS", "10"))
+# Cuts listed when a portion answer matches several catalogue lines
+MAX_CUT_CHOICES = 6
+
+DEFAULT_PRODUCTS = ["beef", "chicken", "pork", "lamb", "goat", "fish", "sausage"]
+# Answers to the portion step that mean "no particular cut"
+ANY_CUT_WORDS = {"standard", "any", "normal", "mixed", "mixed cuts", "anything", "whatever", "zvese"}
+# Answers to "anything else?" that close the cart
+DONE_WORDS = {"done", "no", "nope", "nah", "ok", "okay", "that's all", "thats all", "that is all", "that's it",
+              "thats it", "nothing", "nothing else", "finish", "checkout", "continue", "next", "kwete", "aiwa",
+              "zvakwana", "ndezvo"}
+# Order-talk around an item ("add 2kg wings too") that the catalogue match should not count as unknown
+ORDER_FILLER = {"add", "also", "plus", "another", "more", "too", "and", "order", "buy", "to", "of", "with", "then",
+                "kuodha", "ndoda", "nekuwedzera"}
+CANCEL_WORDS = {"cancel", "cancel order", "cancel my order", "stop", "ngazvimire"}
+# Replies that answer a different question and must never be saved as an address
+NOT_ADDRESS_WORDS = DONE_WORDS | CANCEL_WORDS | {"yes", "y", "yep", "yeah", "sure", "no thanks", "no thank you",
+                                                 "hongu", "ehe", "thanks", "thank you"}
+_HOUSE_AND_STREET = re.compile(r"\b\d+[a-z]?\b.*\b[a-z]{3,}|\b[a-z]{3,}\b.*\b\d+[a-z]?\b")
+PAYMENT_METHODS = {
+    "Cash": ["cash", "cash on delivery", "mari", "kesh"],
+    "EcoCash": ["ecocash", "eco cash", "eco-cash", "eco", "mobile money"],
+    "ZIPIT": ["zipit", "zip it", "zip-it", "bank transfer", "transfer"],
+}
+PAYMENT_ALIASES = {alias: method for method, aliases in PAYMENT_METHODS.items() for alias in aliases}
+
+_QUANTITY = re.compile(r"(\d+(?:[.,]\d+)?)\s*(kg|kgs|kilo|kilos|kilograms?|g|grams?)?\b")
+_WORD = re.compile(r"[a-z&']+")
+# Delivery days kept with the window so the order can be routed on the right date
+DAY_WORDS = {"today": "Today", "nhasi": "Today", "tomorrow": "Tomorrow", "mangwana": "Tomorrow"}
+_DAY = re.compile(rf"\b({'|'.join(DAY_WORDS)})\b")
+
+
+class InvalidInput(ValueError):
+    """Raised by a step parser; the message is sent back before the step's prompt."""
+
+
+class CartItem:
+    __slots__ = ("product", "grade", "cut", "kg", "price", "hint")
+
+    def __init__(self, product, grade=None, cut=None, kg=None, price=None, hint=None):
+        self.product = product
+        self.grade = grade
+        self.cut = cut
+        self.kg = kg
+        self.price = price
+        # Cut words that matched several catalogue lines ("steak", "mince"); the cut step lists those lines
+        self.hint = hint
+
+    @property
+    def complete(self) -> bool:
+        return self.kg is not None and self.cut is not None
+
+    def describe(self) -> str:
+        grade = f"{self.grade.title()} " if self.grade else ""
+        cut = f" ({cut_display_name(self.product, self.cut)})" if self.cut and self.cut != "standard" else ""
+        price = f" – ${self.price:.2f}" if self.price is not None else ""
+        return f"{self.kg:g}kg {grade}{self.product.title()}{cut}{price}"
+
+    def to_list(self) -> list:
+        return [self.product, self.grade, self.cut, self.kg, self.price, self.hint]
+
+
+class OrderState:
+    """One customer's in-progress order; slotted so thousands of open carts stay small."""
+
+    __slots__ = ("step", "items", "draft", "pending", "unresolved", "cart_closed", "delivery_address",
+                 "delivery_time", "payment_method", "customer_name", "started_at", "turns")
+
+    def __init__(self, customer_name=None, step="item", items=None, draft=None, pending=None, unresolved=None,
+                 cart_closed=False, delivery_address=None, delivery_time=None, payment_method=None, started_at=None,
+                 turns=1):
+        self.step = step
+        self.items = items if items is not None else []
+        self.draft = draft
+        # Further incomplete lines from the first message, completed one by one after the draft
+        self.pending = pending if pending is not None else []
+        # Item phrases from the first message that matched no product ("1kg livers"), until the customer answers
+        self.unresolved = unresolved if unresolved is not None else []
+        self.cart_closed = cart_closed
+        self.delivery_address = delivery_address
+        self.delivery_time = delivery_time
+        self.payment_method = payment_method
+        self.customer_name = customer_name
+        self.started_at = started_at or time.time()
+        # Customer messages spent on this order, counting the one that started it
+        self.turns = turns
+
+    @property
+    def total_kg(self) -> float:
+        return round(sum(item.kg for item in self.items), 3)
+
+    @property
+    def total_price(self):
+        """Sum of priced lines, or ``None`` when any line still needs the store to price it."""
+        if not self.items or any(item.price is None for item in self.items):
+            return None
+        return round(sum(item.price for item in self.items), 2)
+
+    def as_record(self) -> dict:
+        """Flat fields for the orders table and agent notifications (one line per cart item)."""
+        total = self.total_price
+        return {
+            "customer_name": self.customer_name,
+            "item": ", ".join(f"{item.grade + ' ' if item.grade else ''}{item.product}" for item in self.items),
+            "quantity": self.total_kg,
+            "portion": ", ".join(item.cut for item in self.items),
+            "price": f"${total:.2f}" if total is not None else "to be confirmed",
+            "delivery_address": self.delivery_address,
+            "delivery_time": self.delivery_time,
+            "payment_method": self.payment_method,
+            "lines": [item.describe() for item in self.items],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "step": self.step,
+            "items": [item.to_list() for item in self.items],
+            "draft": self.draft.to_list() if self.draft else None,
+            "pending": [item.to_list() for item in self.pending],
+            "unresolved": self.unresolved,
+            "cart_closed": self.cart_closed,
+            "delivery_address": self.delivery_address,
+            "delivery_time": self.delivery_time,
+            "payment_method": self.payment_method,
+            "customer_name": self.customer_name,
+            "started_at": self.started_at,
+            "turns": self.turns,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OrderState":
+        return cls(
+            customer_name=data.get("customer_name"),
+            step=data.get("step", "item"),
+            items=[CartItem(*item) for item in data.get("items", [])],
+            draft=CartItem(*data["draft"]) if data.get("draft") else None,
+            pending=[CartItem(*item) for item in data.get("pending", [])],
+            unresolved=data.get("unresolved", []),
+            cart_closed=data.get("cart_closed", False),
+            delivery_address=data.get("delivery_address"),
+            delivery_time=data.get("delivery_time"),
+            payment_method=data.get("payment_method"),
+            started_at=data.get("started_at"),
+            turns=data.get("turns", 1),
+        )
+
+
+def parse_quantity(text: str) -> float:
+    """Kilograms from "5kg", "2.5 kilos", "500g" or a bare number."""
+    match = _QUANTITY.search(text)
+    if not match:
+        raise InvalidInput("Please send the amount in kg, e.g. *5kg*.")
+    kg = float(match.group(1).replace(",", "."))
+    unit = match.group(2) or "kg"
+    if unit.startswith("g"):
+        kg /= 1000
+    if kg <= 0:
+        raise InvalidInput("The amount must be more than 0kg.")
+    if kg > ORDER_MAX_KG:
+        raise InvalidInput(f"For more than {ORDER_MAX_KG:g}kg please call the shop and we'll arrange a bulk order.")
+    return round(kg, 3)
+
+
+def parse_window(text: str) -> str:
+    window = delivery_window(text)
+    if window not in DELIVERY_WINDOWS:
+        raise InvalidInput("We deliver in the morning (8–12), afternoon (12–4) or evening (4–7).")
+    day = _DAY.search(text.lower())
+    return f"{DAY_WORDS[day.group(1)]} {window.title()}" if day else window.title()
+
+
+def parse_payment(text: str) -> str:
+    text = " ".join(text.split())
+    method = PAYMENT_ALIASES.get(text)
+    if method is None:
+        method = next((m for alias, m in PAYMENT_ALIASES.items() if re.search(rf"(?<!\w){alias}(?!\w)", text)), None)
+    if method is None:
+        raise InvalidInput(f"We accept {', '.join(PAYMENT_METHODS)}.")
+    return method
+
+
+def parse_address(text: str) -> str:
+    """A known suburb, or a house/stand number with a street or area name; anything else is re-asked."""
+    address = " ".join(text.split())
+    if address.lower().strip(".!") in NOT_ADDRESS_WORDS or not (
+            find_known_location(address) or _HOUSE_AND_STREET.search(address.lower())):
+        raise InvalidInput("Please send your street address and suburb, e.g. *8233 Glenview 8*.")
+    return address
+
+
+@dataclass(frozen=True)
+class Step:
+    name: str
+    prompt: Callable      # (flow, state) -> str
+    parse: Callable       # (flow, state, text) -> None; fills the state or raises InvalidInput
+    pending: Callable     # (state) -> bool; whether this step still needs an answer
+    keep_case: bool = False  # parse the answer as typed instead of lowercased (stored verbatim)
+
+
+class OrderFlow:
+    """Table-driven order conversation: item → quantity → cut (per cart line), then delivery and payment.
+
+    Each answer is parsed by its step's parser; the next step is the first
+    one in ``STEPS`` that still needs an answer, so an answer that fills
+    several slots ("5kg beef mince") skips the questions it already covered.
+    Confirmation is left to the caller, which owns saving the order.
+    """
+
+    def __init__(self, catalogue_provider: Callable = None):
+        # A callable so a reloaded price catalogue is picked up without rebuilding the flow
+        self._catalogue = catalogue_provider or (lambda: None)
+        self.steps = {step.name: step for step in STEPS}
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self._completed_turns = 0
+        self._answers = {step.name: 0 for step in STEPS}
+        self._invalid = {step.name: 0 for step in STEPS}
+        self._seconds = {step.name: 0.0 for step in STEPS}
+
+    def start(self, customer_name=None):
+        self.started += 1
+        state = OrderState(customer_name)
+        return state, self.prompt(state)
+
+    def prompt(self, state: OrderState) -> str:
+        return self.steps[state.step].prompt(self, state)
+
+    def advance(self, state: OrderState) -> str:
+        """Move to the first step that still needs an answer and return its prompt."""
+        self._commit_draft(state)
+        state.step = next(s.name for s in STEPS if s.pending(state))
+        return self.prompt(state)
+
+    def handle(self, state: OrderState, text: str) -> str:
+        """Apply ``text`` to the current step and return the next message to send."""
+        started = time.perf_counter()
+        step = state.step
+        state.turns += 1
+        text = text.strip() if self.steps[step].keep_case else text.strip().lower()
+        try:
+            self.steps[step].parse(self, state, text)
+        except InvalidInput as e:
+            self._invalid[step] += 1
+            return f"⚠️ {e}\n\n{self.prompt(state)}"
+        finally:
+            self._answers[step] += 1
+            self._seconds[step] += time.perf_counter() - started
+        return self.advance(state)
+
+    def complete(self, state: OrderState):
+        """Record a confirmed order (the confirming message counts as a turn)."""
+        state.turns += 1
+        self.completed += 1
+        self._completed_turns += state.turns
+
+    def cancel(self, state: OrderState):
+        self.cancelled += 1
+
+    @staticmethod
+    def is_cancel(text: str) -> bool:
+        return " ".join(text.lower().split()).strip(".!") in CANCEL_WORDS
+
+    def _commit_draft(self, state: OrderState):
+        if state.draft is not None and state.draft.complete:
+            self.add_item(state, state.draft)
+            state.draft = None
+        if state.draft is None and state.pending:
+            state.draft = state.pending.pop(0)
+
+    def add_item(self, state: OrderState, item: CartItem):
+        """Price a complete cart line from the catalogue and add it to the cart."""
+        catalogue = self._catalogue()
+        if item.price is None and catalogue is not None:
+            if item.cut == "standard":
+                entry = catalogue.standard_entry(item.product, item.grade)
+                if entry is not None:
+                    item.grade = entry.grade or None
+            else:
+                entry = self._entry(catalogue, item)
+            if entry is not None:
+                item.price = entry.price_for(item.kg)
+        state.items.append(item)
+        if len(state.items) >= MAX_CART_ITEMS:
+            state.cart_closed = True
+
+    @staticmethod
+    def _entry(catalogue, item: CartItem):
+        return next((e for e in catalogue.entries
+                     if e.product == item.product and e.cut == item.cut and (e.grade or None) == item.grade), None)
+
+    def _cuts_for(self, product: str, grade=None):
+        catalogue = self._catalogue()
+        if catalogue is None:
+            return []
+        return [e for e in catalogue.entries if e.product == product and (not grade or e.grade == grade)]
+
+    def _cut_matches(self, item: CartItem, text: str):
+        """Catalogue lines of ``item.product`` (and grade) matching the cut words in ``text``, and the confidence."""
+        catalogue = self._catalogue()
+        if catalogue is None or not len(catalogue):
+            return [], 0.0
+        grade = f"{item.grade} " if item.grade else ""
+        words = [w for w in _QUANTITY.sub(" ", text).split() if w not in ORDER_FILLER]
+        matches, confidence = catalogue.match(f"{grade}{item.product} {' '.join(words)}")
+        return [e for e in matches if e.product == item.product], confidence
+
+    def _resolve_cut(self, item: CartItem, text: str) -> bool:
+        """Set ``item.cut`` (and grade) from a unique catalogue match in ``text``; ``False`` if ambiguous/absent."""
+        matches, confidence = self._cut_matches(item, text)
+        if not matches or confidence < self._catalogue().min_confidence:
+            return False
+        if len(matches) == 1:
+            item.cut, item.grade, item.hint = matches[0].cut, matches[0].grade or None, None
+            return True
+        if len({e.cut for e in matches}) == 1:
+            # "t-bone" is sold as Commercial and Super: only the grade is left to ask
+            item.hint = matches[0].cut
+        return False
+
+    def cut_examples(self, item: CartItem) -> str:
+        cuts = {e.display_name.split(item.product.title())[-1].strip() for e in self._cuts_for(item.product, item.grade)}
+        examples = sorted(cut for cut in cuts if cut)[:3] or ["steak", "mince"]
+        return ", ".join(examples)
+
+    def cut_choices(self, item: CartItem) -> str:
+        """The catalogue lines ``item.hint`` matched, for the cut question."""
+        matches, _ = self._cut_matches(item, item.hint)
+        return ", ".join(e.display_name for e in matches[:MAX_CUT_CHOICES])
+
+    def grade_choices(self, item: CartItem) -> list:
+        """Grades ``item.hint`` is sold in when it names one cut in several grades, else ``[]``."""
+        if not item.hint:
+            return []
+        matches, _ = self._cut_matches(item, item.hint)
+        if len(matches) < 2 or len({e.cut for e in matches}) > 1:
+            return []
+        return sorted({e.grade.title() for e in matches})
+
+    def parse_item(self, state: OrderState, text: str):
+        state.draft = self.build_item(text)
+        state.unresolved = []
+
+    def build_item(self, text: str) -> CartItem:
+        """Cart line for the product (and, when given, kg and cut) named in ``text``."""
+        words = _WORD.findall(text)
+        product = next((PRODUCT_ALIASES[w] for w in words if w in PRODUCT_ALIASES), None)
+        catalogue = self._catalogue()
+        if product is None and catalogue is not None and len(catalogue):
+            matches, confidence = catalogue.match(text)
+            if matches and confidence >= catalogue.min_confidence and len({e.product for e in matches}) == 1:
+                product = matches[0].product
+        if product is None:
+            products = catalogue.products() if catalogue is not None and len(catalogue) else DEFAULT_PRODUCTS
+            raise InvalidInput(f"Sorry, we don't sell that. We have: {', '.join(p.title() for p in products)}.")
+        item = CartItem(product, grade=next((w for w in words if w in GRADE_WORDS), None))
+        if _QUANTITY.search(text):
+            try:
+                item.kg = parse_quantity(text)
+            except InvalidInput:
+                pass  # asked again at the quantity step
+        if not self._cuts_for(product):
+            item.cut = "standard"
+        elif not self._resolve_cut(item, text) and item.hint is None:
+            # "5kg beef steak": keep "steak" so the cut step offers the steaks instead of every cut
+            cut_words = " ".join(w for w in words if w not in PRODUCT_ALIASES and w not in GRADE_WORDS
+                                 and w not in FILLER_WORDS and w not in ORDER_FILLER)
+            matches, confidence = self._cut_matches(item, cut_words) if cut_words else ([], 0.0)
+            if matches and confidence >= catalogue.min_confidence:
+                item.hint = cut_words
+        return item
+
+    def parse_portion(self, state: OrderState, text: str):
+        item = state.draft
+        if " ".join(text.split()) in ANY_CUT_WORDS:
+            item.cut = "standard"
+            return
+        hint = item.hint
+        if self._resolve_cut(item, text) or (hint and self._resolve_cut(item, f"{text} {hint}")):
+            return
+        if item.hint != hint and self.grade_choices(item):
+            return  # the cut is settled; the next prompt asks for the grade
+        choices = self._cuts_for(item.product, item.grade)
+        if not choices:
+            item.cut = " ".join(text.split())[:60]
+            return
+        grades = self.grade_choices(item)
+        if grades:
+            raise InvalidInput(f"Please reply with the grade: {' or '.join(grades)}.")
+        options = self._cut_matches(item, text)[0] or (item.hint and self._cut_matches(item, item.hint)[0]) or choices
+        listed = ", ".join(e.display_name for e in options[:MAX_CUT_CHOICES])
+        raise InvalidInput(f"Which cut? For example: {listed}. Or reply *standard*.")
+
+    def parse_more(self, state: OrderState, text: str):
+        if " ".join(text.split()).strip(".!") in DONE_WORDS:
+            state.cart_closed = True
+            state.unresolved = []
+            return
+        self.parse_item(state, text)
+
+    def stats(self) -> dict:
+        return {
+            "orders_started": self.started,
+            "orders_completed": self.completed,
+            "orders_cancelled": self.cancelled,
+            "avg_turns_per_order": round(self._completed_turns / self.completed, 2) if self.completed else 0.0,
+            "steps": {
+                name: {
+                    "answers": answers,
+                    "invalid": self._invalid[name],
+                    "avg_us": round(self._seconds[name] / answers * 1e6, 1) if answers else 0.0,
+                }
+                for name, answers in self._answers.items() if name != "confirmation"
+            },
+        }
+
+
+def _portion_prompt(flow, state: OrderState) -> str:
+    item = state.draft
+    grades = flow.grade_choices(item)
+    if grades:
+        cut = cut_display_name(item.product, item.hint)
+        return f"🔪 Which grade of {item.product} {cut}? ({' or '.join(grades)})"
+    if item.hint:
+        return f"🔪 Which {item.product} {item.hint}? ({flow.cut_choices(item)}, or standard)"
+    return f"🔪 Preferred cut of {item.product}? (e.g., {flow.cut_examples(item)}, or standard)"
+
+
+def _unresolved_note(state: OrderState) -> str:
+    if not state.unresolved:
+        return ""
+    phrases = ", ".join(f"*{phrase}*" for phrase in state.unresolved)
+    return f"⚠️ I couldn't add {phrases}: please send it again with the product, e.g. *1kg chicken livers*.\n\n"
+
+
+def _more_prompt(flow, state: OrderState) -> str:
+    cart = "; ".join(item.describe() for item in state.items)
+    added = f"Added {cart}" if len(state.items) == 1 else f"In your cart: {cart}"
+    return f"{_unresolved_note(state)}🛒 {added}. Anything else? Reply with another item, or *done* to continue."
+
+
+def _confirmation_prompt(flow, state: OrderState) -> str:
+    record = state.as_record()
+    lines = "\n".join(f"  • {line}" for line in record["lines"])
+    name = f"- Name: {state.customer_name}\n" if state.customer_name else ""
+    return (
+        f"✅ Please confirm your order:\n"
+        f"{name}"
+        f"- Items:\n{lines}\n"
+        f"- Total: {record['price']}\n"
+        f"- Address: {state.delivery_address}\n"
+        f"- Time: {state.delivery_time}\n"
+        f"- Payment: {state.payment_method}\n\n"
+        "Reply *yes* to confirm or *no* to cancel."
+    )
+
+
+STEPS = (
+    Step("item",
+         lambda flow, state: (f"{_unresolved_note(state)}"
+                              "🍖 What would you like to order? (e.g., Beef, Chicken, Pork, Fish)"),
+         OrderFlow.parse_item,
+         lambda state: state.draft is None and not state.items),
+    Step("quantity",
+         lambda flow, state: f"📦 How much {state.draft.product} do you need? (e.g., 5kg, 10kg)",
+         lambda flow, state, text: setattr(state.draft, "kg", parse_quantity(text)),
+         lambda state: state.draft is not None and state.draft.kg is None),
+    Step("portion",
+         _portion_prompt,
+         OrderFlow.parse_portion,
+         lambda state: state.draft is not None and state.draft.cut is None),
+    Step("more",
+         _more_prompt,
+         OrderFlow.parse_more,
+         lambda state: not state.cart_closed),
+    Step("delivery_address",
+         lambda flow, state: "📍 Please provide your delivery location (e.g., 8233 Glenview 8)",
+         lambda flow, state, text: setattr(state, "delivery_address", parse_address(text)),
+         lambda state: state.delivery_address is None,
+         keep_case=True),
+    Step("delivery_time",
+         lambda flow, state: "🕒 What time should we deliver? (Morning, Afternoon, Evening)",
+         lambda flow, state, text: setattr(state, "delivery_time", parse_window(text)),
+         lambda state: state.delivery_time is None),
+    Step("payment_method",
+         lambda flow, state: f"💳 How will you pay? ({', '.join(PAYMENT_METHODS)})",
+         lambda flow, state, text: setattr(state, "payment_method", parse_payment(text)),
+         lambda state: state.payment_method is None),
+    Step("confirmation",
+         _confirmation_prompt,
+         lambda flow, state, text: None,
+         lambda state: True),
+)
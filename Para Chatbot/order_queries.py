@@ -0,0 +1,150 @@
+"""Order listing for /orders and /orders/export.
+
+Pages use a keyset cursor on ``(created_at, id)`` (newest first) instead of
+OFFSET, so page 500 costs the same index seek as page 1. Every filter maps to
+an index: created_at, (phone_number, created_at) and (product, order_id) on
+order_items. The export walks the same keyset in pages of ``EXPORT_CHUNK``
+and never holds more than one page in memory.
+"""
+import base64
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from models import Order, OrderItem, SessionLocal
+
+ORDERS_PAGE_MAX = int(os.getenv("ORDERS_PAGE_MAX", "500"))
+EXPORT_CHUNK = int(os.getenv("ORDERS_EXPORT_CHUNK", "500"))
+
+CSV_FIELDS = ["id", "created_at", "phone_number", "customer_name", "status", "items", "total_kg", "total_price",
+              "price_option", "payment_method", "delivery_time", "delivery_address"]
+
+
+def encode_cursor(order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Opaque cursor -> (created_at, id); ValueError if it was not made by ``encode_cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, order_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def filtered(query, since=None, until=None, phone=None, product=None, status=None):
+    """Apply the /orders filters; ``until`` is exclusive."""
+    if since is not None:
+        query = query.filter(Order.created_at >= since)
+    if until is not None:
+        query = query.filter(Order.created_at < until)
+    if phone:
+        query = query.filter(Order.phone_number == phone)
+    if product:
+        # EXISTS keeps the walk down the created_at index (stopping at ``limit``) with one
+        # (product, order_id) probe per order, where IN (...) would sort every match first
+        query = query.filter(Order.items.any(OrderItem.product == product))
+    if status:
+        query = query.filter(Order.status == status)
+    return query.order_by(Order.created_at.desc(), Order.id.desc())
+
+
+def order_page(db, limit=50, cursor=None, **filters):
+    """One page of orders after ``cursor`` and the cursor for the next page (None on the last page)."""
+    limit = max(1, min(limit, ORDERS_PAGE_MAX))
+    query = filtered(db.query(Order), **filters)
+    if cursor:
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(*decode_cursor(cursor)))
+    orders = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return orders[:limit], next_cursor
+
+
+def order_to_dict(order) -> dict:
+    return {
+        "id": order.id,
+        "customer_name": order.customer_name,
+        "phone_number": order.phone_number,
+        "meat_type": order.meat_type,
+        "price_option": order.price_option,
+        "total_price": order.total_price,
+        "quantity": order.quantity,
+        "custom_cuts": order.custom_cuts,
+        "payment_method": order.payment_method,
+        "delivery_time": order.delivery_time,
+        "delivery_address": order.delivery_address,
+        "status": order.status,
+        "items": [
+            {"product": item.product, "grade": item.grade, "cut": item.cut, "quantity": item.quantity,
+             "quantity_kg": item.quantity_kg, "price": item.price}
+            for item in order.items
+        ],
+        "created_at": order.created_at.isoformat() if order.created_at is not None else None,
+        "updated_at": order.updated_at.isoformat() if order.updated_at is not None else None,
+    }
+
+
+def _csv_row(order) -> dict:
+    return {
+        "id": order.id,
+        "created_at": order.created_at.isoformat() if order.created_at is not None else "",
+        "phone_number": order.phone_number,
+        "customer_name": order.customer_name or "",
+        "status": order.status,
+        "items": "; ".join(item.description for item in order.items),
+        "total_kg": sum(item.quantity_kg or 0.0 for item in order.items),
+        "total_price": order.total_price if order.total_price is not None else "",
+        "price_option": order.price_option or "",
+        "payment_method": order.payment_method or "",
+        "delivery_time": order.delivery_time or "",
+        "delivery_address": order.delivery_address or "",
+    }
+
+
+def _export_pages(db, **filters):
+    """The filtered orders one keyset page of ``EXPORT_CHUNK`` at a time (items arrive with each page)."""
+    cursor = None
+    while True:
+        query = filtered(db.query(Order), **filters)
+        if cursor is not None:
+            query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(*cursor))
+        orders = query.limit(EXPORT_CHUNK).all()
+        if orders:
+            yield orders
+        if len(orders) < EXPORT_CHUNK:
+            return
+        cursor = orders[-1].created_at, orders[-1].id
+        # The page has been written out; drop it from the identity map
+        db.expunge_all()
+
+
+def export_orders(fmt="ndjson", **filters):
+    """Yield the filtered orders as NDJSON lines or CSV text, one chunk of rows at a time.
+
+    Opens its own session: the response body is produced after the request's
+    ``get_db`` session has closed.
+    """
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            yield buffer.getvalue()
+            for orders in _export_pages(db, **filters):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(_csv_row(order) for order in orders)
+                yield buffer.getvalue()
+        else:
+            for orders in _export_pages(db, **filters):
+                yield "".join(json.dumps(order_to_dict(order), ensure_ascii=False) + "\n" for order in orders)
+    finally:
+        db.close()
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+from analytics import record_orders
+from models import ChatMessage, SessionLocal, create_order, engine
+
+logger = logging.getLogger(__name__)
+
+ORDER_WRITER_MAX_BATCH = int(os.getenv("ORDER_WRITER_MAX_BATCH", "256"))
+# How long the writer waits for more writes to share a commit with the first one
+ORDER_WRITER_MAX_DELAY = float(os.getenv("ORDER_WRITER_MAX_DELAY", "0.005"))
+# FULL: a commit survives power loss, so an acknowledged order is really on disk
+ORDER_WRITER_SYNCHRONOUS = os.getenv("ORDER_WRITER_SYNCHRONOUS", "FULL")
+
+_ORDER = "order"
+_CHAT = "chat"
+
+
+class OrderWriter:
+    """Write-behind repository that group-commits orders and chat-log lines.
+
+    Writes are queued from the event loop; one task takes whatever arrived
+    within ``max_delay`` of the first write (up to ``max_batch``) and commits
+    it in a single transaction on a dedicated connection in a worker thread,
+    so N concurrent orders cost one fsync instead of N (the batch's daily
+    rollup deltas commit with it). ``save_order`` only
+    returns once its transaction has committed; chat lines are fire-and-forget.
+    If a batch fails, its writes are retried one by one so a bad row only
+    fails its own caller.
+    """
+
+    def __init__(self, bind=engine, max_batch: int = ORDER_WRITER_MAX_BATCH,
+                 max_delay: float = ORDER_WRITER_MAX_DELAY, synchronous: str = ORDER_WRITER_SYNCHRONOUS):
+        self.bind = bind
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.synchronous = synchronous
+        self._queue = None
+        self._task = None
+        self._connection = None
+
+        self.batches = 0
+        self.orders_written = 0
+        self.chat_written = 0
+        self.failed = 0
+        self.largest_batch = 0
+        self._commit_seconds = 0.0
+        self._ack_latencies = deque(maxlen=1000)
+
+    async def start(self):
+        if self._task:
+            return
+        self._queue = asyncio.Queue()
+        self._connection = await asyncio.to_thread(self._connect)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"🗄️ Order writer started (batch ≤{self.max_batch}, window {self.max_delay * 1000:.0f}ms, "
+                    f"synchronous={self.synchronous})")
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Commit what is queued (up to ``drain_timeout``), then close the connection.
+
+        Writes queued after this point are refused; ``save_order`` callers still
+        waiting on an uncommitted order get an error instead of hanging.
+        """
+        if not self._task:
+            return
+        queue, task = self._queue, self._task
+        try:
+            await asyncio.wait_for(queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Order writer stopped with {queue.qsize()} writes not committed")
+        self._queue = None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        while not queue.empty():
+            _, _, future, _ = queue.get_nowait()
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("Order writer stopped before the order was committed"))
+        await asyncio.to_thread(self._connection.close)
+
+    def _connect(self):
+        connection = self.bind.connect()
+        connection.exec_driver_sql(f"PRAGMA synchronous={self.synchronous}")
+        connection.commit()
+        return connection
+
+    async def save_order(self, phone_number, items, **fields):
+        """Queue an order (see ``models.create_order``) and return it once it is durably committed."""
+        if self._queue is None:
+            raise RuntimeError("Order writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((_ORDER, (phone_number, items, fields), future, time.perf_counter()))
+        return await future
+
+    def log_message(self, phone_number, direction, content, message_id=None, created_at=None):
+        """Queue one transcript line; committed with the next batch."""
+        if self._queue is None:
+            logger.warning(f"Order writer not running; {direction} transcript line for {phone_number} not logged")
+            return
+        row = {"phone_number": phone_number, "direction": direction, "content": content, "message_id": message_id,
+               "created_at": created_at or datetime.utcnow()}
+        self._queue.put_nowait((_CHAT, row, None, time.perf_counter()))
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                started = time.perf_counter()
+                results = await asyncio.to_thread(self._commit, batch)
+                self._commit_seconds += time.perf_counter() - started
+            except Exception as e:
+                results = [e] * len(batch)
+            self._settle(batch, results)
+
+    def _settle(self, batch, results):
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        now = time.perf_counter()
+        for (kind, _, future, queued_at), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self.failed += 1
+                if future is None:
+                    logger.error(f"Chat log write failed: {result}")
+            elif kind == _ORDER:
+                self.orders_written += 1
+                self._ack_latencies.append(now - queued_at)
+            else:
+                self.chat_written += 1
+            if future is not None and not future.done():
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._queue.task_done()
+
+    def _apply(self, db, kind, payload):
+        if kind == _ORDER:
+            phone_number, items, fields = payload
+            order = create_order(db, phone_number, items, **fields)
+            # Flush (no fsync) so a second order from a new customer in the same batch finds the customer row
+            db.flush()
+            return order
+        db.add(ChatMessage(**payload))
+        return None
+
+    def _commit(self, batch):
+        """Runs in a worker thread: one transaction for the whole batch, falling back to one per write."""
+        db = SessionLocal(bind=self._connection)
+        try:
+            results = [self._apply(db, kind, payload) for kind, payload, _, _ in batch]
+            # Daily rollups move in the same transaction, so the dashboard never counts an uncommitted order
+            record_orders(db, [order for order in results if order is not None])
+            db.commit()
+            return results
+        except Exception as e:
+            db.rollback()
+            if len(batch) == 1:
+                return [e]
+            logger.error(f"Group commit of {len(batch)} writes failed, retrying one by one: {e}")
+            return [self._commit([entry])[0] for entry in batch]
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        latencies = sorted(self._ack_latencies)
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "orders_written": self.orders_written,
+            "chat_lines_written": self.chat_written,
+            "failed": self.failed,
+            "avg_batch_size": round((self.orders_written + self.chat_written) / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "avg_commit_ms": round(self._commit_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+            "p95_order_ack_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else 0.0,
+        }
@@ -1,13 +1,15 @@
 from fastapi import FastAPI, Request, BackgroundTasks
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from models import Order, Base, engine, SessionLocal
+from models import create_order, session_scope
+from migrations import migrate
 from knowledge_loader import load_csv, load_excel, load_google_sheet, scrape_website
 from openai import OpenAI
-import os, requests
+import os
 import logging
 from fastapi.logger import logger as fastapi_logger
 from knowledge_manager import KnowledgeManager
+from whatsapp_api import get_whatsapp
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +18,7 @@ load_dotenv()
 VERIFY_TOKEN = os.getenv("VERIFY_TOKEN")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+whatsapp = get_whatsapp()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Live agent contact details (WhatsApp or phone number)
@@ -24,7 +27,7 @@ LIVE_AGENT_PHONE_NUMBER = os.getenv("LIVE_AGENT_PHONE_NUMBER")
 
 client = OpenAI(api_key=OPENAI_API_KEY)
 # Initialize DB
-Base.metadata.create_all(bind=engine)
+migrate()
 
 # Configure logging to use FastAPI's logger (which integrates with uvicorn)
 fastapi_logger.setLevel(logging.INFO)
@@ -177,15 +180,12 @@ def handle_message(user_text, sender_id):
                 # Final confirmation step
                 if user_text.lower() in ["yes", "confirm", "y"]:
                     # Save order to DB
-                    db = SessionLocal()
-                    order = Order(
-                        phone=sender_id,
-                        product=pending_order.get("item", ""),
-                        quantity=pending_order.get("quantity", ""),
-                    )
-                    db.add(order)
-                    db.commit()
-                    db.close()
+                    with session_scope() as db:
+                        create_order(db, sender_id, items=[{
+                            "product": pending_order.get("item", ""),
+                            "quantity": pending_order.get("quantity", ""),
+                            "cut": pending_order.get("portion"),
+                        }])
                     response = "✅ Your order has been confirmed and saved. Thank you!"
                     # Forward order to live agent via WhatsApp if configured
                     if LIVE_AGENT_WHATSAPP_NUMBER:
@@ -322,17 +322,5 @@ def handle_message(user_text, sender_id):
         logger.error(f"❌ Background handler error: {e}")
 
 def send_whatsapp_message(recipient_id, message):
-    url = f"https://graph.facebook.com/v19.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "text",
-        "text": {"body": message}
-    }
-    response = requests.post(url, headers=headers, json=payload)
-    logger.info(f"📤 Sent: {response.status_code} {response.text}")
+    whatsapp.send_text(recipient_id, message)
 
@@ -0,0 +1,378 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from lazy_sqlite import LazyConnection
+from whatsapp_api import get_async_whatsapp, text_payload, typing_payload
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DB_PATH = os.getenv("OUTBOX_DB_PATH", "outbox.db")
+# Graph API throughput per business number (messages/second) and the per-user pair limit
+OUTBOUND_BUSINESS_RATE = float(os.getenv("OUTBOUND_BUSINESS_RATE", "60"))
+OUTBOUND_BUSINESS_BURST = float(os.getenv("OUTBOUND_BUSINESS_BURST", "80"))
+OUTBOUND_RECIPIENT_RATE = float(os.getenv("OUTBOUND_RECIPIENT_RATE", "0.5"))
+OUTBOUND_RECIPIENT_BURST = float(os.getenv("OUTBOUND_RECIPIENT_BURST", "10"))
+OUTBOUND_MAX_IN_FLIGHT = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", "32"))
+
+# Lower number goes first
+PRIORITY_REPLY = 0          # answers to a customer who is waiting in the chat
+PRIORITY_NOTIFICATION = 1   # order confirmations, receipts
+PRIORITY_AGENT = 2          # forwards to live agents
+PRIORITY_NAMES = {PRIORITY_REPLY: "reply", PRIORITY_NOTIFICATION: "notification", PRIORITY_AGENT: "agent"}
+
+# WhatsApp rejects text bodies longer than this
+MAX_TEXT_LENGTH = 4096
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``burst``."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now) -> float:
+        """Seconds until one token is available (0 when one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class OutboxItem:
+    __slots__ = ("id", "recipient", "kind", "body", "priority", "coalesce", "enqueued_at")
+
+    def __init__(self, id, recipient, kind, body, priority, coalesce, enqueued_at):
+        self.id = id
+        self.recipient = recipient
+        self.kind = kind
+        self.body = body
+        self.priority = priority
+        self.coalesce = coalesce
+        self.enqueued_at = enqueued_at
+
+
+class OutboundScheduler:
+    """Rate-limited, prioritised, durable queue for every message we send on WhatsApp.
+
+    Sends are written to a SQLite outbox before they are queued and removed
+    once Meta accepts them, so anything still queued at shutdown (or a crash)
+    is replayed on the next start. A single dispatcher picks the
+    highest-priority item whose recipient is not already being sent to and
+    whose token bucket has a token, subject to the business-number bucket, so
+    messages to one recipient go out in order. Consecutive queued texts to the
+    same recipient marked ``coalesce`` (agent forwards) are merged into one
+    message. ``on_sent(recipient, text, message_id)`` is called for every
+    message Meta accepts (not typing indicators) so it can be transcribed.
+    """
+
+    def __init__(self, db_path: str = OUTBOX_DB_PATH, business_rate: float = OUTBOUND_BUSINESS_RATE,
+                 business_burst: float = OUTBOUND_BUSINESS_BURST, recipient_rate: float = OUTBOUND_RECIPIENT_RATE,
+                 recipient_burst: float = OUTBOUND_RECIPIENT_BURST, max_in_flight: int = OUTBOUND_MAX_IN_FLIGHT,
+                 client_factory=get_async_whatsapp, on_sent=None):
+        self.db_path = db_path
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.max_in_flight = max_in_flight
+        self.client_factory = client_factory
+        self.on_sent = on_sent
+        self._business = TokenBucket(business_rate, business_burst)
+        self._recipients = {}
+        self._lanes = {priority: deque() for priority in PRIORITY_NAMES}
+        self._in_flight = set()
+        self._tasks = set()
+        self._wakeup = None
+        self._dispatcher = None
+        self._next_volatile_id = -1
+
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self.throttled = 0
+        self._latency_total = 0.0
+        self._latencies = deque(maxlen=500)
+
+        self._db = LazyConnection(db_path, (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " recipient TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " mergeable INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " created_at REAL NOT NULL,"
+            " error TEXT)",
+            "CREATE INDEX IF NOT EXISTS ix_outbox_status ON outbox (status, id)",
+        ))
+
+    @property
+    def _conn(self):
+        return self._db.get()
+
+    # --- lifecycle ---
+
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        self._wakeup = asyncio.Event()
+        rows = self._conn.execute(
+            "SELECT id, recipient, kind, body, priority, mergeable, created_at FROM outbox "
+            "WHERE status = 'queued' ORDER BY id"
+        ).fetchall()
+        # Sends queued in this process before start() are already in the lanes
+        queued = {item.id for lane in self._lanes.values() for item in lane}
+        rows = [row for row in rows if row[0] not in queued]
+        for row_id, recipient, kind, body, priority, coalesce, _created_at in rows:
+            self._lanes.setdefault(priority, deque()).append(
+                OutboxItem(row_id, recipient, kind, json.loads(body), priority, bool(coalesce), time.time())
+            )
+        self.replayed = len(rows)
+        if rows:
+            logger.info(f"📮 Replaying {len(rows)} queued outbound messages from the outbox")
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Send what can be sent within ``drain_timeout``; the rest stays in the outbox for next start."""
+        if self._dispatcher is None:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while (self.queue_depth() or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        self._dispatcher = None
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=max(0.0, deadline - time.monotonic()))
+        # Sends still running past the deadline must finish before the outbox connection closes;
+        # a cancelled send keeps its outbox row and is replayed on next start
+        pending = list(self._tasks)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if self.queue_depth():
+            logger.warning(f"Outbound scheduler stopped with {self.queue_depth()} messages left in the outbox")
+        self._db.close()
+
+    # --- enqueue ---
+
+    def enqueue(self, recipient, kind, body, priority=PRIORITY_REPLY, coalesce=False, durable=True):
+        """Queue a send and return immediately; ``durable`` sends survive a restart."""
+        if not recipient:
+            return None
+        now = time.time()
+        if durable:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (recipient, kind, body, priority, mergeable, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (recipient, kind, json.dumps(body), priority, int(coalesce), now),
+            )
+            item_id = cur.lastrowid
+        else:
+            item_id = self._next_volatile_id
+            self._next_volatile_id -= 1
+        self._lanes.setdefault(priority, deque()).append(
+            OutboxItem(item_id, recipient, kind, body, priority, coalesce, now)
+        )
+        self.enqueued += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return item_id
+
+    def send_text(self, recipient, message, priority=PRIORITY_REPLY, coalesce=False):
+        return self.enqueue(recipient, "text", {"text": message}, priority, coalesce)
+
+    def send_typing(self, recipient, action="typing_on"):
+        # Only meaningful right now; not worth persisting across a restart
+        return self.enqueue(recipient, "typing", typing_payload(recipient, action), PRIORITY_REPLY, durable=False)
+
+    def send_file(self, recipient, file_path, caption="Here is your order receipt.", priority=PRIORITY_NOTIFICATION):
+        return self.enqueue(recipient, "file", {"path": file_path, "caption": caption}, priority)
+
+    def send_payload(self, recipient, payload, priority=PRIORITY_NOTIFICATION):
+        return self.enqueue(recipient, "payload", payload, priority)
+
+    # --- dispatch ---
+
+    def _bucket(self, recipient):
+        bucket = self._recipients.get(recipient)
+        if bucket is None:
+            bucket = self._recipients[recipient] = TokenBucket(self.recipient_rate, self.recipient_burst)
+        return bucket
+
+    def _next_ready(self, now):
+        """Pop the first sendable item in priority order, or return the shortest wait."""
+        wait = None
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            blocked = set()
+            for index, item in enumerate(lane):
+                if item.recipient in blocked or item.recipient in self._in_flight:
+                    blocked.add(item.recipient)
+                    continue
+                # Typing indicators skip the recipient bucket so they never hold back the reply behind them
+                delay = 0.0 if item.kind == "typing" else self._bucket(item.recipient).delay(now)
+                if delay > 0:
+                    blocked.add(item.recipient)
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+                del lane[index]
+                return item, None
+        return None, wait
+
+    def _coalesce(self, item):
+        """Merge queued coalescible texts for the same recipient that directly follow ``item``."""
+        merged = [item]
+        if item.kind != "text" or not item.coalesce:
+            return merged
+        lane = self._lanes[item.priority]
+        length = len(item.body["text"])
+        while lane:
+            nxt = next((other for other in lane if other.recipient == item.recipient), None)
+            if nxt is None or nxt.kind != "text" or not nxt.coalesce:
+                break
+            length += len(nxt.body["text"]) + 2
+            if length > MAX_TEXT_LENGTH:
+                break
+            lane.remove(nxt)
+            merged.append(nxt)
+        return merged
+
+    async def _dispatch(self):
+        last_prune = time.monotonic()
+        while True:
+            if not self.queue_depth() or len(self._in_flight) >= self.max_in_flight:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            delay = self._business.delay(now)
+            if delay > 0:
+                self.throttled += 1
+                await asyncio.sleep(delay)
+                continue
+            item, wait = self._next_ready(now)
+            if item is None:
+                if wait is not None:
+                    self.throttled += 1
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._business.take(now)
+            if item.kind != "typing":
+                self._bucket(item.recipient).take(now)
+            self._in_flight.add(item.recipient)
+            task = asyncio.create_task(self._deliver(self._coalesce(item)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            if now - last_prune > 60:
+                self._recipients = {r: b for r, b in self._recipients.items()
+                                    if r in self._in_flight or not b.idle(now)}
+                last_prune = now
+
+    async def _deliver(self, items):
+        head = items[0]
+        try:
+            client = self.client_factory()
+            if head.kind == "text":
+                text = "\n\n".join(item.body["text"] for item in items)
+                response = await client.send(text_payload(head.recipient, text), "📤 Sent")
+            elif head.kind == "file":
+                response = await client.send_file(head.recipient, head.body["path"], head.body["caption"])
+            else:
+                response = await client.send(head.body, f"📤 Sent ({head.body.get('type')})")
+            ok = response is not None and response.status_code < 400
+            error = None if ok else (response.text if response is not None else "no response")
+        except Exception as e:
+            ok, error = False, str(e)
+        finally:
+            self._in_flight.discard(head.recipient)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+        ids = [(item.id,) for item in items if item.id > 0]
+        if ok:
+            self.sent += 1
+            self.coalesced += len(items) - 1
+            latency = time.time() - head.enqueued_at
+            self._latency_total += latency
+            self._latencies.append(latency)
+            if ids:
+                self._conn.executemany("DELETE FROM outbox WHERE id = ?", ids)
+            if self.on_sent is not None:
+                self._transcribe(items, response)
+        else:
+            # Client-level retries are exhausted; keep the row for inspection instead of replaying it forever
+            self.failed += 1
+            logger.error(f"Outbound {head.kind} to {head.recipient} failed: {error}")
+            if ids:
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'failed', error = ? WHERE id = ?", [(error, i) for (i,) in ids]
+                )
+
+    def _transcribe(self, items, response):
+        head = items[0]
+        if head.kind == "typing":
+            return
+        if head.kind == "text":
+            text = "\n\n".join(item.body["text"] for item in items)
+        elif head.kind == "file":
+            text = f"📎 {head.body['caption']}"
+        else:
+            text = f"[{head.body.get('type')}]"
+        try:
+            message_id = response.json()["messages"][0]["id"]
+        except Exception:
+            message_id = None
+        try:
+            self.on_sent(head.recipient, text, message_id)
+        except Exception as e:
+            logger.error(f"Transcript of outbound {head.kind} to {head.recipient} failed: {e}")
+
+    # --- metrics ---
+
+    def queue_depth(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "queue_depth": {PRIORITY_NAMES.get(p, str(p)): len(lane) for p, lane in self._lanes.items()},
+            "in_flight": len(self._in_flight),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "throttled_waits": self.throttled,
+            "tracked_recipients": len(self._recipients),
+            "avg_send_latency_seconds": round(self._latency_total / self.sent, 4) if self.sent else 0.0,
+            "p95_send_latency_seconds": round(latencies[int(len(latencies) * 0.95)], 4) if latencies else 0.0,
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the pipeline is at its queue depth limit."""
+
+
+class MessagePipeline:
+    """Bounded pool of asyncio workers draining per-sender lanes of coroutine jobs.
+
+    Jobs submitted under the same key (the WhatsApp sender id) run strictly in
+    submission order, one at a time; different keys run in parallel across the
+    worker pool. A lane only exists while it has queued or running work, so
+    idle senders cost no memory.
+
+    ``submit`` never blocks the webhook: it either enqueues the job or raises
+    ``QueueFullError`` so the caller can tell Meta to retry later.
+    """
+
+    def __init__(self, workers: int = 64, max_queue: int = 1000, rate_window: float = 60.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rate_window = rate_window
+        self._ready = None
+        self._lanes = {}
+        self._pending = 0
+        self._tasks = []
+        self._arrivals = deque()
+
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.lanes_opened = 0
+        self.lanes_collected = 0
+        self._busy_seconds = 0.0
+
+    async def start(self):
+        if self._tasks:
+            return
+        # Holds sender keys, not jobs: a key is queued at most once at a time
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"🚦 Message pipeline started with {self.workers} workers (queue {self.max_queue})")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Let queued jobs finish (up to ``drain_timeout``), then cancel the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Pipeline stopped with {self._pending} jobs still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key, handler, *args):
+        """Queue ``handler(*args)`` (an async function) behind earlier jobs for ``key``."""
+        if self._ready is None:
+            raise RuntimeError("MessagePipeline.start() has not been called")
+        if self._pending >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"pipeline queue is full ({self.max_queue})")
+
+        job = (handler, args, time.perf_counter())
+        lane = self._lanes.get(key)
+        if lane is None:
+            self._lanes[key] = deque((job,))
+            self.lanes_opened += 1
+            self._ready.put_nowait(key)
+        else:
+            # The key is already queued or running; its worker picks this up next
+            lane.append(job)
+        self._pending += 1
+        self.submitted += 1
+        self._record_arrival()
+
+    async def join(self):
+        await self._ready.join()
+
+    async def _worker(self, worker_id):
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            handler, args, _ = lane.popleft()
+            self._pending -= 1
+            started = time.perf_counter()
+            try:
+                await handler(*args)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Pipeline worker {worker_id} job for {key} failed: {e}")
+            finally:
+                self._busy_seconds += time.perf_counter() - started
+                if lane:
+                    # Requeue behind other senders so one chatty customer can't starve the rest
+                    self._ready.put_nowait(key)
+                else:
+                    del self._lanes[key]
+                    self.lanes_collected += 1
+                self._ready.task_done()
+
+    def _record_arrival(self):
+        now = time.monotonic()
+        self._arrivals.append(now)
+        cutoff = now - self.rate_window
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+
+    def incoming_rate(self) -> float:
+        """Messages per second received over the last ``rate_window`` seconds."""
+        now = time.monotonic()
+        cutoff = now - self.rate_window
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+        return len(self._arrivals) / self.rate_window
+
+    def stats(self) -> dict:
+        done = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._pending,
+            "active_senders": len(self._lanes),
+            "lanes_opened": self.lanes_opened,
+            "lanes_collected": self.lanes_collected,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "incoming_rate_per_sec": round(self.incoming_rate(), 3),
+            "avg_handle_seconds": round(self._busy_seconds / done, 4) if done else 0.0,
+        }
@@ -0,0 +1,334 @@
+import difflib
+import re
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+# Most lines a direct answer will list before summarising as a price range
+MAX_LISTED_PRICES = 8
+
+# Section headings in the price sheet -> (product, grade)
+SECTION_HEADINGS = {
+    "chickens": ("chicken", ""),
+    "chicken": ("chicken", ""),
+    "beef - economy": ("beef", "economy"),
+    "beef - commercial": ("beef", "commercial"),
+    "beef - choice": ("beef", "choice"),
+    "beef - super": ("beef", "super"),
+    "pork super": ("pork", "super"),
+    "pork": ("pork", ""),
+    "lamb": ("lamb", ""),
+    "sausages": ("sausage", ""),
+    "goat": ("goat", ""),
+    "fish": ("fish", ""),
+}
+
+# Customer words (English and Shona) -> product
+PRODUCT_ALIASES = {
+    "beef": "beef", "bhifu": "beef", "mombe": "beef", "yemombe": "beef", "yebhifu": "beef",
+    "chicken": "chicken", "chickens": "chicken", "huku": "chicken", "yehuku": "chicken",
+    "pork": "pork", "nguruve": "pork", "yenguruve": "pork", "poko": "pork",
+    "lamb": "lamb", "mutton": "lamb", "hwai": "lamb", "gwai": "lamb", "gwayana": "lamb", "yehwai": "lamb",
+    "goat": "goat", "mbudzi": "goat", "yembudzi": "goat",
+    "fish": "fish", "hove": "fish", "yehove": "fish",
+    "sausage": "sausage", "sausages": "sausage", "soseji": "sausage", "wors": "sausage", "boerewors": "sausage",
+}
+
+GRADE_WORDS = {"economy", "commercial", "choice", "super"}
+
+# Sheet lines that price a "standard" (no particular cut) order
+STANDARD_CUTS = {"mixed cuts", "mixed portions"}
+
+# Extra names for cuts whose sheet label is misspelt or has a local name
+CUT_ALIASES = {
+    "drumstics": ["drumsticks", "drumstick", "drums"],
+    "giz": ["gizzards", "gizzard", "zvipfuva"],
+    "eye of ramp": ["eye of rump", "rump"],
+    "whole lamp": ["whole lamb"],
+    "breams": ["bream"],
+    "bones & backs": ["backs", "bones", "backs and bones"],
+    "feet": ["mazondo ehuku", "chicken feet"],
+    "trotters": ["mazondo"],
+    "tenderloin/fillet": ["fillet steak", "tenderloin"],
+    "bolo mince": ["bolognaise mince", "mince"],
+    "steak mince": ["mince"],
+    "oxtail": ["ox tail", "muswe"],
+    "liver": ["chiropa"],
+}
+
+# Corrected spellings shown to customers
+CUT_DISPLAY_NAMES = {
+    "drumstics": "drumsticks",
+    "giz": "gizzards",
+    "eye of ramp": "eye of rump",
+    "whole lamp": "whole lamb",
+    "breams": "bream",
+}
+
+# Bulk prices (USD/kg) applied at or above WHOLESALE_THRESHOLD_KG, keyed (product, grade, cut)
+WHOLESALE_THRESHOLD_KG = 20.0
+WHOLESALE_PRICES = {
+    ("chicken", "", "drumstics"): 5.00,
+    ("chicken", "", "wings"): 4.80,
+    ("chicken", "", "breasts"): 5.00,
+    ("pork", "super", "mixed cuts"): 4.30,
+    ("beef", "economy", "mixed cuts"): 4.00,
+    ("beef", "commercial", "mixed cuts"): 4.70,
+    ("beef", "super", "mixed cuts"): 6.00,
+}
+
+PRICE_WORDS = {"price", "prices", "cost", "costs", "much", "marii", "mutengo", "rate", "per"}
+STOCK_WORDS = {"have", "got", "available", "stock", "mune", "munayo", "tine", "sell", "selling"}
+SHONA_WORDS = {"marii", "mutengo", "mune", "munayo", "here", "nhasi", "iri", "yakawanda", "ndeipi", "tine"}
+FILLER_WORDS = {
+    "how", "is", "are", "the", "a", "an", "of", "for", "do", "does", "you", "your", "what", "whats",
+    "please", "kg", "kgs", "per", "today", "any", "some", "me", "i", "want", "need", "would", "like",
+    "can", "get", "in", "ne", "ye", "we", "pa", "ku", "nhasi", "here", "iri", "zviri", "ma", "and", "meat",
+    "nyama", "fresh", "my", "much", "price", "cost",
+} | PRICE_WORDS | STOCK_WORDS
+
+_WORD_RE = re.compile(r"[a-z&]+")
+_QUANTITY_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:kg|kgs|kilo|kilos|kilograms?)\b")
+
+
+def cut_display_name(product: str, cut: str) -> str:
+    """Customer-facing cut name: corrected spelling, without a product word the sheet label repeats."""
+    cut = CUT_DISPLAY_NAMES.get(cut, cut)
+    # "beef sirloin steak" under BEEF reads "Beef Sirloin Steak", not "Beef Beef Sirloin Steak"
+    return cut[len(product):].lstrip() if cut.startswith(f"{product} ") else cut
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _name_tokens(name: str) -> frozenset:
+    """Index tokens for a cut name; product and filler words are matched separately."""
+    return frozenset(
+        _stem(w) for w in _WORD_RE.findall(name.lower())
+        if w != "&" and w not in PRODUCT_ALIASES and w not in FILLER_WORDS
+    )
+
+
+@dataclass(frozen=True)
+class CatalogueEntry:
+    product: str
+    cut: str
+    grade: str
+    unit_price: float
+    wholesale_threshold_kg: float = WHOLESALE_THRESHOLD_KG
+    wholesale_price: Optional[float] = None
+
+    @property
+    def display_name(self) -> str:
+        grade = f"{self.grade.title()} " if self.grade else ""
+        return f"{grade}{self.product.title()} {cut_display_name(self.product, self.cut).title()}"
+
+    def price_for(self, kg: float) -> float:
+        if self.wholesale_price is not None and kg >= self.wholesale_threshold_kg:
+            return round(self.wholesale_price * kg, 2)
+        return round(self.unit_price * kg, 2)
+
+
+@dataclass
+class PriceCatalogue:
+    """Typed, in-memory view of the Excel price list with a fuzzy name index.
+
+    ``answer`` handles the high-confidence "how much is X" / "do you have X"
+    messages directly and returns None for anything it isn't sure about, so
+    the caller can fall back to the LLM.
+    """
+
+    entries: list = field(default_factory=list)
+    min_confidence: float = 0.75
+
+    def __post_init__(self):
+        self.answered = 0
+        self.fallbacks = 0
+        self._answer_seconds = 0.0
+        self._build_index()
+
+    @classmethod
+    def from_rows(cls, rows, **kwargs):
+        """Build from (label, price, ...) rows as read from the sheet's first columns."""
+        by_key = {}
+        product, grade = "", ""
+        for row in rows:
+            label = str(row[0]).strip() if row and row[0] is not None and row[0] == row[0] else ""
+            if not label:
+                continue
+            price = _to_price(row[1] if len(row) > 1 else None)
+            key = label.lower()
+            if price is None:
+                if key in SECTION_HEADINGS:
+                    product, grade = SECTION_HEADINGS[key]
+                continue
+            if not product:
+                continue
+            cut = " ".join(key.split())
+            entry = CatalogueEntry(
+                product=product,
+                cut=cut,
+                grade=grade,
+                unit_price=price,
+                wholesale_price=WHOLESALE_PRICES.get((product, grade, cut)),
+            )
+            # A repeated section (e.g. the second LAMB block) replaces older prices
+            by_key[(product, grade, cut)] = entry
+        return cls(entries=list(by_key.values()), **kwargs)
+
+    def _build_index(self):
+        self._by_token = {}
+        self._names = []
+        self._full_names = [_name_tokens(entry.cut) for entry in self.entries]
+        for i, entry in enumerate(self.entries):
+            names = [entry.cut] + [part.strip() for part in re.split(r"[/()]", entry.cut) if part.strip()]
+            names += CUT_ALIASES.get(entry.cut, [])
+            token_sets = {tokens for tokens in map(_name_tokens, names) if tokens}
+            self._names.append(token_sets)
+            for tokens in token_sets:
+                for token in tokens:
+                    self._by_token.setdefault(token, set()).add(i)
+        self._vocabulary = sorted(self._by_token)
+        self._correct = lru_cache(maxsize=4096)(self._correct_word)
+
+    def _correct_word(self, word: str) -> Optional[str]:
+        """Map a misspelt word onto the cut vocabulary (None if nothing is close)."""
+        if word in self._by_token:
+            return word
+        match = difflib.get_close_matches(word, self._vocabulary, n=1, cutoff=0.85)
+        return match[0] if match else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def products(self):
+        return sorted({e.product for e in self.entries})
+
+    def standard_entry(self, product: str, grade: str = None) -> Optional[CatalogueEntry]:
+        """Line a "standard" order is priced from: the cheapest mixed cuts, else the cheapest line of the product."""
+        lines = [e for e in self.entries if e.product == product and (not grade or e.grade == grade)]
+        mixed = [e for e in lines if e.cut in STANDARD_CUTS]
+        return min(mixed or lines, key=lambda e: e.unit_price, default=None)
+
+    def match(self, text: str):
+        """Return (entries, confidence) for the cut/product mentioned in ``text``."""
+        raw = _WORD_RE.findall(text.lower())
+        product = next((PRODUCT_ALIASES[w] for w in raw if w in PRODUCT_ALIASES), None)
+        grade = next((w for w in raw if w in GRADE_WORDS), None)
+        query, unknown = set(), 0
+        for word in raw:
+            if word in PRODUCT_ALIASES or word in GRADE_WORDS or word in FILLER_WORDS or word == "&":
+                continue
+            corrected = self._correct(_stem(word))
+            if corrected:
+                query.add(corrected)
+            else:
+                unknown += 1  # e.g. "deliver", "borrowdale": not a price question we can answer
+
+        candidates = set()
+        for token in query:
+            candidates |= self._by_token.get(token, set())
+        if not query:
+            # "how much is beef" -> the whole product range
+            matches = [e for e in self.entries if e.product == product and (not grade or e.grade == grade)]
+            return matches, (1.0 if matches and not unknown else 0.0)
+
+        best, scored = 0.0, []
+        for i in candidates:
+            entry = self.entries[i]
+            if product and entry.product != product:
+                continue
+            if grade and entry.grade != grade:
+                continue
+            # How much of the query a name explains, and whether the whole name was mentioned
+            coverage = max(len(query & names) / (len(query) + unknown) for names in self._names[i])
+            exact = any(names <= query for names in self._names[i])
+            scored.append((coverage, exact, i))
+            best = max(best, coverage)
+        matches = [(exact, i) for coverage, exact, i in scored if coverage == best]
+        if any(exact for exact, _ in matches):
+            matches = [(exact, i) for exact, i in matches if exact]
+        # "sirloin steak" is the SIRLOIN STEAK line, not also "beef sirloin steak/silverside"
+        full = [(exact, i) for exact, i in matches if self._full_names[i] == query]
+        return [self.entries[i] for _, i in full or matches], best
+
+    def answer(self, text: str) -> Optional[str]:
+        """Direct reply to a price/stock question, or None when the LLM should handle it."""
+        started = time.perf_counter()
+        try:
+            words = set(_WORD_RE.findall(text.lower()))
+            asks_price = bool(words & PRICE_WORDS) or "$" in text
+            asks_stock = bool(words & STOCK_WORDS)
+            if not (asks_price or asks_stock):
+                return None
+
+            matches, confidence = self.match(text)
+            if not matches or confidence < self.min_confidence:
+                self.fallbacks += 1
+                return None
+
+            shona = bool(words & SHONA_WORDS)
+            quantity = _QUANTITY_RE.search(text.lower())
+            kg = float(quantity.group(1)) if quantity else None
+
+            if len(matches) <= MAX_LISTED_PRICES:
+                reply = _format_prices(matches, kg, shona, asks_price)
+            elif len({e.product for e in matches}) == 1:
+                reply = _format_range(matches, shona, asks_price)
+            else:
+                self.fallbacks += 1
+                return None
+            self.answered += 1
+            return reply
+        finally:
+            self._answer_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        calls = self.answered + self.fallbacks
+        return {
+            "entries": len(self.entries),
+            "answered_directly": self.answered,
+            "fell_back_to_llm": self.fallbacks,
+            "avg_answer_microseconds": round(self._answer_seconds / calls * 1e6, 1) if calls else 0.0,
+        }
+
+
+def _to_price(value) -> Optional[float]:
+    if value is None or value != value:  # None or NaN
+        return None
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(price, 2) if price > 0 else None
+
+
+def _format_range(matches, shona: bool, asks_price: bool) -> str:
+    product = matches[0].product.title()
+    low = min(e.unit_price for e in matches)
+    high = max(e.unit_price for e in matches)
+    if shona:
+        reply = f"🥩 {product}: mutengo uri pakati pe${low:.2f} kusvika ku${high:.2f} pa kg zvichienderana nekucheka."
+        return reply if asks_price else f"Ehe, tine {product.lower()}! {reply} Mungada kucheka kupi?"
+    reply = f"🥩 {product} prices range from ${low:.2f} to ${high:.2f} per kg depending on the cut and grade."
+    return reply if asks_price else f"Yes, we have {product.lower()} in stock! {reply} Which cut would you like?"
+
+
+def _format_prices(matches, kg, shona: bool, asks_price: bool) -> str:
+    lines = []
+    for entry in sorted(matches, key=lambda e: e.unit_price):
+        line = f"• {entry.display_name}: ${entry.unit_price:.2f}/kg"
+        if kg:
+            line += f" → {kg:g}kg = ${entry.price_for(kg):.2f}"
+        if entry.wholesale_price is not None:
+            line += f" (wholesale ${entry.wholesale_price:.2f}/kg from {entry.wholesale_threshold_kg:g}kg)"
+        lines.append(line)
+    if shona:
+        header = "Ehe, tinayo! Mitengo:" if not asks_price else "💵 Mitengo (USD, pa kg, VAT isina):"
+        footer = "Mungada makg mangani?"
+    else:
+        header = "Yes, we have it in stock! Prices:" if not asks_price else "💵 Prices (USD per kg, excl. VAT):"
+        footer = "How many kg would you like?"
+    return "\n".join([header, *lines, footer])
@@ -0,0 +1,95 @@
+import logging
+from collections import deque
+
+from token_counter import static_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant for Para Meats butchery."
+
+
+class PromptAssembler:
+    """Builds chat messages so the large, static part is a byte-identical prefix.
+
+    OpenAI caches prompt prefixes automatically, but only when they match
+    exactly. The layout is therefore:
+
+    1. the system prompt (changes only on ``load prompt``; cached per version)
+    2. the conversation summary and earlier turns (append-only per sender)
+    3. one volatile system message: retrieved knowledge, customer name, clock
+    4. the latest user message
+
+    so everything above step 3 is shared with the sender's previous request.
+    """
+
+    def __init__(self, knowledge_manager):
+        self.knowledge_manager = knowledge_manager
+        self._static = None
+        self._static_version = None
+
+    def static_prefix(self):
+        """(message, version) for the static system prompt, rebuilt only when the prompt changes."""
+        version = self.knowledge_manager.prompt_version
+        if self._static_version != version:
+            content = self.knowledge_manager.get_prompt() or DEFAULT_SYSTEM_PROMPT
+            self._static = {"role": "system", "content": content}
+            self._static_version = version
+        return self._static, version
+
+    def static_tokens(self) -> int:
+        message, version = self.static_prefix()
+        return static_tokens.count("system_prompt", version, message["content"])
+
+    def build(self, conversation_messages, knowledge="", customer_name=None, now=None, greeting="", status=""):
+        """Full message list; ``conversation_messages`` must end with the new user message."""
+        static, _ = self.static_prefix()
+        volatile = []
+        if knowledge:
+            volatile.append(f"Knowledge base (relevant extracts):\n{knowledge}")
+        if customer_name:
+            volatile.append(f"Customer name: {customer_name}. Use their name naturally in responses when appropriate.")
+        if now is not None:
+            volatile.append(f"Current Zimbabwe time: {now.strftime('%A %H:%M')}.\n{greeting}! {status}")
+
+        earlier, latest = conversation_messages[:-1], conversation_messages[-1:]
+        messages = [static] + earlier
+        if volatile:
+            messages.append({"role": "system", "content": "\n\n".join(volatile)})
+        return messages + latest
+
+
+class PromptCacheMetrics:
+    """Cached vs uncached prompt tokens, from the ``usage`` block of each completion."""
+
+    def __init__(self, recent: int = 50):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.recent = deque(maxlen=recent)
+
+    def record(self, sender_id, usage):
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached
+        self.recent.append({
+            "sender_id": sender_id,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached,
+            "uncached_tokens": prompt_tokens - cached,
+        })
+        logger.info(f"🗃️ Prompt cache for {sender_id}: {cached}/{prompt_tokens} tokens cached")
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+            "cache_hit_ratio": round(self.cached_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            "recent": list(self.recent),
+        }
@@ -0,0 +1,42 @@
+import os
+import time
+
+from fpdf import FPDF
+
+
+class ReceiptPDF(FPDF):
+    def header(self):
+        # Add Logo
+        if os.path.exists("logo.png"):
+            self.image("logo.png", x=10, y=8, w=30)
+        self.set_font("Helvetica", "B", 14)
+        self.cell(0, 10, "Para Meats Receipt", ln=True, align="C")
+        self.ln(20)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Helvetica", "I", 8)
+        self.cell(0, 10, "Thank you for your order! Visit parameats.co.zw", align="C")
+
+def clean_text(text):
+    return text.encode("latin-1", "ignore").decode("latin-1") if text else ""
+
+def generate_receipt_pdf(order):
+    pdf = ReceiptPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=12)
+
+    # Order Details
+    pdf.cell(0, 10, clean_text(f"📞 Phone: {order.phone_number}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"🥩 Product: {order.meat_type}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"📦 Quantity: {order.quantity}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"💵 Price: {order.price_option}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"🔪 Cut: {order.custom_cuts}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"💳 Payment: {order.payment_method}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"📍 Delivery Address: {order.delivery_address}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"🕒 Delivery Time: {order.delivery_time}"), ln=True)
+    pdf.cell(0, 10, clean_text(f"📅 Date: {time.strftime('%Y-%m-%d %H:%M:%S')}"), ln=True)
+
+    filename = f"receipt_{order.phone_number}_{int(time.time())}.pdf"
+    pdf.output(filename)
+    return filename
@@ -0,0 +1,217 @@
+"""Delivery route planning for a day's confirmed orders.
+
+Orders are located through the suburb table (no network calls), grouped by
+delivery window, split across vehicles by direction from the shop, and each
+vehicle's stops are ordered with nearest-neighbour followed by 2-opt.
+
+    python route_planner.py --date 2025-06-14 --vehicles 3
+"""
+import argparse
+import json
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timedelta
+
+from delivery_zones import DeliveryZones
+from distance_cache import DistanceCache
+from store_hours import harare_date, to_harare
+
+logger = logging.getLogger(__name__)
+
+# Windows offered by the order flow, in dispatch order: name -> (start hour, end hour)
+DELIVERY_WINDOWS = {"morning": (8, 12), "afternoon": (12, 16), "evening": (16, 19)}
+UNSCHEDULED = "unscheduled"
+MAX_STOPS_PER_VEHICLE = 25
+TWO_OPT_TIME_BUDGET = 0.5
+
+# Only explicit clock times ("2pm", "14:30"); a bare number is a house number, stand or section
+_CLOCK_TIME = re.compile(r"\b(\d{1,2})(?=:\d{2}\b|\s*(?:am|pm)\b)(?::(\d{2}))?\s*(am|pm)?\b")
+
+
+def delivery_window(text) -> str:
+    """Map free-text delivery times ("Morning", "2pm", "14:30") to a window name."""
+    if not text:
+        return UNSCHEDULED
+    text = text.lower()
+    for name in DELIVERY_WINDOWS:
+        if name in text:
+            return name
+    match = _CLOCK_TIME.search(text)
+    if match:
+        hour = int(match.group(1))
+        if match.group(3) == "pm" and hour < 12:
+            hour += 12
+        for name, (start, end) in DELIVERY_WINDOWS.items():
+            if start <= hour < end:
+                return name
+    return UNSCHEDULED
+
+
+def delivery_date(text, placed_at: datetime = None) -> date:
+    """Harare day an order is delivered: "Tomorrow …" is the day after it was placed (UTC ``placed_at``).
+
+    Without a day, a window that has already ended when the order was placed rolls over to the next day.
+    """
+    placed = to_harare(placed_at or datetime.utcnow())
+    day = placed.date()
+    text = (text or "").lower()
+    if "tomorrow" in text:
+        return day + timedelta(days=1)
+    window = DELIVERY_WINDOWS.get(delivery_window(text))
+    if "today" not in text and window is not None and placed.hour >= window[1]:
+        return day + timedelta(days=1)
+    return day
+
+
+@dataclass
+class Stop:
+    order_id: int
+    address: str
+    window: str
+    lat: float
+    lng: float
+    customer: str = None
+
+
+@dataclass
+class Route:
+    window: str
+    vehicle: int
+    stops: list = field(default_factory=list)
+    distance_km: float = 0.0
+
+
+def _project(origin, lat, lng):
+    """Equirectangular projection to km around ``origin``; accurate to well under 1% across a city."""
+    x = math.radians(lng - origin[1]) * math.cos(math.radians(origin[0])) * 6371.0
+    y = math.radians(lat - origin[0]) * 6371.0
+    return x, y
+
+
+def _tour_length(tour, matrix):
+    return sum(matrix[a][b] for a, b in zip(tour, tour[1:]))
+
+
+def nearest_neighbour(matrix, nodes):
+    """Greedy tour over ``nodes`` starting and ending at node 0 (the shop)."""
+    tour = [0]
+    remaining = set(nodes)
+    while remaining:
+        row = matrix[tour[-1]]
+        nxt = min(remaining, key=row.__getitem__)
+        tour.append(nxt)
+        remaining.remove(nxt)
+    tour.append(0)
+    return tour
+
+
+def two_opt(tour, matrix, deadline=None):
+    """Reverse segments while that shortens the tour (first improvement), until none helps or time runs out."""
+    improved = True
+    n = len(tour)
+    while improved:
+        improved = False
+        for i in range(1, n - 2):
+            a, b = tour[i - 1], tour[i]
+            row_a, row_b = matrix[a], matrix[b]
+            for j in range(i + 1, n - 1):
+                c, d = tour[j], tour[j + 1]
+                if row_a[c] + row_b[d] < row_a[b] + matrix[c][d] - 1e-9:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    b = tour[i]
+                    row_b = matrix[b]
+                    improved = True
+            if deadline is not None and time.perf_counter() > deadline:
+                return tour
+    return tour
+
+
+def split_by_direction(stops, origin, vehicles):
+    """Sweep: sort stops by bearing from the shop and cut into ``vehicles`` contiguous sectors."""
+    ordered = sorted(stops, key=lambda stop: math.atan2(*reversed(_project(origin, stop.lat, stop.lng))))
+    size = math.ceil(len(ordered) / vehicles) if ordered else 0
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)] if size else []
+
+
+def plan_window(window, stops, zones: DeliveryZones, vehicles: int = None,
+                max_stops: int = MAX_STOPS_PER_VEHICLE, time_budget: float = TWO_OPT_TIME_BUDGET):
+    if not stops:
+        return []
+    vehicles = vehicles or math.ceil(len(stops) / max_stops)
+    routes = []
+    deadline = time.perf_counter() + time_budget
+    for vehicle, group in enumerate(split_by_direction(stops, zones.origin, vehicles), start=1):
+        points = [(0.0, 0.0)] + [_project(zones.origin, stop.lat, stop.lng) for stop in group]
+        matrix = [[math.hypot(x1 - x2, y1 - y2) for x2, y2 in points] for x1, y1 in points]
+        tour = two_opt(nearest_neighbour(matrix, range(1, len(points))), matrix, deadline)
+        routes.append(Route(
+            window=window,
+            vehicle=vehicle,
+            stops=[group[node - 1] for node in tour[1:-1]],
+            distance_km=round(_tour_length(tour, matrix) * zones.road_factor, 1),
+        ))
+    return routes
+
+
+def plan_routes(orders, distance_cache: DistanceCache, zones: DeliveryZones, vehicles: int = None,
+                max_stops: int = MAX_STOPS_PER_VEHICLE) -> dict:
+    """Plan routes for ``orders`` (objects with id, delivery_address, delivery_time, customer_name)."""
+    started = time.perf_counter()
+    by_window = {}
+    unlocated = []
+    for order in orders:
+        address = order.delivery_address or ""
+        coordinates = distance_cache.coordinates(address) if address else None
+        if coordinates is None:
+            unlocated.append({"order_id": order.id, "address": address})
+            continue
+        window = delivery_window(order.delivery_time)
+        by_window.setdefault(window, []).append(
+            Stop(order.id, address, window, coordinates[0], coordinates[1], getattr(order, "customer_name", None))
+        )
+
+    routes = []
+    for window in [*DELIVERY_WINDOWS, UNSCHEDULED]:
+        routes.extend(plan_window(window, by_window.get(window, []), zones, vehicles, max_stops))
+    return {
+        "routes": [asdict(route) for route in routes],
+        "unlocated": unlocated,
+        "stops": sum(len(route.stops) for route in routes),
+        "total_distance_km": round(sum(route.distance_km for route in routes), 1),
+        "planning_seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def orders_for_day(db, day: date):
+    """Confirmed orders to be delivered on Harare day ``day``."""
+    from models import Order
+    return (db.query(Order)
+            .filter(Order.delivery_date == day, Order.status == "confirmed")
+            .order_by(Order.id)
+            .all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan delivery routes for a day's orders")
+    parser.add_argument("--date", type=date.fromisoformat, default=harare_date(datetime.utcnow()))
+    parser.add_argument("--vehicles", type=int, default=None, help="per delivery window (default: by --max-stops)")
+    parser.add_argument("--max-stops", type=int, default=MAX_STOPS_PER_VEHICLE)
+    args = parser.parse_args()
+
+    from models import SessionLocal
+    db = SessionLocal()
+    try:
+        orders = orders_for_day(db, args.date)
+    finally:
+        db.close()
+    cache = DistanceCache()
+    plan = plan_routes(orders, cache, DeliveryZones.from_file(), args.vehicles, args.max_stops)
+    cache.close()
+    print(json.dumps(plan, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
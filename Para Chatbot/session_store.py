@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from lazy_sqlite import LazyConnection
+
+logger = logging.getLogger(__name__)
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" or "sqlite"
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "0.05"))
+
+_DELETED = object()
+
+
+def _approx_size(value) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class MemorySessionStore(MutableMapping):
+    """Per-process dict with LRU eviction at ``max_entries`` and idle expiry after ``ttl_seconds``.
+
+    Values are kept by reference, so in-place mutation works as it did with a
+    plain dict; callers should still assign back so the SQLite backend sees it.
+    """
+
+    backend = "memory"
+
+    def __init__(self, name: str, max_entries: int = SESSION_MAX_ENTRIES, ttl_seconds: float = SESSION_TTL_SECONDS,
+                 encode=None, decode=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Only used to size values in stats(); they are stored as-is
+        self._encode = encode or (lambda value: value)
+        self._data = OrderedDict()  # key -> (value, last_access)
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        cutoff = now - self.ttl_seconds
+        while self._data:
+            key, (_, touched) = next(iter(self._data.items()))
+            if touched >= cutoff:
+                break
+            self._data.popitem(last=False)
+            self.expirations += 1
+
+    def __getitem__(self, key):
+        now = time.monotonic()
+        self._expire(now)
+        value, _ = self._data[key]
+        self._data[key] = (value, now)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        now = time.monotonic()
+        self._data[key] = (value, now)
+        self._data.move_to_end(key)
+        self._expire(now)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        self._expire(time.monotonic())
+        return key in self._data
+
+    def __iter__(self):
+        self._expire(time.monotonic())
+        return iter(list(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "approx_bytes": sum(_approx_size(self._encode(value)) for value, _ in self._data.values()),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SqliteSessionStore(MutableMapping):
+    """Namespace in a shared WAL-mode SQLite file, so several uvicorn workers see one state.
+
+    Writes land in an in-process buffer (read-your-writes) and a background
+    thread flushes them every ``flush_interval`` seconds in one transaction.
+    Rows idle longer than ``ttl_seconds`` are purged, and the namespace is
+    trimmed to the ``max_entries`` most recently written keys.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, name: str, db_path: str = SESSION_DB_PATH, max_entries: int = SESSION_MAX_ENTRIES,
+                 ttl_seconds: float = SESSION_TTL_SECONDS, flush_interval: float = SESSION_FLUSH_INTERVAL,
+                 flush_batch: int = 500, encode=None, decode=None):
+        self.name = name
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._encode = encode or (lambda value: value)
+        self._decode = decode or (lambda value: value)
+        self._buffer = {}
+        self._lock = threading.RLock()
+        self._flushes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.writes_flushed = 0
+
+        self._db = LazyConnection(db_path, (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "CREATE TABLE IF NOT EXISTS session_state ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)) WITHOUT ROWID",
+            "CREATE INDEX IF NOT EXISTS ix_session_state_updated ON session_state (namespace, updated_at)",
+        ), timeout=5)
+
+        # Started by the first write, so building the store has no side effects
+        self._stop = threading.Event()
+        self._flusher = None
+
+    @property
+    def _conn(self):
+        return self._db.get()
+
+    def _start_flusher(self):
+        if self._flusher is None and not self._stop.is_set():
+            self._flusher = threading.Thread(target=self._flush_loop, name=f"session-flush-{self.name}", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Session store '{self.name}' flush failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            pending, self._buffer = self._buffer, {}
+            now = time.time()
+            upserts = [(self.name, key, value, now) for key, value in pending.items() if value is not _DELETED]
+            deletes = [(self.name, key) for key, value in pending.items() if value is _DELETED]
+            self._conn.execute("BEGIN")
+            try:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT INTO session_state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, "
+                        "updated_at = excluded.updated_at",
+                        upserts,
+                    )
+                if deletes:
+                    self._conn.executemany("DELETE FROM session_state WHERE namespace = ? AND key = ?", deletes)
+                self._flushes += 1
+                if self._flushes % 100 == 0:
+                    self._purge(now)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                # Put the writes back (newer buffered values win) and retry on the next tick
+                pending.update(self._buffer)
+                self._buffer = pending
+                raise
+            self.writes_flushed += len(pending)
+
+    def _purge(self, now):
+        cur = self._conn.execute(
+            "DELETE FROM session_state WHERE namespace = ? AND updated_at < ?",
+            (self.name, now - self.ttl_seconds),
+        )
+        self.expirations += cur.rowcount
+        cur = self._conn.execute(
+            "DELETE FROM session_state WHERE namespace = ? AND key IN ("
+            " SELECT key FROM session_state WHERE namespace = ?"
+            " ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.max_entries),
+        )
+        self.evictions += cur.rowcount
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._buffer:
+                value = self._buffer[key]
+                if value is _DELETED:
+                    raise KeyError(key)
+                return self._decode(json.loads(value))
+            row = self._conn.execute(
+                "SELECT value FROM session_state WHERE namespace = ? AND key = ? AND updated_at >= ?",
+                (self.name, key, time.time() - self.ttl_seconds),
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return self._decode(json.loads(row[0]))
+
+    def __setitem__(self, key, value):
+        encoded = json.dumps(self._encode(value), default=str)
+        with self._lock:
+            self._start_flusher()
+            self._buffer[key] = encoded
+            if len(self._buffer) >= self.flush_batch:
+                self.flush()
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        with self._lock:
+            self._start_flusher()
+            self._buffer[key] = _DELETED
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM session_state WHERE namespace = ? AND updated_at >= ?",
+                (self.name, time.time() - self.ttl_seconds),
+            ).fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self):
+        self.flush()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM session_state WHERE namespace = ? AND updated_at >= ?",
+                (self.name, time.time() - self.ttl_seconds),
+            ).fetchone()[0]
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=1)
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = len(self._buffer)
+            stored_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM session_state WHERE namespace = ?", (self.name,)
+            ).fetchone()[0]
+        return {
+            "backend": self.backend,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "approx_bytes": stored_bytes,
+            "buffered_writes": buffered,
+            "writes_flushed": self.writes_flushed,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def make_session_store(name: str, backend: str = None, **kwargs):
+    """Build the configured backend (``SESSION_BACKEND``) for one kind of per-sender state."""
+    backend = backend or SESSION_BACKEND
+    if backend == "sqlite":
+        return SqliteSessionStore(name, **kwargs)
+    kwargs.pop("db_path", None)
+    return MemorySessionStore(name, **kwargs)
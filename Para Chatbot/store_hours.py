@@ -0,0 +1,68 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+try:
+    HARARE_TZ = ZoneInfo("Africa/Harare")
+except ZoneInfoNotFoundError:
+    # Slim images without tzdata; Zimbabwe is UTC+2 all year (no DST)
+    HARARE_TZ = timezone(timedelta(hours=2), "CAT")
+
+OPENING_HOUR = 8
+
+# Opening and closing times by day
+CLOSING_TIMES = {
+    'Monday': (19, 0),
+    'Tuesday': (17, 30),
+    'Wednesday': (19, 0),
+    'Thursday': (19, 0),
+    'Friday': (17, 30),
+    'Saturday': (18, 0),
+    'Sunday': (0, 0)  # Closed all day
+}
+
+
+def harare_now():
+    """Current Zimbabwe time (UTC+2)."""
+    return datetime.now(HARARE_TZ)
+
+
+def to_harare(utc_naive: datetime) -> datetime:
+    """Zimbabwe time of a naive UTC timestamp, as stored in the database."""
+    return utc_naive.replace(tzinfo=timezone.utc).astimezone(HARARE_TZ)
+
+
+def harare_date(utc_naive: datetime) -> date:
+    return to_harare(utc_naive).date()
+
+
+def is_open(now) -> bool:
+    closing_hour, closing_minute = CLOSING_TIMES.get(now.strftime('%A'), (0, 0))
+    return (
+        (OPENING_HOUR <= now.hour < closing_hour) or
+        (now.hour == closing_hour and now.minute < closing_minute)
+    )
+
+
+def greeting_for(now) -> str:
+    # Accurate 24-hour greeting logic
+    if 5 <= now.hour < 12:
+        return "Good morning"
+    elif 12 <= now.hour < 17:
+        return "Good afternoon"
+    elif 17 <= now.hour < 22:
+        return "Good evening"
+    return "It's late night – hope you're doing well"
+
+
+def store_status(now) -> str:
+    current_day = now.strftime('%A')
+    closing_hour, closing_minute = CLOSING_TIMES.get(current_day, (0, 0))
+    if current_day == "Sunday":
+        return "We are closed today (Sunday)."
+    if is_open(now):
+        return f"We’re currently open. Today’s hours: 8:00 AM to {closing_hour}:{closing_minute:02d}."
+    if now.hour < OPENING_HOUR:
+        # Before opening
+        return f"We’re currently closed. Our hours today will be from 8:00 AM to {closing_hour}:{closing_minute:02d}."
+    # Closed after closing time
+    return f"We’re currently closed. Our hours today were from 8:00 AM to {closing_hour}:{closing_minute:02d}."
@@ -3,13 +3,15 @@ import random
 from fastapi import FastAPI, Request, BackgroundTasks, Query
 from fastapi.responses import JSONResponse, FileResponse
 from dotenv import load_dotenv
-from models import Order, Base, engine, SessionLocal
+from models import Order, SessionLocal
+from migrations import migrate
 from knowledge_loader import load_csv, load_excel, load_google_sheet, scrape_website
 from openai import OpenAI
-import os, requests, logging, datetime, io
+import os, logging, datetime, io
 from fastapi.logger import logger as fastapi_logger
 from knowledge_manager import KnowledgeManager
 from fpdf import FPDF
+from whatsapp_api import get_whatsapp
 
 # Load environment variables
 load_dotenv()
@@ -17,11 +19,12 @@ load_dotenv()
 VERIFY_TOKEN = os.getenv("VERIFY_TOKEN")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
 PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+whatsapp = get_whatsapp()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 LIVE_AGENT_WHATSAPP_NUMBERS = os.getenv("LIVE_AGENT_WHATSAPP_NUMBERS", "").split(",")
 
 client = OpenAI(api_key=OPENAI_API_KEY)
-Base.metadata.create_all(bind=engine)
+migrate()
 fastapi_logger.setLevel(logging.INFO)
 logger = fastapi_logger
 app = FastAPI()
@@ -59,7 +62,7 @@ def list_orders(skip: int = 0, limit: int = 10):
     db = SessionLocal()
     orders = db.query(Order).offset(skip).limit(limit).all()
     db.close()
-    return [{"phone": o.phone, "product": o.product, "quantity": o.quantity, "portion": o.portion, "price": o.price, "address": o.address, "created_at": o.created_at.isoformat()} for o in orders]
+    return [{"phone": o.phone_number, "product": o.meat_type, "quantity": o.quantity, "portion": o.custom_cuts, "price": o.price_option, "address": o.delivery_address, "created_at": o.created_at.isoformat()} for o in orders]
 
 def generate_receipt_pdf(order):
     pdf = FPDF()
@@ -78,92 +81,16 @@ def generate_receipt_pdf(order):
     return filename
 
 def send_whatsapp_message(recipient_id, message):
-    url = f"https://graph.facebook.com/v19.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "text",
-        "text": {"body": message},
-        "recipient_type": "individual"
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        logger.info(f"📤 Sent: {response.status_code} {response.text}")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to send WhatsApp message: {e}")
+    whatsapp.send_text(recipient_id, message)
 
 def send_whatsapp_file(recipient_id, file_path):
-    url = f"https://graph.facebook.com/v19.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}"
-    }
-    files = {
-        'file': (os.path.basename(file_path), open(file_path, 'rb'))
-    }
-    try:
-        response = requests.post(
-            url,
-            headers=headers,
-            files=files,
-            data={
-                "messaging_product": "whatsapp",
-                "to": recipient_id,
-                "type": "document",
-                "document[filename]": os.path.basename(file_path),
-                "document[caption]": "Here is your order receipt."
-            }
-        )
-        logger.info(f"📎 File Sent: {response.status_code} {response.text}")
-    except Exception as e:
-        logger.error(f"Failed to send file: {e}")
+    whatsapp.send_file(recipient_id, file_path, caption="Here is your order receipt.")
 
 def send_whatsapp_template_button(recipient_id, template_name, buttons):
-    url = f"https://graph.facebook.com/v19.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "interactive",
-        "interactive": {
-            "type": "button",
-            "body": {"text": "Please confirm or cancel your order."},
-            "action": {
-                "buttons": [
-                    {"type": "reply", "reply": {"id": "confirm_order", "title": "Confirm ✅"}},
-                    {"type": "reply", "reply": {"id": "cancel_order", "title": "Cancel ❌"}}
-                ]
-            }
-        }
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        logger.info(f"🧩 Template Sent: {response.status_code} {response.text}")
-    except Exception as e:
-        logger.error(f"Failed to send template: {e}")
+    whatsapp.send_confirm_buttons(recipient_id)
 
 def send_typing_indicator(recipient_id):
-    url = f"https://graph.facebook.com/v19.0/{PHONE_NUMBER_ID}/messages"
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": recipient_id,
-        "type": "typing_on"
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        logger.info(f"💬 Typing indicator sent: {response.status_code} {response.text}")
-    except Exception as e:
-        logger.error(f"Failed to send typing indicator: {e}")
+    whatsapp.send_typing(recipient_id)
 
 @app.post("/")
 async def receive_message(request: Request, background_tasks: BackgroundTasks):
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Point models.py at a throwaway database before anything imports it
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_parabot.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
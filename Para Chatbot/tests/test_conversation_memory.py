@@ -0,0 +1,51 @@
+import asyncio
+
+from conversation_memory import ConversationMemory
+from session_store import MemorySessionStore
+
+SENDER = "263770000000"
+
+
+def make_memory(summarize, **kwargs):
+    return ConversationMemory(MemorySessionStore("history"), MemorySessionStore("summary"), summarize, **kwargs)
+
+
+def chat(memory, turns):
+    async def run():
+        for i in range(turns):
+            memory.append(SENDER, "user", f"message {i}: 2kg beef please")
+            memory.append(SENDER, "assistant", f"reply {i}: noted")
+            task = memory.maybe_summarize(SENDER)
+            if task:
+                await task
+    asyncio.run(run())
+
+
+def test_long_short_message_chat_keeps_a_summary_of_its_early_turns():
+    seen = []
+
+    async def summarize(messages):
+        seen.extend(msg["content"] for msg in messages)
+        return "Summary: " + " | ".join(msg["content"] for msg in messages)
+
+    memory = make_memory(summarize, summarize_after=20, keep_recent=4)
+    chat(memory, 40)
+
+    # Far under the token threshold, yet nothing was dropped without being summarised
+    assert memory.history_tokens(SENDER) < memory.token_threshold
+    assert "message 0: 2kg beef please" in seen
+    assert "message 0" in memory.summary(SENDER)["text"]
+    assert len(memory.history(SENDER)) <= 20
+    messages = memory.build_messages(SENDER)
+    assert messages[0]["role"] == "system" and "message 0" in messages[0]["content"]
+    assert messages[-1]["content"] == "reply 39: noted"
+
+
+def test_short_chat_never_calls_the_summarizer():
+    async def summarize(messages):
+        raise AssertionError("short chats must not be summarised")
+
+    memory = make_memory(summarize)
+    chat(memory, 5)
+    assert memory.summary(SENDER) is None
+    assert len(memory.history(SENDER)) == 10
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from order_extractor import OrderExtractor
+from order_flow import OrderFlow
+from price_catalogue import PriceCatalogue
+
+ROWS = [
+    ("BEEF - SUPER", None), ("T-bone", 7.5), ("Mince", 6.0), ("Mixed cuts", 6.3),
+    ("CHICKENS", None), ("Drumstics", 5.5), ("Wings", 5.2),
+]
+
+
+@pytest.fixture
+def extractor():
+    catalogue = PriceCatalogue.from_rows(ROWS)
+    return OrderExtractor(OrderFlow(lambda: catalogue), use_llm=False)
+
+
+@pytest.mark.parametrize("text", ["i will come at 7pm", "can i collect at 11pm", "deliver to yes please"])
+def test_invalid_slot_values_never_raise(extractor, text):
+    assert extractor.looks_like_order(text) is False
+
+
+def test_invalid_time_is_left_for_the_flow_to_ask(extractor):
+    slots, _ = extractor.extract_rules("5kg beef t-bone at 11pm, pay cash")
+    assert "delivery_time" not in slots
+    assert slots["payment_method"] == "Cash"
+
+
+@pytest.mark.parametrize("text", [
+    "5kg beef t-bone, deliver to 12 fife avenue at 2pm, cash",
+    "deliver to 12 fife avenue at",
+    "2kg wings to 12 fife avenue please",
+])
+def test_address_stops_at_the_next_cue_word(extractor, text):
+    slots, _ = extractor.extract_rules(text)
+    assert slots["delivery_address"] == "12 fife avenue"
+
+
+def test_unmatched_item_is_reported_not_dropped(extractor):
+    state, prompt = asyncio.run(extractor.start("2kg chicken wings and 1kg livers to 12 fife avenue, cash"))
+    assert [item.cut for item in state.items] == ["wings"]
+    assert state.unresolved == ["1kg livers"]
+    assert "*1kg livers*" in prompt and "Anything else?" in prompt
+
+    reply = extractor.flow.handle(state, "done")
+    assert state.unresolved == []
+    assert "1kg livers" not in reply
+
+
+@pytest.mark.parametrize("text, address", [
+    ("5kg beef t-bone, deliver to 12 Fife Avenue at 2pm, cash", "12 Fife Avenue"),
+    ("2kg chicken wings to 8233 Glen View 8 in the morning", "8233 Glen View 8"),
+])
+def test_address_keeps_the_customers_casing(extractor, text, address):
+    state, _ = asyncio.run(extractor.start(text))
+    assert state.delivery_address == address
+
+
+def test_address_answer_keeps_the_customers_casing(extractor):
+    state, _ = asyncio.run(extractor.start("5kg beef t-bone"))
+    extractor.flow.handle(state, "done")
+    assert state.step == "delivery_address"
+    extractor.flow.handle(state, "  8233 Glenview 8 ")
+    assert state.delivery_address == "8233 Glenview 8"
@@ -0,0 +1,61 @@
+import pytest
+
+from order_flow import OrderFlow
+from price_catalogue import PriceCatalogue
+
+# Every beef cut is sold in two grades, as on the real price sheet
+ROWS = [
+    ("BEEF - COMMERCIAL", None), ("Mixed cuts", 4.5), ("T-bone", 7.0), ("Sirloin steak", 7.0),
+    ("Beef sirloin steak/silverside", 7.0), ("Bolo mince", 5.5),
+    ("BEEF - SUPER", None), ("Mixed cuts", 6.3), ("T-bone", 7.5), ("Sirloin steak", 8.5),
+    ("Beef sirloin steak/silverside", 8.5), ("Lean mince", 7.5),
+]
+
+
+@pytest.fixture
+def flow():
+    catalogue = PriceCatalogue.from_rows(ROWS)
+    return OrderFlow(lambda: catalogue)
+
+
+def at_portion(flow):
+    state, _ = flow.start()
+    flow.handle(state, "5kg beef")
+    assert state.step == "portion"
+    return state
+
+
+@pytest.mark.parametrize("cut", ["t-bone", "sirloin steak"])
+def test_cut_sold_in_two_grades_asks_for_the_grade(flow, cut):
+    state = at_portion(flow)
+    reply = flow.handle(state, cut)
+    assert "Which grade" in reply and "Commercial or Super" in reply
+    assert "⚠️" not in reply
+
+    flow.handle(state, "super")
+    assert [(item.grade, item.cut) for item in state.items] == [("super", cut)]
+    assert state.items[0].price is not None
+
+
+def test_grade_question_repeats_on_an_unclear_reply(flow):
+    state = at_portion(flow)
+    flow.handle(state, "t-bone")
+    reply = flow.handle(state, "hmm")
+    assert "Commercial or Super" in reply
+    assert state.step == "portion"
+
+
+def test_suggested_option_name_resolves(flow):
+    state = at_portion(flow)
+    reply = flow.handle(state, "sirloin")
+    assert "Super Beef Sirloin Steak" in reply
+    flow.handle(state, "Super Beef Sirloin Steak")
+    assert [(item.grade, item.cut) for item in state.items] == [("super", "sirloin steak")]
+
+
+def test_exact_full_name_beats_a_combined_line():
+    catalogue = PriceCatalogue.from_rows(ROWS)
+    matches, _ = catalogue.match("super sirloin steak")
+    assert [e.cut for e in matches] == ["sirloin steak"]
+    matches, _ = catalogue.match("super silverside")
+    assert [e.cut for e in matches] == ["beef sirloin steak/silverside"]
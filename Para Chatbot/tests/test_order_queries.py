@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import order_queries  # noqa: E402
+from migrations import migrate  # noqa: E402
+from models import Order, engine, session_scope, create_order  # noqa: E402
+
+ORDERS = 7
+
+
+@pytest.fixture(scope="module", autouse=True)
+def orders():
+    migrate()
+    started = datetime(2025, 3, 1, 8)
+    with session_scope() as db:
+        db.query(Order).delete()
+        for n in range(ORDERS):
+            create_order(db, f"26377000{n:04d}", [
+                {"product": "beef", "grade": "super", "cut": "t-bone", "quantity": "2kg", "quantity_kg": 2.0,
+                 "price": 15.0},
+                {"product": "chicken" if n % 2 else "pork", "quantity": "1kg", "quantity_kg": 1.0, "price": 5.5},
+            ], customer_name=f"Customer {n}", total_price=20.5, payment_method="Cash",
+                created_at=started + timedelta(hours=n))
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Several keyset pages, with a short last one
+    monkeypatch.setattr(order_queries, "EXPORT_CHUNK", 3)
+
+
+def test_ndjson_export_reads_every_order_with_items():
+    rows = [json.loads(line) for line in "".join(order_queries.export_orders("ndjson")).splitlines()]
+    assert [row["phone_number"] for row in rows] == [f"26377000{n:04d}" for n in reversed(range(ORDERS))]
+    assert all(len(row["items"]) == 2 for row in rows)
+
+
+def test_csv_export_reads_every_order():
+    rows = list(csv.DictReader(io.StringIO("".join(order_queries.export_orders("csv")))))
+    assert len(rows) == ORDERS
+    assert rows[0]["items"] == "super beef; pork"
+    assert rows[-1]["total_kg"] == "3.0"
+
+
+def test_export_applies_filters():
+    rows = "".join(order_queries.export_orders("ndjson", product="chicken")).splitlines()
+    assert len(rows) == ORDERS // 2
+
+
+def test_empty_csv_export_is_just_the_header():
+    body = "".join(order_queries.export_orders("csv", phone="nobody"))
+    assert body.strip() == ",".join(order_queries.CSV_FIELDS)
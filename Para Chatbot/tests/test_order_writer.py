@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from migrations import migrate  # noqa: E402
+from models import ChatMessage, session_scope  # noqa: E402
+from order_writer import OrderWriter  # noqa: E402
+
+PHONE = "263779999999"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def schema():
+    migrate()
+
+
+def transcript():
+    with session_scope() as db:
+        return [row.content for row in db.query(ChatMessage).filter_by(phone_number=PHONE).order_by(ChatMessage.id)]
+
+
+def test_stop_commits_queued_lines_then_refuses_new_writes():
+    writer = OrderWriter()
+
+    async def run():
+        await writer.start()
+        task = writer._task
+        writer.log_message(PHONE, "out", "sent during the drain")
+        await writer.stop()
+        assert task.done()
+        writer.log_message(PHONE, "out", "after shutdown")
+        with pytest.raises(RuntimeError):
+            await writer.save_order(PHONE, [{"product": "beef", "quantity_kg": 1.0}])
+
+    asyncio.run(run())
+    assert writer._queue is None
+    assert transcript() == ["sent during the drain"]
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+# tiktoken (and its BPE file) load on the first count, not at import
+_tokenizer = None
+_tokenizer_loaded = False
+
+# Chat format framing per message (role + separators), per OpenAI's counting guide
+MESSAGE_OVERHEAD_TOKENS = 4
+# Priming tokens added once per request for the assistant reply
+REPLY_PRIMING_TOKENS = 3
+
+
+def get_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        try:
+            import tiktoken
+            # Use explicit encoding for GPT-4 models
+            _tokenizer = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _tokenizer = None
+        _tokenizer_loaded = True
+    return _tokenizer
+
+
+def encode_length(text: str) -> int:
+    """Uncached token count: exact with tiktoken, otherwise ~4 characters per token."""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text))
+    return max(1, len(text) // 4)
+
+
+@lru_cache(maxsize=8192)
+def count_text_tokens(text: str) -> int:
+    """Token count for a piece of text, memoised so repeated strings are encoded once."""
+    return encode_length(text)
+
+
+def count_message_tokens(role: str, content: str) -> int:
+    return count_text_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+class StaticTokenCache:
+    """Token counts for large, rarely changing blocks (system prompt, knowledge chunks).
+
+    Each block is counted once per ``version``; callers bump the version when
+    the text changes, so lookups never touch the text itself.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self.recounts = 0
+
+    def count(self, name: str, version, text: str) -> int:
+        cached = self._counts.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        tokens = encode_length(text)
+        self._counts[name] = (version, tokens)
+        self.recounts += 1
+        return tokens
+
+    def stats(self) -> dict:
+        info = count_text_tokens.cache_info()
+        return {
+            "static_blocks": {name: tokens for name, (_, tokens) in self._counts.items()},
+            "static_recounts": self.recounts,
+            "text_cache_hits": info.hits,
+            "text_cache_misses": info.misses,
+        }
+
+
+static_tokens = StaticTokenCache()
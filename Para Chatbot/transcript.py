@@ -0,0 +1,79 @@
+"""Chat transcript reads for /chats.
+
+Every inbound and outbound WhatsApp message is a ``chat_messages`` row
+(written through ``OrderWriter.log_message``). Row ids only grow, so the
+dashboard polls ``/chats?since=<cursor>`` for the lines added since its last
+poll: an index range on the primary key, not a walk over every conversation.
+Older history for one conversation is paged backwards on (phone_number, id).
+"""
+import os
+
+from sqlalchemy import func
+
+from models import ChatMessage
+
+CHATS_FEED_MAX = int(os.getenv("CHATS_FEED_MAX", "1000"))
+CHATS_PAGE_MAX = int(os.getenv("CHATS_PAGE_MAX", "200"))
+
+
+def parse_cursor(cursor) -> int:
+    try:
+        value = int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if value < 0:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return value
+
+
+def feed(db, since=None, limit=500):
+    """Lines after ``since`` (oldest first) and the cursor to poll with next.
+
+    Without ``since`` it returns the latest ``limit`` lines, so a fresh
+    dashboard starts from recent history rather than the whole table.
+    """
+    limit = max(1, min(limit, CHATS_FEED_MAX))
+    query = db.query(ChatMessage)
+    if since is None:
+        rows = query.order_by(ChatMessage.id.desc()).limit(limit).all()[::-1]
+        cursor = rows[-1].id if rows else 0
+    else:
+        since = parse_cursor(since)
+        rows = query.filter(ChatMessage.id > since).order_by(ChatMessage.id).limit(limit).all()
+        cursor = rows[-1].id if rows else since
+    return rows, str(cursor)
+
+
+def conversation(db, phone_number, before=None, limit=50):
+    """One page of a conversation (oldest first) ending before ``before``, and the cursor for the older page."""
+    limit = max(1, min(limit, CHATS_PAGE_MAX))
+    query = db.query(ChatMessage).filter(ChatMessage.phone_number == phone_number)
+    if before is not None:
+        query = query.filter(ChatMessage.id < parse_cursor(before))
+    rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+    older = str(rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit][::-1], older
+
+
+def activity(db, since):
+    """(conversations, messages) since ``since``, counted over the created_at index."""
+    return (db.query(func.count(func.distinct(ChatMessage.phone_number)), func.count(ChatMessage.id))
+            .filter(ChatMessage.created_at >= since)
+            .one())
+
+
+def message_to_dict(row, customer_name=None) -> dict:
+    incoming = row.direction == "in"
+    message = {
+        "id": row.message_id or str(row.id),
+        "cursor": str(row.id),
+        "sender_id": row.phone_number if incoming else "bot",
+        "message": row.content,
+        "timestamp": row.created_at.isoformat(),
+        "message_type": "incoming" if incoming else "outgoing",
+    }
+    if incoming:
+        message["customer_name"] = customer_name
+    else:
+        message["is_ai_response"] = True
+    return message
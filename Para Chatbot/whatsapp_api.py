@@ -0,0 +1,381 @@
+import asyncio
+import os
+import random
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
+PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+GRAPH_API_VERSION = os.getenv("GRAPH_API_VERSION", "v19.0")
+WHATSAPP_API_BASE_URL = os.getenv("WHATSAPP_API_BASE_URL", "https://graph.facebook.com")
+
+# Connection pool shared by every outbound call (keep-alive, bounded)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3"))
+
+# Retry policy for 429 / 5xx / connection failures
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", "3"))
+WHATSAPP_BACKOFF_BASE = float(os.getenv("WHATSAPP_BACKOFF_BASE", "0.5"))
+WHATSAPP_BACKOFF_MAX = float(os.getenv("WHATSAPP_BACKOFF_MAX", "20"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Failures where the request certainly never reached Meta, so resending can't duplicate a message.
+# Not RemoteProtocolError: the connection can drop after Meta accepted the send.
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+logger = logging.getLogger(__name__)
+
+
+def _timeout():
+    return httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def _limits():
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+
+
+# --- payload builders (shared by both faces) ---
+
+def text_payload(recipient_id, message):
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": recipient_id,
+        "type": "text",
+        "text": {"body": message},
+    }
+
+
+def typing_payload(recipient_id, action="typing_on"):
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": recipient_id,
+        "type": action,
+    }
+
+
+def document_payload(recipient_id, media_id, filename, caption):
+    return {
+        "messaging_product": "whatsapp",
+        "recipient_type": "individual",
+        "to": recipient_id,
+        "type": "document",
+        "document": {"id": media_id, "filename": filename, "caption": caption},
+    }
+
+
+def confirm_buttons_payload(recipient_id, body="Please confirm or cancel your order."):
+    return {
+        "messaging_product": "whatsapp",
+        "to": recipient_id,
+        "type": "interactive",
+        "interactive": {
+            "type": "button",
+            "body": {"text": body},
+            "action": {
+                "buttons": [
+                    {"type": "reply", "reply": {"id": "confirm_order", "title": "Confirm ✅"}},
+                    {"type": "reply", "reply": {"id": "cancel_order", "title": "Cancel ❌"}}
+                ]
+            }
+        }
+    }
+
+
+def order_confirmation_payload(to_number, customer_name, order_number, product_details, estimated_delivery,
+                               template_name="order_confirmation", language="en_US"):
+    return {
+        "messaging_product": "whatsapp",
+        "to": to_number,
+        "type": "template",
+        "template": {
+            "name": template_name,
+            "language": {"code": language},
+            "components": [{
+                "type": "body",
+                "parameters": [
+                    {"type": "text", "text": customer_name or "Customer"},
+                    {"type": "text", "text": order_number},
+                    {"type": "text", "text": product_details},
+                    {"type": "text", "text": estimated_delivery},
+                ],
+            }],
+        },
+    }
+
+
+class _WhatsAppBase:
+    """Endpoint, auth and retry policy shared by the sync and async clients."""
+
+    def __init__(self, access_token=None, phone_number_id=None, base_url=None, api_version=None,
+                 max_retries=None, backoff_base=None, backoff_max=None):
+        self.access_token = access_token or ACCESS_TOKEN
+        self.phone_number_id = phone_number_id or PHONE_NUMBER_ID
+        self.base_url = (base_url or WHATSAPP_API_BASE_URL).rstrip("/")
+        self.api_version = api_version or GRAPH_API_VERSION
+        self.max_retries = WHATSAPP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = WHATSAPP_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = WHATSAPP_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._latency_total = 0.0
+
+    @property
+    def messages_url(self):
+        return f"{self.base_url}/{self.api_version}/{self.phone_number_id}/messages"
+
+    @property
+    def media_url(self):
+        return f"{self.base_url}/{self.api_version}/{self.phone_number_id}/media"
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    def _retry_delay(self, attempt, response=None):
+        """Honour Retry-After when Meta sends it, otherwise full-jitter exponential backoff."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    try:
+                        delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    except (TypeError, ValueError):
+                        delay = None
+                if delay is not None:
+                    return min(max(delay, 0.0), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, attempt, response=None, error=None):
+        if attempt >= self.max_retries:
+            return False
+        if error is not None:
+            return isinstance(error, RETRY_EXCEPTIONS)
+        return response.status_code in RETRY_STATUSES
+
+    def _record(self, label, started, response=None, error=None):
+        self.requests += 1
+        self._latency_total += time.perf_counter() - started
+        if error is not None:
+            self.failures += 1
+            logger.error(f"Failed to send WhatsApp {label}: {error}")
+        elif response.status_code >= 400:
+            self.failures += 1
+            logger.error(f"Failed to send WhatsApp {label}: {response.status_code} {response.text}")
+        else:
+            logger.info(f"{label}: {response.status_code} {response.text}")
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "avg_latency_seconds": round(self._latency_total / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+class WhatsAppClient(_WhatsAppBase):
+    """Blocking face over a keep-alive ``httpx.Client`` (for scripts and the legacy apps)."""
+
+    def __init__(self, http_client: httpx.Client = None, **kwargs):
+        super().__init__(**kwargs)
+        self.http = http_client or httpx.Client(timeout=_timeout(), limits=_limits())
+
+    def _request(self, label, url, **kwargs):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = self.http.post(url, headers=self._headers(), **kwargs)
+            except httpx.HTTPError as e:
+                if not self._should_retry(attempt, error=e):
+                    self._record(label, started, error=e)
+                    return None
+                time.sleep(self._retry_delay(attempt))
+            else:
+                if not self._should_retry(attempt, response=response):
+                    self._record(label, started, response=response)
+                    return response
+                time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+            self.retries += 1
+
+    def send(self, payload, label="📤 Sent"):
+        return self._request(label, self.messages_url, json=payload)
+
+    def send_text(self, recipient_id, message):
+        return self.send(text_payload(recipient_id, message), "📤 Sent")
+
+    def send_typing(self, recipient_id, action="typing_on"):
+        return self.send(typing_payload(recipient_id, action), "💬 Typing indicator")
+
+    def send_confirm_buttons(self, recipient_id):
+        return self.send(confirm_buttons_payload(recipient_id), "🧩 Template Sent")
+
+    def send_order_confirmation(self, *args, **kwargs):
+        return self.send(order_confirmation_payload(*args, **kwargs), "🧾 Order confirmation")
+
+    def send_file(self, recipient_id, file_path, caption="Here is your order receipt."):
+        """Upload a document to the media endpoint, then send it by media id."""
+        filename = os.path.basename(file_path)
+        try:
+            with open(file_path, "rb") as f:
+                content = f.read()
+        except OSError as e:
+            logger.error(f"Failed to read file {file_path}: {e}")
+            return None
+        upload = self._request(
+            "📎 Media upload", self.media_url,
+            data={"messaging_product": "whatsapp", "type": "application/pdf"},
+            files={"file": (filename, content, "application/pdf")},
+        )
+        media_id = upload.json().get("id") if upload is not None and upload.status_code < 400 else None
+        if not media_id:
+            return None
+        return self.send(document_payload(recipient_id, media_id, filename, caption), "📎 File Sent")
+
+    def close(self):
+        self.http.close()
+
+
+class AsyncWhatsAppClient(_WhatsAppBase):
+    """Non-blocking face over a shared keep-alive ``httpx.AsyncClient``."""
+
+    def __init__(self, http_client: httpx.AsyncClient = None, **kwargs):
+        super().__init__(**kwargs)
+        self.http = http_client or httpx.AsyncClient(timeout=_timeout(), limits=_limits())
+
+    async def _request(self, label, url, **kwargs):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = await self.http.post(url, headers=self._headers(), **kwargs)
+            except httpx.HTTPError as e:
+                if not self._should_retry(attempt, error=e):
+                    self._record(label, started, error=e)
+                    return None
+                await asyncio.sleep(self._retry_delay(attempt))
+            else:
+                if not self._should_retry(attempt, response=response):
+                    self._record(label, started, response=response)
+                    return response
+                await asyncio.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+            self.retries += 1
+
+    async def send(self, payload, label="📤 Sent"):
+        return await self._request(label, self.messages_url, json=payload)
+
+    async def send_text(self, recipient_id, message):
+        return await self.send(text_payload(recipient_id, message), "📤 Sent")
+
+    async def send_typing(self, recipient_id, action="typing_on"):
+        return await self.send(typing_payload(recipient_id, action), "💬 Typing indicator")
+
+    async def send_confirm_buttons(self, recipient_id):
+        return await self.send(confirm_buttons_payload(recipient_id), "🧩 Template Sent")
+
+    async def send_order_confirmation(self, *args, **kwargs):
+        return await self.send(order_confirmation_payload(*args, **kwargs), "🧾 Order confirmation")
+
+    async def send_file(self, recipient_id, file_path, caption="Here is your order receipt."):
+        """Upload a document to the media endpoint, then send it by media id."""
+        filename = os.path.basename(file_path)
+        try:
+            content = await asyncio.to_thread(_read_bytes, file_path)
+        except OSError as e:
+            logger.error(f"Failed to read file {file_path}: {e}")
+            return None
+        upload = await self._request(
+            "📎 Media upload", self.media_url,
+            data={"messaging_product": "whatsapp", "type": "application/pdf"},
+            files={"file": (filename, content, "application/pdf")},
+        )
+        media_id = upload.json().get("id") if upload is not None and upload.status_code < 400 else None
+        if not media_id:
+            return None
+        return await self.send(document_payload(recipient_id, media_id, filename, caption), "📎 File Sent")
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# --- process-wide clients ---
+
+_async_client = None
+_sync_client = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled async HTTP client, creating it on first use."""
+    return get_async_whatsapp().http
+
+
+def get_async_whatsapp() -> AsyncWhatsAppClient:
+    global _async_client
+    if _async_client is None or _async_client.http.is_closed:
+        _async_client = AsyncWhatsAppClient()
+    return _async_client
+
+
+def get_whatsapp() -> WhatsAppClient:
+    global _sync_client
+    if _sync_client is None or _sync_client.http.is_closed:
+        _sync_client = WhatsAppClient()
+    return _sync_client
+
+
+async def close_async_client():
+    """Close the shared client (called on app shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def whatsapp_stats() -> dict:
+    stats = {}
+    if _async_client is not None:
+        stats["async"] = _async_client.stats()
+    if _sync_client is not None:
+        stats["sync"] = _sync_client.stats()
+    return stats
+
+
+# --- async helpers used by the webhook app ---
+
+async def send_whatsapp_message(recipient_id, message):
+    return await get_async_whatsapp().send_text(recipient_id, message)
+
+
+async def send_whatsapp_typing_indicator(recipient_id, action="typing_on"):
+    return await get_async_whatsapp().send_typing(recipient_id, action)
+
+
+async def send_whatsapp_file(recipient_id, file_path, caption="Here is your order receipt."):
+    return await get_async_whatsapp().send_file(recipient_id, file_path, caption)
+
+
+async def send_order_confirmation(to_number, customer_name, order_number, product_details, estimated_delivery,
+                                  template_name="order_confirmation", language="en_US"):
+    return await get_async_whatsapp().send_order_confirmation(
+        to_number, customer_name, order_number, product_details, estimated_delivery,
+        template_name=template_name, language=language,
+    )